@@ -42,8 +42,8 @@ async def list_courses(
     # Calculate pagination
     skip = (page - 1) * per_page
     
-    # Get courses
-    courses = await prisma_service.get_many(
+    # Get courses and total count
+    courses, total, _ = await prisma_service.find_many_and_count(
         model="course",
         where=where,
         skip=skip,
@@ -51,9 +51,6 @@ async def list_courses(
         order_by={"title": "asc"}
     )
     
-    # Get total count
-    total = await prisma_service.count(model="course", where=where)
-    
     # Calculate total pages
     total_pages = (total + per_page - 1) // per_page
     
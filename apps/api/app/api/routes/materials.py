@@ -53,8 +53,8 @@ async def list_course_materials(
     # Calculate pagination
     skip = (page - 1) * per_page
     
-    # Get materials
-    materials = await prisma_service.get_many(
+    # Get materials and total count
+    materials, total, _ = await prisma_service.find_many_and_count(
         model="material",
         where=where,
         skip=skip,
@@ -62,9 +62,6 @@ async def list_course_materials(
         order_by={"order": "asc"}
     )
     
-    # Get total count
-    total = await prisma_service.count(model="material", where=where)
-    
     # Calculate total pages
     total_pages = (total + per_page - 1) // per_page
     
@@ -239,8 +236,8 @@ async def list_material_content(
     # Calculate pagination
     skip = (page - 1) * per_page
     
-    # Get content
-    content = await prisma_service.get_many(
+    # Get content and total count
+    content, total, _ = await prisma_service.find_many_and_count(
         model="content",
         where=where,
         skip=skip,
@@ -248,9 +245,6 @@ async def list_material_content(
         order_by={"order": "asc"}
     )
     
-    # Get total count
-    total = await prisma_service.count(model="content", where=where)
-    
     # Calculate total pages
     total_pages = (total + per_page - 1) // per_page
     
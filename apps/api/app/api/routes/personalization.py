@@ -44,12 +44,14 @@ async def update_user_preferences(
 @router.get("/recommendations")
 async def get_personalized_recommendations(
     limit: int = Query(5, description="Maximum number of recommendations to return"),
+    offset: int = Query(0, ge=0, description="Number of recommendations to skip"),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Get personalized content recommendations for a user."""
     recommendations = await personalization_service.get_personalized_recommendations(
         user_id=current_user.id,
-        limit=limit
+        limit=limit,
+        offset=offset
     )
     
     return {
@@ -53,8 +53,8 @@ async def list_course_quizzes(
     # Calculate pagination
     skip = (page - 1) * per_page
     
-    # Get quizzes
-    quizzes = await prisma_service.get_many(
+    # Get quizzes and total count
+    quizzes, total, _ = await prisma_service.find_many_and_count(
         model="quiz",
         where=where,
         skip=skip,
@@ -62,9 +62,6 @@ async def list_course_quizzes(
         order_by={"title": "asc"}
     )
     
-    # Get total count
-    total = await prisma_service.count(model="quiz", where=where)
-    
     # Calculate total pages
     total_pages = (total + per_page - 1) // per_page
     
@@ -253,8 +250,8 @@ async def list_quiz_questions(
     # Calculate pagination
     skip = (page - 1) * per_page
     
-    # Get questions
-    questions = await prisma_service.get_many(
+    # Get questions and total count
+    questions, total, _ = await prisma_service.find_many_and_count(
         model="question",
         where=where,
         skip=skip,
@@ -270,9 +267,6 @@ async def list_quiz_questions(
             if "explanation" in question:
                 del question["explanation"]
     
-    # Get total count
-    total = await prisma_service.count(model="question", where=where)
-    
     # Calculate total pages
     total_pages = (total + per_page - 1) // per_page
     
@@ -497,8 +491,8 @@ async def list_user_submissions(
     # Calculate pagination
     skip = (page - 1) * per_page
     
-    # Get submissions
-    submissions = await prisma_service.get_many(
+    # Get submissions and total count
+    submissions, total, _ = await prisma_service.find_many_and_count(
         model="submission",
         where=where,
         skip=skip,
@@ -506,9 +500,6 @@ async def list_user_submissions(
         order_by={"created_at": "desc"}
     )
     
-    # Get total count
-    total = await prisma_service.count(model="submission", where=where)
-    
     # Calculate total pages
     total_pages = (total + per_page - 1) // per_page
     
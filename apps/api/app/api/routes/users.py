@@ -70,8 +70,8 @@ async def list_users(
     # Calculate pagination
     skip = (page - 1) * per_page
     
-    # Get users
-    users = await prisma_service.get_many(
+    # Get users and total count
+    users, total, _ = await prisma_service.find_many_and_count(
         model="user",
         where=where,
         skip=skip,
@@ -79,9 +79,6 @@ async def list_users(
         order_by={"name": "asc"}
     )
     
-    # Get total count
-    total = await prisma_service.count(model="user", where=where)
-    
     # Calculate total pages
     total_pages = (total + per_page - 1) // per_page
     
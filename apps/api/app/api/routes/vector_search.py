@@ -12,13 +12,15 @@ async def search_content(
     query: str = Query(..., description="Search query"),
     similarity_threshold: float = Query(0.7, description="Minimum similarity threshold (0-1)"),
     match_count: int = Query(5, description="Maximum number of matches to return"),
+    content_length: Optional[int] = Query(None, ge=0, description="Return only this many characters of each match's content"),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Search for content similar to the query using vector similarity."""
     results = await vector_search_service.search_by_query(
         query=query,
         similarity_threshold=similarity_threshold,
-        match_count=match_count
+        match_count=match_count,
+        content_length=content_length
     )
     
     return {
@@ -10,6 +10,17 @@ class Settings(BaseModel):
     
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    DATABASE_POOL_WARMUP: int = int(os.getenv("DATABASE_POOL_WARMUP", "8"))
+    DATABASE_QUERY_TIMEOUT: float = float(os.getenv("DATABASE_QUERY_TIMEOUT", "10"))
+    DATABASE_HTTP2: bool = os.getenv("DATABASE_HTTP2", "false").lower() == "true"
+    DATABASE_HTTP_MAX_CONNECTIONS: int = int(os.getenv("DATABASE_HTTP_MAX_CONNECTIONS", "100"))
+    DATABASE_HTTP_KEEPALIVE: int = int(os.getenv("DATABASE_HTTP_KEEPALIVE", "50"))
+    DATABASE_HTTP_TIMEOUT: float = float(os.getenv("DATABASE_HTTP_TIMEOUT", "30"))
+    
+    # Redis settings
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    METRICS_CACHE_TTL: int = int(os.getenv("METRICS_CACHE_TTL", "30"))
+    QUIZ_QUESTIONS_CACHE_TTL: int = int(os.getenv("QUIZ_QUESTIONS_CACHE_TTL", "86400"))
     
     # JWT settings
     JWT_SECRET: str = os.getenv("JWT_SECRET", "test_secret_key")
@@ -19,10 +30,16 @@ class Settings(BaseModel):
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+    OPENAI_EMBEDDING_MODEL: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+    # Fixed by the halfvec(512) and bit(512) content_chunks columns; change with a migration
+    OPENAI_EMBEDDING_DIMENSIONS: int = 512
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
     
     # Feature flags
     ENABLE_AI_FEATURES: bool = os.getenv("ENABLE_AI_FEATURES", "true").lower() == "true"
     ENABLE_ANALYTICS: bool = os.getenv("ENABLE_ANALYTICS", "true").lower() == "true"
+    ENABLE_SEMANTIC_CACHE: bool = os.getenv("ENABLE_SEMANTIC_CACHE", "false").lower() == "true"
     
     model_config = ConfigDict(
         case_sensitive=True,
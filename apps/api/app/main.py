@@ -1,3 +1,9 @@
+import asyncio
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -6,6 +12,9 @@ from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 from app.api.routes import auth, users, organizations, courses, materials, quizzes, ai, analytics, cost_optimization, ai_analytics_dashboard, vector_search, langchain_tutoring, context_retrieval, personalization, confusion_detection
 
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="LEARN-X API",
@@ -39,6 +48,54 @@ app.include_router(context_retrieval.router, prefix="/api/context-retrieval", ta
 app.include_router(personalization.router, prefix="/api/personalization", tags=["personalization"])
 app.include_router(confusion_detection.router, prefix="/api/confusion-detection", tags=["confusion-detection"])
 
+# Hand log records to a background thread so handlers never write on the event loop
+_log_listener: Optional[QueueListener] = None
+_log_handlers: List[logging.Handler] = []
+
+@app.on_event("startup")
+async def start_log_listener():
+    global _log_listener, _log_handlers
+    root = logging.getLogger()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _log_handlers = root.handlers[:]
+    _log_listener = QueueListener(log_queue, *_log_handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    _log_listener.start()
+
+# Report OpenAI HTTP pool usage to performance monitoring while the app runs
+_pool_metrics_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_pool_metrics():
+    global _pool_metrics_task
+    from app.services.openai import openai_service
+    _pool_metrics_task = asyncio.create_task(openai_service.report_connection_pool_metrics())
+
+# Connect to the database and open pooled connections before the first request
+@app.on_event("startup")
+async def connect_database():
+    from app.services.prisma import prisma_service
+    from app.services.personalization import personalization_service
+    await prisma_service.connect()
+    await personalization_service.connect()
+
+# Stop pool reporting, write any queued performance metrics, then close the database connection
+@app.on_event("shutdown")
+async def disconnect_database():
+    from app.services.prisma import prisma_service
+    from app.services.performance_monitoring import performance_monitoring_service
+    if _pool_metrics_task is not None:
+        _pool_metrics_task.cancel()
+    await performance_monitoring_service.flush_metrics()
+    await prisma_service.disconnect()
+
+# Write out queued log records and give the handlers back to the root logger
+@app.on_event("shutdown")
+async def stop_log_listener():
+    if _log_listener is not None:
+        _log_listener.stop()
+        logging.getLogger().handlers = _log_handlers
+
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -25,7 +25,7 @@ class Organization(OrganizationBase):
     updatedAt: datetime
     
     class Config:
-        from_attributes = True
+        orm_mode = True
 
 class OrganizationWithStats(Organization):
     """Organization with additional statistics."""
@@ -33,4 +33,4 @@ class OrganizationWithStats(Organization):
     course_count: int
     
     class Config:
-        from_attributes = True
+        orm_mode = True
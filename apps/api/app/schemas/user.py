@@ -45,7 +45,7 @@ class UserInDB(UserBase):
     updatedAt: datetime
     
     class Config:
-        from_attributes = True
+        orm_mode = True
 
 class User(UserBase):
     """User response schema."""
@@ -55,11 +55,11 @@ class User(UserBase):
     updatedAt: datetime
     
     class Config:
-        from_attributes = True
+        orm_mode = True
 
 class UserWithOrganization(User):
     """User with organization details."""
     organization_name: str
     
     class Config:
-        from_attributes = True
+        orm_mode = True
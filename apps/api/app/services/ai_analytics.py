@@ -33,19 +33,10 @@ class AIAnalyticsService:
             else:
                 start_date = now - timedelta(weeks=1)  # Default to week
             
-            # Get all users in the organization
-            users = await prisma.user.find_many(
-                where={"organization_id": organization_id}
-            )
-            user_ids = [user.id for user in users]
-            
-            if not user_ids:
-                return {"error": "No users found in organization"}
-            
-            # Get AI interactions for these users in the time period
+            # Get AI interactions for users in the organization in the time period
             interactions = await prisma.aiinteraction.find_many(
                 where={
-                    "user_id": {"in": user_ids},
+                    "user": {"organization_id": organization_id},
                     "created_at": {"gte": start_date}
                 },
                 order_by={"created_at": "asc"}
@@ -121,19 +112,10 @@ class AIAnalyticsService:
             else:
                 start_date = now - timedelta(weeks=1)  # Default to week
             
-            # Get all users in the organization
-            users = await prisma.user.find_many(
-                where={"organization_id": organization_id}
-            )
-            user_ids = [user.id for user in users]
-            
-            if not user_ids:
-                return {"error": "No users found in organization"}
-            
-            # Get AI interactions for these users in the time period
+            # Get AI interactions for users in the organization in the time period
             interactions = await prisma.aiinteraction.find_many(
                 where={
-                    "user_id": {"in": user_ids},
+                    "user": {"organization_id": organization_id},
                     "created_at": {"gte": start_date}
                 }
             )
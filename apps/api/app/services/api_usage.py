@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 from datetime import datetime, timedelta
 import json
@@ -10,6 +10,9 @@ from app.core.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Number of interactions fetched per page when aggregating usage
+USAGE_PAGE_SIZE = 5000
+
 class APIUsageService:
     """Service for tracking and managing API usage."""
     
@@ -87,46 +90,47 @@ class APIUsageService:
             else:
                 start_date = now - timedelta(days=30)  # Default to month
             
-            # Get all users in the organization
-            users = await prisma.user.find_many(
-                where={"organization_id": organization_id}
-            )
-            user_ids = [user.id for user in users]
-            
-            if not user_ids:
-                return {"error": "No users found in organization"}
-            
-            # Get API usage interactions for these users in the time period
-            interactions = await prisma.aiinteraction.find_many(
-                where={
-                    "user_id": {"in": user_ids},
-                    "created_at": {"gte": start_date},
-                    "interaction_type": "api_usage"
-                }
-            )
-            
-            # Calculate usage metrics
-            total_calls = len(interactions)
-            total_tokens = sum(i.tokens_used or 0 for i in interactions)
-            
-            # Group by API name
+            # Page through API usage interactions for users in the organization in
+            # the time period, folding each page into the totals so memory stays
+            # bounded by the number of distinct APIs rather than rows
+            where = {
+                "user": {"organization_id": organization_id},
+                "created_at": {"gte": start_date},
+                "interaction_type": "api_usage"
+            }
+            total_calls = 0
+            total_tokens = 0
             api_usage = {}
-            for interaction in interactions:
-                metadata = interaction.metadata or {}
-                api_name = metadata.get("api_name", "unknown")
-                tokens = interaction.tokens_used or 0
-                cost = metadata.get("cost", 0)
+            cursor = None
+            
+            while True:
+                page_args = {"where": where, "take": USAGE_PAGE_SIZE, "order": {"id": "asc"}}
+                if cursor:
+                    page_args.update(cursor={"id": cursor}, skip=1)
+                interactions = await prisma.aiinteraction.find_many(**page_args)
                 
-                if api_name not in api_usage:
-                    api_usage[api_name] = {
-                        "calls": 0,
-                        "tokens": 0,
-                        "cost": 0
-                    }
+                for interaction in interactions:
+                    metadata = interaction.metadata or {}
+                    api_name = metadata.get("api_name", "unknown")
+                    tokens = interaction.tokens_used or 0
+                    cost = metadata.get("cost", 0)
+                    
+                    if api_name not in api_usage:
+                        api_usage[api_name] = {
+                            "calls": 0,
+                            "tokens": 0,
+                            "cost": 0
+                        }
+                    
+                    api_usage[api_name]["calls"] += 1
+                    api_usage[api_name]["tokens"] += tokens
+                    api_usage[api_name]["cost"] += cost
+                    total_calls += 1
+                    total_tokens += tokens
                 
-                api_usage[api_name]["calls"] += 1
-                api_usage[api_name]["tokens"] += tokens
-                api_usage[api_name]["cost"] += cost
+                if len(interactions) < USAGE_PAGE_SIZE:
+                    break
+                cursor = interactions[-1].id
             
             # Calculate total cost
             total_cost = sum(api["cost"] for api in api_usage.values())
@@ -180,13 +184,10 @@ class APIUsageService:
             # Get rate limits from settings
             rate_limits = self._get_rate_limits(user.role)
             
-            # Check daily limit
+            # Get daily and monthly usage in a single query
             daily_limit = rate_limits.get(api_name, {}).get("daily", 1000)
-            daily_usage = await self._get_usage_count(user_id, api_name, "day")
-            
-            # Check monthly limit
             monthly_limit = rate_limits.get(api_name, {}).get("monthly", 10000)
-            monthly_usage = await self._get_usage_count(user_id, api_name, "month")
+            daily_usage, monthly_usage = await self._get_usage_counts(user_id, api_name)
             
             # Determine if allowed
             daily_allowed = daily_usage < daily_limit
@@ -207,43 +208,40 @@ class APIUsageService:
             logger.error(f"Error checking rate limits: {str(e)}")
             return {"allowed": False, "error": f"Failed to check rate limits: {str(e)}"}
     
-    async def _get_usage_count(self, user_id: str, api_name: str, time_period: str) -> int:
-        """Get the number of API calls for a user in a time period.
+    async def _get_usage_counts(self, user_id: str, api_name: str) -> Tuple[int, int]:
+        """Get the number of API calls for a user in the last day and month.
         
         Args:
             user_id: ID of the user
             api_name: Name of the API
-            time_period: Time period (day, week, month)
             
         Returns:
-            Number of API calls
+            Tuple of (daily, monthly) API call counts
         """
         try:
-            # Calculate date range
             now = datetime.utcnow()
-            if time_period == "day":
-                start_date = now - timedelta(days=1)
-            elif time_period == "week":
-                start_date = now - timedelta(weeks=1)
-            elif time_period == "month":
-                start_date = now - timedelta(days=30)
-            else:
-                start_date = now - timedelta(days=1)  # Default to day
-            
-            # Count API calls
-            count = await prisma.aiinteraction.count(
-                where={
-                    "user_id": user_id,
-                    "created_at": {"gte": start_date},
-                    "interaction_type": "api_usage",
-                    "metadata": {"path": ["api_name"], "equals": api_name}
-                }
+            rows = await prisma.query_raw(
+                """
+                SELECT
+                    count(*) FILTER (WHERE "createdAt" >= $3::timestamp)::int AS daily,
+                    count(*)::int AS monthly
+                FROM ai_interactions
+                WHERE "userId" = $1
+                AND interaction_type = 'api_usage'
+                AND metadata->>'api_name' = $2
+                AND "createdAt" >= $4::timestamp
+                """,
+                user_id,
+                api_name,
+                now - timedelta(days=1),
+                now - timedelta(days=30)
             )
             
-            return count
+            row = rows[0] if rows else {}
+            return row.get("daily") or 0, row.get("monthly") or 0
         except Exception as e:
-            logger.error(f"Error getting usage count: {str(e)}")
-            return 0
+            logger.error(f"Error getting usage counts: {str(e)}")
+            return 0, 0
     
     def _calculate_cost(self, api_name: str, tokens: int) -> float:
         """Calculate the cost of an API call based on token usage.
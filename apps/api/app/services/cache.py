@@ -0,0 +1,78 @@
+from typing import Any, Callable, Optional
+import functools
+import inspect
+import logging
+import orjson
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client: Optional[aioredis.Redis] = None
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """Get the shared Redis client.
+    
+    Returns:
+        The Redis client, or None if no REDIS_URL is configured
+    """
+    global _redis_client
+    if not settings.REDIS_URL:
+        return None
+    if _redis_client is None:
+        _redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+def ttl_cache(ttl: int = 30, namespace: str = "cache", key_fn: Optional[Callable[..., str]] = None):
+    """Cache the JSON result of an async method in Redis for a short time.
+    
+    Results containing an "error" key are not cached, and any Redis failure
+    falls back to calling the wrapped method directly.
+    
+    Args:
+        ttl: Time to live of cached results in seconds
+        namespace: Prefix for the default cache key
+        key_fn: Optional function building the cache key from the call arguments.
+            Defaults to "<namespace>:<function name>:<arg>..." with defaults applied.
+    
+    Returns:
+        Decorator for async functions
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        def default_key(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = [str(v) for name, v in bound.arguments.items() if name != "self"]
+            return ":".join([namespace, func.__name__, *values])
+        
+        make_key = key_fn or default_key
+        
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            client = get_redis()
+            if client is None:
+                return await func(*args, **kwargs)
+            
+            key = make_key(*args, **kwargs)
+            try:
+                cached = await client.get(key)
+                if cached is not None:
+                    return orjson.loads(cached)
+            except Exception as e:
+                logger.warning(f"Error reading cache key {key}: {str(e)}")
+            
+            result = await func(*args, **kwargs)
+            
+            if not (isinstance(result, dict) and "error" in result):
+                try:
+                    await client.set(key, orjson.dumps(result, default=str), ex=ttl)
+                except Exception as e:
+                    logger.warning(f"Error writing cache key {key}: {str(e)}")
+            
+            return result
+        
+        return wrapper
+    
+    return decorator
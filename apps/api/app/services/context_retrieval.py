@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 import asyncio
+from collections import defaultdict
 from datetime import datetime
 
 from app.services.prisma import prisma
@@ -381,28 +382,24 @@ class ContextRetrievalService:
             )
             
             # Organize by material ID
-            history = {}
+            history = defaultdict(lambda: {
+                "interaction_count": 0,
+                "last_interaction": None,
+                "completed": False
+            })
             for interaction in interactions:
-                material_id = interaction.material_id
-                if material_id not in history:
-                    history[material_id] = {
-                        "interaction_count": 0,
-                        "last_interaction": None,
-                        "completed": False
-                    }
+                entry = history[interaction.material_id]
+                entry["interaction_count"] += 1
                 
-                history[material_id]["interaction_count"] += 1
-                
-                # Update last interaction time
-                if not history[material_id]["last_interaction"] or \
-                   interaction.created_at > history[material_id]["last_interaction"]:
-                    history[material_id]["last_interaction"] = interaction.created_at
+                # Interactions are newest first, so the first one seen is the latest
+                if entry["last_interaction"] is None:
+                    entry["last_interaction"] = interaction.created_at
                 
                 # Check if material was completed
                 if interaction.type == "COMPLETE":
-                    history[material_id]["completed"] = True
+                    entry["completed"] = True
             
-            return history
+            return dict(history)
         except Exception as e:
             logger.error(f"Error getting user learning history: {str(e)}")
             return {}
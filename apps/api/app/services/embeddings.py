@@ -40,12 +40,10 @@ class EmbeddingsService:
         
         # Chunk the content based on content type
         content = material.content
-        chunks = []
-        
         if material.content_type == "markdown":
             chunks = text_chunking_service.chunk_markdown(content)
-        else:  # Default to plain text chunking
-            chunks = text_chunking_service.chunk_text(content)
+        else:  # Default to plain text chunking, produced as chunks are stored
+            chunks = text_chunking_service.iter_chunks(content)
         
         # Store chunks and generate embeddings
         chunk_ids = []
@@ -89,7 +87,7 @@ class EmbeddingsService:
             
             # Execute raw SQL to update the embedding
             await prisma.execute_raw(
-                "UPDATE content_chunks SET embedding = $1::vector WHERE id = $2",
+                "UPDATE content_chunks SET embedding = $1::halfvec WHERE id = $2",
                 [embedding_str, chunk_id]
             )
             
@@ -126,11 +124,11 @@ class EmbeddingsService:
             # Execute raw SQL to search for similar content
             results = await prisma.execute_raw(
                 """SELECT c.id, c.content, c.material_id, m.title as material_title, 
-                   1 - (c.embedding <=> $1::vector) as similarity
+                   1 - (c.embedding <=> $1::halfvec) as similarity
                    FROM content_chunks c
                    JOIN materials m ON c.material_id = m.id
                    WHERE c.embedding IS NOT NULL
-                   ORDER BY c.embedding <=> $1::vector LIMIT $2
+                   ORDER BY c.embedding <=> $1::halfvec LIMIT $2
                 """,
                 [query_embedding_str, limit]
             )
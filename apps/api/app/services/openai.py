@@ -1,11 +1,16 @@
 import os
 import time
-import json
-from typing import List, Dict, Any, Optional, Union, Callable, AsyncGenerator
+import asyncio
+import functools
+import orjson
+from typing import List, Dict, Any, Optional, Union, Callable, AsyncGenerator, Tuple, Set
 import logging
+import httpx
+import numpy as np
+import tiktoken
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import openai
-from openai import OpenAI, AsyncOpenAI
+from openai import AsyncOpenAI
 
 from app.core.config import settings
 
@@ -13,6 +18,321 @@ from app.core.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Structured output schema for generated quiz questions. Strict mode requires
+# every property to be listed in "required" and does not support "oneOf".
+QUIZ_SCHEMA = {
+    "name": "quiz",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "questions": {
+                "type": "array",
+                "items": {
+                    "anyOf": [
+                        {
+                            "type": "object",
+                            "properties": {
+                                "question_text": {"type": "string"},
+                                "question_type": {"type": "string", "enum": ["multiple_choice"]},
+                                "options": {"type": "array", "items": {"type": "string"}},
+                                "correct_answer": {"type": "string"},
+                                "explanation": {"type": "string"}
+                            },
+                            "required": ["question_text", "question_type", "options", "correct_answer", "explanation"],
+                            "additionalProperties": False
+                        },
+                        {
+                            "type": "object",
+                            "properties": {
+                                "question_text": {"type": "string"},
+                                "question_type": {"type": "string", "enum": ["true_false"]},
+                                "correct_answer": {"type": "boolean"},
+                                "explanation": {"type": "string"}
+                            },
+                            "required": ["question_text", "question_type", "correct_answer", "explanation"],
+                            "additionalProperties": False
+                        },
+                        {
+                            "type": "object",
+                            "properties": {
+                                "question_text": {"type": "string"},
+                                "question_type": {"type": "string", "enum": ["short_answer", "fill_in_blank", "matching"]},
+                                "correct_answer": {"type": "string"},
+                                "explanation": {"type": "string"}
+                            },
+                            "required": ["question_text", "question_type", "correct_answer", "explanation"],
+                            "additionalProperties": False
+                        }
+                    ]
+                }
+            }
+        },
+        "required": ["questions"],
+        "additionalProperties": False
+    }
+}
+
+# HTTP connection pool shared by all async OpenAI clients, created on first use
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+# Seconds between reports of the pool's connection counts
+HTTP_POOL_METRICS_INTERVAL = 60.0
+_shared_http_transport: Optional[httpx.AsyncHTTPTransport] = None
+_shared_http_client: Optional[httpx.AsyncClient] = None
+
+def _get_shared_http_client() -> httpx.AsyncClient:
+    """Get the process-wide HTTP client used by async OpenAI clients."""
+    global _shared_http_client, _shared_http_transport
+    if _shared_http_client is None:
+        _shared_http_transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS)
+        )
+        _shared_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            transport=_shared_http_transport
+        )
+    return _shared_http_client
+
+def get_connection_pool_stats() -> Dict[str, int]:
+    """Get connection counts of the shared HTTP pool.
+    
+    Returns:
+        Dictionary with total, active and idle connection counts
+    """
+    stats = {"total": 0, "active": 0, "idle": 0}
+    if _shared_http_transport is None:
+        return stats
+    
+    try:
+        # httpx does not expose its httpcore pool, so read it from the transport we built
+        connections = _shared_http_transport._pool.connections
+        stats["total"] = len(connections)
+        stats["idle"] = sum(1 for connection in connections if connection.is_idle())
+        stats["active"] = stats["total"] - stats["idle"]
+    except Exception as e:
+        logger.warning(f"Could not read HTTP connection pool stats: {str(e)}")
+    return stats
+
+# Context window sizes (in tokens) used to reject over-length requests before
+# sending them. Models are matched by exact name first, then by prefix.
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106-preview": 128000,
+    "gpt-4-0125-preview": 128000,
+    "gpt-4-vision-preview": 128000,
+    "gpt-4o": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+
+# Approximate per-message token overhead of the chat format
+MESSAGE_TOKEN_OVERHEAD = 4
+
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Optional["tiktoken.Encoding"]:
+    """Get the tiktoken encoding for a model, or None if it cannot be loaded."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding for {model}: {str(e)}")
+        return None
+
+def _get_context_window(model: str) -> Optional[int]:
+    """Get the context window of a model, or None if unknown."""
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    # Match dated and sized variants such as gpt-4o-mini, but not other
+    # families that share a prefix such as gpt-4.1
+    prefixes = [name for name in MODEL_CONTEXT_WINDOWS if model.startswith(name + "-")]
+    return MODEL_CONTEXT_WINDOWS[max(prefixes, key=len)] if prefixes else None
+
+# Default quiz generation prompt. The static instructions come first so that
+# the prompt prefix is identical across calls and can be cached by the API.
+QUIZ_SYSTEM_MESSAGE_TEMPLATE = """
+You are an expert quiz generator for educational content.
+
+For multiple choice questions, provide 4 options with 1 correct answer.
+For true/false questions, provide a statement and whether it's true or false.
+
+Return the questions in the "questions" list of the response.
+
+Generate {num_questions} {difficulty} difficulty questions based on the provided content.
+Use the following question types: {question_types}.
+"""
+
+@functools.lru_cache(maxsize=64)
+def _build_quiz_system_message(num_questions: int, difficulty: str, question_types: Tuple[str, ...]) -> str:
+    """Build the default quiz system message, reusing identical strings for equal inputs."""
+    return QUIZ_SYSTEM_MESSAGE_TEMPLATE.format(
+        num_questions=num_questions,
+        difficulty=difficulty,
+        question_types=", ".join(question_types)
+    )
+
+class SemanticCache:
+    """In-memory cache of completions keyed by the embedding of their prompt."""
+    
+    def __init__(self, threshold: float = 0.97, max_entries: int = 1024):
+        """Initialize the cache.
+        
+        Args:
+            threshold: Minimum cosine similarity for a cached response to be reused
+            max_entries: Maximum number of cached responses; the oldest are evicted first
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embeddings: Optional[np.ndarray] = None
+        self._responses: List[str] = []
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def lookup(self, embedding: List[float]) -> Optional[str]:
+        """Get the cached response for the most similar prompt, if similar enough.
+        
+        Args:
+            embedding: Embedding of the prompt
+            
+        Returns:
+            The cached response, or None on a miss
+        """
+        if self._embeddings is None:
+            return None
+        
+        similarities = self._embeddings @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return self._responses[best]
+        return None
+    
+    def add(self, embedding: List[float], response: str) -> None:
+        """Add a response to the cache.
+        
+        Args:
+            embedding: Embedding of the prompt
+            response: Generated response for the prompt
+        """
+        vector = self._normalize(embedding)[np.newaxis, :]
+        if self._embeddings is None:
+            self._embeddings = vector
+        else:
+            self._embeddings = np.vstack([self._embeddings, vector])[-self.max_entries:]
+        self._responses = (self._responses + [response])[-self.max_entries:]
+
+class EmbeddingBatcher:
+    """Coalesce single-text embedding requests made close together into batched calls."""
+    
+    def __init__(self, service: "OpenAIService", window: float = 0.05, max_tokens: int = 8000, max_concurrency: int = 4):
+        """Initialize the batcher.
+        
+        Args:
+            service: Service whose generate_embeddings sends the batched requests
+            window: Seconds to wait for more texts after the first one is queued
+            max_tokens: Approximate token budget of a single embeddings request
+            max_concurrency: Most embeddings requests in flight at once
+        """
+        self.service = service
+        self.window = window
+        self.max_tokens = max_tokens
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.pending: List[Tuple[str, asyncio.Future]] = []
+        self.scheduled = False
+        self.flush_tasks: Set[asyncio.Task] = set()
+    
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text and wait for its embedding.
+        
+        Args:
+            text: Text to embed
+            
+        Returns:
+            The text's embedding
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((text, future))
+        
+        if not self.scheduled:
+            self.scheduled = True
+            loop.call_later(self.window, self._start_flush)
+        
+        return await future
+    
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts right away, split into requests within the token budget.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            The texts' embeddings, in the same order
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        self.pending.extend(zip(texts, futures))
+        await self.flush()
+        return list(await asyncio.gather(*futures))
+    
+    def _start_flush(self):
+        """Start a flush task, keeping a reference until it finishes."""
+        task = asyncio.ensure_future(self.flush())
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+    
+    def _count_tokens(self, text: str) -> int:
+        """Count the tokens of a text, estimating when no encoding is available."""
+        encoding = _get_encoding(self.service.embedding_model)
+        # Special tokens such as <|endoftext|> are counted as plain text
+        return len(encoding.encode(text, disallowed_special=())) if encoding else len(text) // 4
+    
+    async def flush(self):
+        """Send all queued texts in as few requests as the token budget allows."""
+        pending, self.pending, self.scheduled = self.pending, [], False
+        
+        try:
+            batches: List[List[Tuple[str, asyncio.Future]]] = []
+            batch_tokens = 0
+            for text, future in pending:
+                tokens = self._count_tokens(text)
+                if not batches or batch_tokens + tokens > self.max_tokens:
+                    batches.append([])
+                    batch_tokens = 0
+                batches[-1].append((text, future))
+                batch_tokens += tokens
+        except Exception as e:
+            # Fail every waiter rather than leaving them unresolved
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        await asyncio.gather(*(self._send(batch) for batch in batches))
+    
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Embed one batch of texts and resolve their futures."""
+        try:
+            async with self.semaphore:
+                embeddings = await self.service.generate_embeddings([text for text, _ in batch])
+            if len(embeddings) != len(batch):
+                raise ValueError(f"Expected {len(batch)} embeddings, got {len(embeddings)}")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
 class OpenAIService:
     """Service for interacting with OpenAI API."""
     
@@ -22,20 +342,34 @@ class OpenAIService:
         if not self.api_key:
             logger.warning("OpenAI API key not found. AI features will not work.")
         
-        # Initialize synchronous and asynchronous clients
-        self.client = OpenAI(api_key=self.api_key)
-        self.async_client = AsyncOpenAI(api_key=self.api_key)
-        
         # Default models and settings
         self.model = settings.OPENAI_MODEL
         self.embedding_model = settings.OPENAI_EMBEDDING_MODEL
+        self.embedding_dimensions = settings.OPENAI_EMBEDDING_DIMENSIONS
         self.vision_model = getattr(settings, 'OPENAI_VISION_MODEL', 'gpt-4-vision-preview')
         self.max_retries = 3
         self.request_timeout = 60  # seconds
+        self.max_concurrent_requests = 8  # upper bound for concurrent fan-out requests
         
         # Rate limiting settings
         self.rate_limit_min_pause = 0.1  # minimum pause between requests in seconds
         self.rate_limit_backoff = 2.0  # exponential backoff factor for rate limits
+        
+        # Streaming settings
+        self.stream_buffer_bytes = 4096  # flush buffered deltas once this many characters accumulate
+        self.stream_flush_ms = 25  # flush buffered deltas at least this often
+        
+        # Semantic cache for low-temperature completions
+        self.semantic_cache_max_temperature = 0.3
+        self.semantic_cache = SemanticCache(
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES
+        ) if settings.ENABLE_SEMANTIC_CACHE else None
+    
+    @functools.cached_property
+    def async_client(self) -> AsyncOpenAI:
+        """Asynchronous OpenAI client, created on first use on the shared HTTP pool."""
+        return AsyncOpenAI(api_key=self.api_key, http_client=_get_shared_http_client())
     
     @retry(retry=retry_if_exception_type((openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)),
            stop=stop_after_attempt(3),
@@ -45,6 +379,8 @@ class OpenAIService:
         if not self.api_key:
             raise ValueError("OpenAI API key not configured")
         
+        self._check_context_length(self.model, [system_message or "", prompt], max_tokens)
+        
         try:
             messages = []
             if system_message:
@@ -52,6 +388,14 @@ class OpenAIService:
             
             messages.append({"role": "user", "content": prompt})
             
+            # Only reuse responses for near-deterministic requests
+            embedding = None
+            if self.semantic_cache is not None and temperature <= self.semantic_cache_max_temperature:
+                embedding = await self._get_cache_embedding(f"{system_message or ''}\n{prompt}")
+                cached = self.semantic_cache.lookup(embedding) if embedding else None
+                if cached is not None:
+                    return cached
+            
             response = await self.async_client.chat.completions.create(
                 model=self.model,
                 messages=messages,
@@ -60,10 +404,14 @@ class OpenAIService:
                 timeout=self.request_timeout
             )
             
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            if embedding:
+                self.semantic_cache.add(embedding, content)
+            
+            return content
         except openai.RateLimitError as e:
             logger.warning(f"Rate limit exceeded: {str(e)}. Retrying with exponential backoff.")
-            time.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
+            await asyncio.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
             raise
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -72,6 +420,60 @@ class OpenAIService:
             logger.error(f"Error generating completion: {str(e)}")
             raise
             
+    async def log_connection_pool_metrics(self) -> bool:
+        """Log the shared HTTP connection pool usage as performance metrics.
+        
+        Returns:
+            True if all metrics were logged, False otherwise
+        """
+        from app.services.performance_monitoring import performance_monitoring_service
+        
+        stats = get_connection_pool_stats()
+        results = [
+            await performance_monitoring_service.log_performance_metric(
+                f"openai_http_connections_{state}", count, {"max_connections": HTTP_MAX_CONNECTIONS}
+            )
+            for state, count in stats.items()
+        ]
+        return all(results)
+    
+    async def report_connection_pool_metrics(self, interval: float = HTTP_POOL_METRICS_INTERVAL) -> None:
+        """Log the shared HTTP pool usage every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.log_connection_pool_metrics()
+    
+    def _check_context_length(self, model: str, texts: List[str], max_tokens: int) -> None:
+        """Raise early if a request cannot fit in the model's context window.
+        
+        Args:
+            model: Model the request will be sent to
+            texts: Text content of the request messages
+            max_tokens: Maximum tokens requested for the completion
+            
+        Raises:
+            ValueError: If the prompt plus max_tokens exceeds the context window
+        """
+        context_window = _get_context_window(model)
+        encoding = _get_encoding(model) if context_window else None
+        if encoding is None:
+            return
+        
+        prompt_tokens = sum(len(encoding.encode(text, disallowed_special=())) + MESSAGE_TOKEN_OVERHEAD for text in texts)
+        if prompt_tokens + max_tokens > context_window:
+            raise ValueError(
+                f"Request needs {prompt_tokens} prompt tokens + {max_tokens} completion tokens, "
+                f"exceeding the {context_window} token context window of {model}"
+            )
+    
+    async def _get_cache_embedding(self, text: str) -> Optional[List[float]]:
+        """Embed text for a semantic cache lookup, or None if embedding fails."""
+        try:
+            return (await self.generate_embeddings([text]))[0]
+        except Exception as e:
+            logger.warning(f"Skipping semantic cache, embedding failed: {str(e)}")
+            return None
+    
     async def generate_completion_with_functions(
         self, 
         prompt: str, 
@@ -124,13 +526,13 @@ class OpenAIService:
             if hasattr(message, 'function_call') and message.function_call:
                 result["function_call"] = {
                     "name": message.function_call.name,
-                    "arguments": json.loads(message.function_call.arguments)
+                    "arguments": orjson.loads(message.function_call.arguments)
                 }
                 
             return result
         except openai.RateLimitError as e:
             logger.warning(f"Rate limit exceeded: {str(e)}. Retrying with exponential backoff.")
-            time.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
+            await asyncio.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
             raise
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -176,12 +578,31 @@ class OpenAIService:
                 stream=True
             )
             
+            # Coalesce deltas into larger chunks to cut per-chunk overhead downstream.
+            # last_flush starts at 0 so the first delta is yielded immediately.
+            buf: List[str] = []
+            buf_len = 0
+            last_flush = 0.0
+            flush_interval = self.stream_flush_ms / 1000
+            
             async for chunk in stream:
                 if chunk.choices and chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+                    delta = chunk.choices[0].delta.content
+                    buf.append(delta)
+                    buf_len += len(delta)
+                    
+                    now = time.monotonic()
+                    if buf_len >= self.stream_buffer_bytes or now - last_flush >= flush_interval:
+                        yield "".join(buf)
+                        buf.clear()
+                        buf_len = 0
+                        last_flush = now
+            
+            if buf:
+                yield "".join(buf)
         except openai.RateLimitError as e:
             logger.warning(f"Rate limit exceeded: {str(e)}. Retrying with exponential backoff.")
-            time.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
+            await asyncio.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
             raise
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -192,7 +613,7 @@ class OpenAIService:
             
     async def process_image(
         self, 
-        image_url: str, 
+        image_url: Union[str, List[str]], 
         prompt: str, 
         system_message: str = None, 
         temperature: float = 0.7, 
@@ -201,7 +622,8 @@ class OpenAIService:
         """Process an image and generate a response using OpenAI's vision capabilities.
         
         Args:
-            image_url: URL of the image to process (can be a local file:// URL)
+            image_url: URL of the image to process (can be a local file:// URL), or a
+                list of URLs to send together in a single request
             prompt: The user prompt about the image
             system_message: Optional system message
             temperature: Temperature for generation
@@ -213,17 +635,20 @@ class OpenAIService:
         if not self.api_key:
             raise ValueError("OpenAI API key not configured")
         
+        self._check_context_length(self.vision_model, [system_message or "", prompt], max_tokens)
+        
         try:
             messages = []
             if system_message:
                 messages.append({"role": "system", "content": system_message})
             
-            # Add the image and prompt to the user message
+            # Add the images and prompt to the user message
+            image_urls = [image_url] if isinstance(image_url, str) else image_url
             messages.append({
                 "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": image_url}}
+                "content": [{"type": "text", "text": prompt}] + [
+                    {"type": "image_url", "image_url": {"url": url}}
+                    for url in image_urls
                 ]
             })
             
@@ -238,7 +663,7 @@ class OpenAIService:
             return response.choices[0].message.content
         except openai.RateLimitError as e:
             logger.warning(f"Rate limit exceeded: {str(e)}. Retrying with exponential backoff.")
-            time.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
+            await asyncio.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
             raise
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -247,6 +672,34 @@ class OpenAIService:
             logger.error(f"Error processing image: {str(e)}")
             raise
     
+    async def process_images(
+        self, 
+        image_urls: List[str], 
+        prompt: str, 
+        system_message: str = None, 
+        temperature: float = 0.7, 
+        max_tokens: int = 1000
+    ) -> List[str]:
+        """Process several images concurrently with the same prompt.
+        
+        Args:
+            image_urls: URLs of the images to process
+            prompt: The user prompt about each image
+            system_message: Optional system message
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate per image
+            
+        Returns:
+            Generated responses, in the same order as image_urls
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        
+        async def process_one(image_url: str) -> str:
+            async with semaphore:
+                return await self.process_image(image_url, prompt, system_message, temperature, max_tokens)
+        
+        return await asyncio.gather(*(process_one(url) for url in image_urls))
+    
     @retry(retry=retry_if_exception_type((openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)),
            stop=stop_after_attempt(3),
            wait=wait_exponential(multiplier=1, min=2, max=10))
@@ -259,13 +712,14 @@ class OpenAIService:
             response = await self.async_client.embeddings.create(
                 model=self.embedding_model,
                 input=texts,
+                dimensions=self.embedding_dimensions,
                 timeout=self.request_timeout
             )
             
             return [data.embedding for data in response.data]
         except openai.RateLimitError as e:
             logger.warning(f"Rate limit exceeded: {str(e)}. Retrying with exponential backoff.")
-            time.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
+            await asyncio.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
             raise
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -277,7 +731,7 @@ class OpenAIService:
     @retry(retry=retry_if_exception_type((openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)),
            stop=stop_after_attempt(3),
            wait=wait_exponential(multiplier=1, min=2, max=10))
-    async def generate_quiz_questions(self, content: str, num_questions: int = 5, question_types: List[str] = None, difficulty: str = "medium", system_message: str = None) -> List[Dict[str, Any]]:
+    async def generate_quiz_questions(self, content: str, num_questions: int = 5, question_types: List[str] = None, difficulty: str = "medium", system_message: str = None, instructions: str = None) -> List[Dict[str, Any]]:
         """Generate quiz questions from content.
         
         Args:
@@ -286,6 +740,8 @@ class OpenAIService:
             question_types: Types of questions to generate (multiple_choice, true_false, etc.)
             difficulty: Difficulty level (easy, medium, hard)
             system_message: Optional custom system message for quiz generation
+            instructions: Optional per-call instructions, sent before the content in
+                the user message so the system message stays cacheable
             
         Returns:
             List of generated quiz questions
@@ -293,81 +749,15 @@ class OpenAIService:
         if not self.api_key:
             raise ValueError("OpenAI API key not configured")
         
-        if question_types is None:
-            question_types = ["multiple_choice", "true_false"]
-        
-        # Use provided system message or default
-        if not system_message:
-            system_message = f"""
-            You are an expert quiz generator for educational content. 
-            Generate {num_questions} {difficulty} difficulty questions based on the provided content.
-            Use the following question types: {', '.join(question_types)}.
-            
-            For multiple choice questions, provide 4 options with 1 correct answer.
-            For true/false questions, provide a statement and whether it's true or false.
-            
-            Return the questions in the following JSON format:
-            [
-                {{
-                    "question_text": "Question text",
-                    "question_type": "multiple_choice",
-                    "options": ["Option A", "Option B", "Option C", "Option D"],
-                    "correct_answer": "Option A",
-                    "explanation": "Explanation of the correct answer"
-                }},
-                {{
-                    "question_text": "Statement",
-                    "question_type": "true_false",
-                    "correct_answer": true,
-                    "explanation": "Explanation of why the statement is true/false"
-                }}
-            ]
-            """
+        request = self._quiz_request(content, num_questions, question_types, difficulty, system_message, instructions)
         
         try:
-            user_content = f"Content: {content}\n\nGenerate quiz questions based on this content."
-            
-            response = await self.async_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=0.7,
-                max_tokens=2000,
-                response_format={"type": "json_object"},
-                timeout=self.request_timeout
-            )
-            
-            result = response.choices[0].message.content
-            
-            # Parse JSON string to Python object
-            try:
-                parsed_result = json.loads(result)
-                
-                # Handle different possible JSON structures
-                if "questions" in parsed_result:
-                    questions = parsed_result["questions"]
-                elif isinstance(parsed_result, list):
-                    questions = parsed_result
-                else:
-                    # Try to find any list in the response
-                    for key, value in parsed_result.items():
-                        if isinstance(value, list) and len(value) > 0:
-                            questions = value
-                            break
-                    else:
-                        questions = []
-                        logger.warning(f"Unexpected JSON structure in quiz generation: {result}")
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing quiz questions JSON: {str(e)}")
-                questions = []
-                
-            return questions
+            response = await self.async_client.chat.completions.create(**request, timeout=self.request_timeout)
+            return self._parse_quiz_questions(response.choices[0].message.content)
             
         except openai.RateLimitError as e:
             logger.warning(f"Rate limit exceeded: {str(e)}. Retrying with exponential backoff.")
-            time.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
+            await asyncio.sleep(self.rate_limit_min_pause * self.rate_limit_backoff)
             raise
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -376,5 +766,122 @@ class OpenAIService:
             logger.error(f"Error generating quiz questions: {str(e)}")
             raise
 
+    def _quiz_request(
+        self,
+        content: str,
+        num_questions: int = 5,
+        question_types: List[str] = None,
+        difficulty: str = "medium",
+        system_message: str = None,
+        instructions: str = None
+    ) -> Dict[str, Any]:
+        """Build the chat completions request body for quiz generation."""
+        if question_types is None:
+            question_types = ["multiple_choice", "true_false"]
+        
+        # Use provided system message or default
+        if not system_message:
+            system_message = _build_quiz_system_message(num_questions, difficulty, tuple(sorted(question_types)))
+        
+        user_content = f"Content: {content}\n\nGenerate quiz questions based on this content."
+        if instructions:
+            user_content = f"{instructions}\n{user_content}"
+        self._check_context_length(self.model, [system_message, user_content], 2000)
+        
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_content}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 2000,
+            "response_format": {"type": "json_schema", "json_schema": QUIZ_SCHEMA}
+        }
+    
+    def _parse_quiz_questions(self, result: str) -> List[Dict[str, Any]]:
+        """Parse the questions from a quiz generation response."""
+        # The schema guarantees the shape; decoding only fails on truncated output
+        try:
+            return orjson.loads(result)["questions"]
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Error parsing quiz questions JSON: {str(e)}")
+            return []
+    
+    async def submit_quiz_batch(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        """Submit several quiz generations as one OpenAI Batch job.
+        
+        Batch jobs cost half as much as live requests and have separate rate
+        limits, but complete asynchronously within 24 hours.
+        
+        Args:
+            requests: Arguments of generate_quiz_questions, keyed by a custom ID
+                that identifies each result
+            
+        Returns:
+            ID of the submitted batch
+        """
+        if not self.api_key:
+            raise ValueError("OpenAI API key not configured")
+        
+        lines = [
+            orjson.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._quiz_request(**params)
+            })
+            for custom_id, params in requests.items()
+        ]
+        
+        batch_file = await self.async_client.files.create(
+            file=("quiz_batch.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = await self.async_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+    
+    async def get_quiz_batch_results(self, batch_id: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Get the questions generated by a quiz batch job.
+        
+        Args:
+            batch_id: ID returned by submit_quiz_batch
+            
+        Returns:
+            Questions keyed by custom ID, with an empty list for failed requests,
+            or None while the batch is still running
+            
+        Raises:
+            RuntimeError: If the batch failed, expired or was cancelled
+        """
+        batch = await self.async_client.batches.retrieve(batch_id)
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"Quiz batch {batch_id} ended with status {batch.status}")
+        if batch.status != "completed":
+            return None
+        
+        # Successful requests are in the output file and failed ones in the
+        # error file; either is missing when no request landed in it
+        file_ids = [file_id for file_id in (batch.output_file_id, batch.error_file_id) if file_id]
+        files = await asyncio.gather(*(self.async_client.files.content(file_id) for file_id in file_ids))
+        
+        results = {}
+        for line in [line for output in files for line in output.text.splitlines() if line]:
+            item = orjson.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                logger.error(f"Quiz batch request {item['custom_id']} failed: {item.get('error')}")
+                results[item["custom_id"]] = []
+                continue
+            results[item["custom_id"]] = self._parse_quiz_questions(response["body"]["choices"][0]["message"]["content"])
+        return results
+
 # Create a singleton instance of the OpenAIService
 openai_service = OpenAIService()
+
+# Shared batcher for single-text embedding requests
+embedding_batcher = EmbeddingBatcher(openai_service)
@@ -1,9 +1,11 @@
 from typing import List, Dict, Any, Optional, TYPE_CHECKING
+import asyncio
 import logging
 from datetime import datetime, timedelta
-import json
-import statistics
+import orjson
+from prisma import Json
 from app.services.prisma import prisma
+from app.services.cache import ttl_cache
 from app.core.config import settings
 
 # Use TYPE_CHECKING to avoid circular imports
@@ -14,9 +16,30 @@ if TYPE_CHECKING:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared FROM/WHERE clause for organization-scoped AI interaction metrics.
+# Parameters: $1 = organization ID, $2 = start of the time period.
+ORG_INTERACTIONS_SQL = """
+FROM ai_interactions ai
+JOIN users u ON u.id = ai."userId"
+WHERE u."organizationId" = $1
+AND ai."createdAt" >= $2::timestamp
+"""
+
+# Performance metrics are queued and written to the database in batches
+METRIC_QUEUE_SIZE = 10_000
+METRIC_BATCH_SIZE = 100
+METRIC_FLUSH_INTERVAL = 1.0  # seconds
+# Queued by flush_metrics to stop the writer once everything before it is written
+_STOP_WRITER = object()
+
 class PerformanceMonitoringService:
     """Service for monitoring AI performance metrics."""
     
+    def __init__(self):
+        """Initialize the metric queue state; the writer task starts on first use."""
+        self._metric_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+    
     async def log_performance_metric(self, metric_name: str, value: float, metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Log a performance metric for monitoring.
         
@@ -29,17 +52,84 @@ class PerformanceMonitoringService:
             True if logging was successful, False otherwise
         """
         try:
-            # In a real implementation, you would have a dedicated table for metrics
-            # For now, we'll use a simple logging approach
-            logger.info(f"Performance metric: {metric_name}={value}, metadata={metadata}")
+            logger.info(f"Performance metric: {metric_name}={value}, metadata={orjson.dumps(metadata, default=str).decode()}")
             
-            # You could also store metrics in a time-series database or monitoring service
-            # For this implementation, we'll return success
+            # Queue the metric for the background writer instead of writing inline
+            self._ensure_metric_writer()
+            self._metric_queue.put_nowait({
+                "name": metric_name,
+                "value": float(value),
+                "metadata": Json(metadata or {}),
+                "created_at": datetime.utcnow()
+            })
             return True
+        except asyncio.QueueFull:
+            logger.warning(f"Performance metric queue full, dropping metric: {metric_name}")
+            return False
         except Exception as e:
             logger.error(f"Error logging performance metric: {str(e)}")
             return False
     
+    async def flush_metrics(self) -> None:
+        """Stop the background writer and write any queued metrics.
+        
+        The writer finishes the batch it is collecting or writing and
+        everything queued before the stop marker, then exits.
+        """
+        if self._writer_task is not None:
+            if not self._writer_task.done():
+                await self._metric_queue.put(_STOP_WRITER)
+            await self._writer_task
+            self._writer_task = None
+        
+        if self._metric_queue is not None:
+            batch = []
+            while not self._metric_queue.empty():
+                batch.append(self._metric_queue.get_nowait())
+            if batch:
+                await self._write_metrics(batch)
+    
+    def _ensure_metric_writer(self) -> None:
+        """Create the metric queue and start the background writer if needed."""
+        if self._metric_queue is None:
+            self._metric_queue = asyncio.Queue(maxsize=METRIC_QUEUE_SIZE)
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._drain_metrics())
+    
+    async def _drain_metrics(self) -> None:
+        """Write queued metrics in batches of up to METRIC_BATCH_SIZE every METRIC_FLUSH_INTERVAL."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            metric = await self._metric_queue.get()
+            if metric is _STOP_WRITER:
+                return
+            batch = [metric]
+            deadline = loop.time() + METRIC_FLUSH_INTERVAL
+            
+            while len(batch) < METRIC_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    metric = await asyncio.wait_for(self._metric_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if metric is _STOP_WRITER:
+                    stopping = True
+                    break
+                batch.append(metric)
+            
+            await self._write_metrics(batch)
+    
+    async def _write_metrics(self, batch: List[Dict[str, Any]]) -> None:
+        """Insert a batch of metrics, logging rather than raising on failure."""
+        try:
+            await prisma.performancemetric.create_many(data=batch)
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} performance metrics: {str(e)}")
+    
+    @ttl_cache(ttl=settings.METRICS_CACHE_TTL, namespace="metrics")
     async def get_response_time_metrics(self, organization_id: str, time_period: str = "day") -> Dict[str, Any]:
         """Get response time metrics for AI interactions.
         
@@ -62,59 +152,47 @@ class PerformanceMonitoringService:
             else:
                 start_date = now - timedelta(days=1)  # Default to day
             
-            # Get all users in the organization
-            users = await prisma.user.find_many(
-                where={"organization_id": organization_id}
-            )
-            user_ids = [user.id for user in users]
-            
-            if not user_ids:
-                return {"error": "No users found in organization"}
-            
-            # Get AI interactions for these users in the time period
-            interactions = await prisma.aiinteraction.find_many(
-                where={
-                    "user_id": {"in": user_ids},
-                    "created_at": {"gte": start_date}
-                }
+            # Aggregate in the database over the denormalized response_time_ms column
+            rows = await prisma.query_raw(
+                f"""
+                SELECT
+                    count(*)::int AS count,
+                    avg(ai.response_time_ms)::float AS average_ms,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY ai.response_time_ms) AS median_ms,
+                    min(ai.response_time_ms)::float AS min_ms,
+                    max(ai.response_time_ms)::float AS max_ms,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY ai.response_time_ms) AS p95_ms,
+                    percentile_cont(0.99) WITHIN GROUP (ORDER BY ai.response_time_ms) AS p99_ms
+                {ORG_INTERACTIONS_SQL}
+                AND ai.response_time_ms IS NOT NULL
+                """,
+                organization_id,
+                start_date
             )
+            metrics = rows[0] if rows else {}
             
-            # Extract response times from metadata
-            response_times = []
-            for interaction in interactions:
-                metadata = interaction.metadata or {}
-                if "response_time_ms" in metadata:
-                    response_times.append(metadata["response_time_ms"])
-            
-            if not response_times:
+            if not metrics.get("count"):
                 return {
                     "time_period": time_period,
                     "count": 0,
                     "message": "No response time data available"
                 }
             
-            # Calculate metrics
-            avg_response_time = statistics.mean(response_times)
-            median_response_time = statistics.median(response_times)
-            min_response_time = min(response_times)
-            max_response_time = max(response_times)
-            p95_response_time = self._percentile(response_times, 95)
-            p99_response_time = self._percentile(response_times, 99)
-            
             return {
                 "time_period": time_period,
-                "count": len(response_times),
-                "average_ms": round(avg_response_time, 2),
-                "median_ms": round(median_response_time, 2),
-                "min_ms": round(min_response_time, 2),
-                "max_ms": round(max_response_time, 2),
-                "p95_ms": round(p95_response_time, 2),
-                "p99_ms": round(p99_response_time, 2)
+                "count": metrics["count"],
+                "average_ms": round(metrics["average_ms"], 2),
+                "median_ms": round(metrics["median_ms"], 2),
+                "min_ms": round(metrics["min_ms"], 2),
+                "max_ms": round(metrics["max_ms"], 2),
+                "p95_ms": round(metrics["p95_ms"], 2),
+                "p99_ms": round(metrics["p99_ms"], 2)
             }
         except Exception as e:
             logger.error(f"Error getting response time metrics: {str(e)}")
             return {"error": f"Failed to get response time metrics: {str(e)}"}
     
+    @ttl_cache(ttl=settings.METRICS_CACHE_TTL, namespace="metrics")
     async def get_error_rate_metrics(self, organization_id: str, time_period: str = "day") -> Dict[str, Any]:
         """Get error rate metrics for AI interactions.
         
@@ -137,31 +215,20 @@ class PerformanceMonitoringService:
             else:
                 start_date = now - timedelta(days=1)  # Default to day
             
-            # Get all users in the organization
-            users = await prisma.user.find_many(
-                where={"organization_id": organization_id}
-            )
-            user_ids = [user.id for user in users]
-            
-            if not user_ids:
-                return {"error": "No users found in organization"}
-            
-            # Get total AI interactions for these users in the time period
-            total_interactions = await prisma.aiinteraction.count(
-                where={
-                    "user_id": {"in": user_ids},
-                    "created_at": {"gte": start_date}
-                }
-            )
-            
-            # Get error interactions
-            error_interactions = await prisma.aiinteraction.count(
-                where={
-                    "user_id": {"in": user_ids},
-                    "created_at": {"gte": start_date},
-                    "metadata": {"path": ["error"], "not": None}
-                }
+            # Count total and error interactions in a single pass
+            rows = await prisma.query_raw(
+                f"""
+                SELECT
+                    count(*)::int AS total,
+                    count(*) FILTER (WHERE ai.error_flag)::int AS errors
+                {ORG_INTERACTIONS_SQL}
+                """,
+                organization_id,
+                start_date
             )
+            counts = rows[0] if rows else {}
+            total_interactions = counts.get("total", 0)
+            error_interactions = counts.get("errors", 0)
             
             if total_interactions == 0:
                 return {
@@ -185,6 +252,7 @@ class PerformanceMonitoringService:
             logger.error(f"Error getting error rate metrics: {str(e)}")
             return {"error": f"Failed to get error rate metrics: {str(e)}"}
     
+    @ttl_cache(ttl=settings.METRICS_CACHE_TTL, namespace="metrics")
     async def get_token_usage_metrics(self, organization_id: str, time_period: str = "day") -> Dict[str, Any]:
         """Get token usage metrics for AI interactions.
         
@@ -207,24 +275,23 @@ class PerformanceMonitoringService:
             else:
                 start_date = now - timedelta(days=1)  # Default to day
             
-            # Get all users in the organization
-            users = await prisma.user.find_many(
-                where={"organization_id": organization_id}
+            # Group token usage by interaction type in the database
+            rows = await prisma.query_raw(
+                f"""
+                SELECT
+                    COALESCE(ai.interaction_type, 'unknown') AS interaction_type,
+                    count(*)::int AS count,
+                    COALESCE(sum(ai.tokens_used), 0)::int AS tokens
+                {ORG_INTERACTIONS_SQL}
+                GROUP BY 1
+                """,
+                organization_id,
+                start_date
             )
-            user_ids = [user.id for user in users]
             
-            if not user_ids:
-                return {"error": "No users found in organization"}
+            total_interactions = sum(row["count"] for row in rows)
             
-            # Get AI interactions for these users in the time period
-            interactions = await prisma.aiinteraction.find_many(
-                where={
-                    "user_id": {"in": user_ids},
-                    "created_at": {"gte": start_date}
-                }
-            )
-            
-            if not interactions:
+            if not total_interactions:
                 return {
                     "time_period": time_period,
                     "total_interactions": 0,
@@ -232,33 +299,18 @@ class PerformanceMonitoringService:
                 }
             
             # Calculate token usage metrics
-            total_tokens = sum(i.tokens_used or 0 for i in interactions)
-            avg_tokens_per_interaction = total_tokens / len(interactions)
-            
-            # Group by interaction type
-            token_usage_by_type = {}
-            for interaction in interactions:
-                interaction_type = interaction.interaction_type or "unknown"
-                tokens = interaction.tokens_used or 0
-                
-                if interaction_type not in token_usage_by_type:
-                    token_usage_by_type[interaction_type] = {
-                        "count": 0,
-                        "tokens": 0
-                    }
-                
-                token_usage_by_type[interaction_type]["count"] += 1
-                token_usage_by_type[interaction_type]["tokens"] += tokens
+            total_tokens = sum(row["tokens"] for row in rows)
+            avg_tokens_per_interaction = total_tokens / total_interactions
             
             # Format token usage by type for response
             token_usage_list = [
                 {
-                    "interaction_type": interaction_type,
-                    "count": data["count"],
-                    "total_tokens": data["tokens"],
-                    "avg_tokens": round(data["tokens"] / data["count"], 2) if data["count"] > 0 else 0
+                    "interaction_type": row["interaction_type"],
+                    "count": row["count"],
+                    "total_tokens": row["tokens"],
+                    "avg_tokens": round(row["tokens"] / row["count"], 2) if row["count"] > 0 else 0
                 }
-                for interaction_type, data in token_usage_by_type.items()
+                for row in rows
             ]
             
             # Sort by total tokens (highest first)
@@ -266,7 +318,7 @@ class PerformanceMonitoringService:
             
             return {
                 "time_period": time_period,
-                "total_interactions": len(interactions),
+                "total_interactions": total_interactions,
                 "total_tokens": total_tokens,
                 "avg_tokens_per_interaction": round(avg_tokens_per_interaction, 2),
                 "token_usage_by_type": token_usage_list
@@ -274,32 +326,6 @@ class PerformanceMonitoringService:
         except Exception as e:
             logger.error(f"Error getting token usage metrics: {str(e)}")
             return {"error": f"Failed to get token usage metrics: {str(e)}"}
-    
-    def _percentile(self, data: List[float], percentile: float) -> float:
-        """Calculate the percentile of a list of values.
-        
-        Args:
-            data: List of values
-            percentile: Percentile to calculate (0-100)
-            
-        Returns:
-            Percentile value
-        """
-        if not data:
-            return 0
-        
-        # Sort the data
-        sorted_data = sorted(data)
-        
-        # Calculate the index
-        k = (len(sorted_data) - 1) * (percentile / 100)
-        f = int(k)
-        c = k - f
-        
-        if f + 1 < len(sorted_data):
-            return sorted_data[f] * (1 - c) + sorted_data[f + 1] * c
-        else:
-            return sorted_data[f]
 
 # Create a singleton instance of the PerformanceMonitoringService
 performance_monitoring_service = PerformanceMonitoringService()
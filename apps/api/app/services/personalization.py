@@ -1,9 +1,19 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, FrozenSet, Optional, Set, Tuple
+import asyncio
+import functools
+import heapq
 import logging
-import json
+import operator
+import orjson
 from datetime import datetime, timedelta
+from types import MappingProxyType
 
+import numpy as np
+from cachetools import TTLCache
+
+from app.core.config import settings
 from app.services.prisma import prisma
+from app.services.cache import get_redis
 from app.services.openai import openai_service
 from app.services.learning_styles import learning_style_service
 
@@ -11,6 +21,47 @@ from app.services.learning_styles import learning_style_service
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Learning styles in tie-breaking order
+LEARNING_STYLES = ("visual", "auditory", "reading", "kinesthetic")
+
+# Material types that match each preferred content format
+CONTENT_FORMAT_TYPES = {
+    "text": ("DOCUMENT", "ARTICLE"),
+    "video": ("VIDEO",),
+    "interactive": ("INTERACTIVE", "QUIZ")
+}
+
+# Incomplete materials per topic considered for a study plan
+STUDY_PLAN_MATERIALS_PER_TOPIC = 5
+
+# Redis set of completed material IDs per user
+COMPLETED_SET_KEY = "user:{user_id}:completed"
+COMPLETED_SET_TTL = 600
+# Marks a populated set so users without completions don't fall back every time
+COMPLETED_SET_SENTINEL = ""
+# Adds to the set only if it is already populated, in one atomic step
+COMPLETED_SET_ADD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('SADD', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+@functools.lru_cache(maxsize=1024)
+def _lowered_interests(interests: Tuple[str, ...]) -> FrozenSet[str]:
+    """Lowercase a user's interests for topic name matching.
+    
+    Uses lower() rather than casefold() to match Postgres lower() in the
+    recommendation query.
+    
+    Args:
+        interests: The user's interests
+        
+    Returns:
+        Frozen set of lowercased interests
+    """
+    return frozenset(interest.lower() for interest in interests)
+
 class PersonalizationService:
     """
     Service for implementing personalization features in the LEARN-X platform.
@@ -26,17 +77,44 @@ class PersonalizationService:
     
     def __init__(self):
         """Initialize the personalization service."""
-        self.preference_defaults = {
+        # Read-only so every caller merges into a fresh dict instead of copying
+        self.preference_defaults = MappingProxyType({
             "content_format": "mixed",  # Options: text, video, interactive, mixed
             "difficulty_level": "adaptive",  # Options: beginner, intermediate, advanced, adaptive
             "ui_theme": "system",  # Options: light, dark, system
             "notification_frequency": "daily",  # Options: none, daily, weekly
             "language": "en",  # Default language
-        }
+        })
+        
+        # Short-lived cache of resolved preferences as JSON, keyed by user ID;
+        # every caller decodes its own copy, nested lists and dicts included
+        self._pref_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+        # Preference loads in progress, keyed by user ID
+        self._pref_loads: Dict[str, asyncio.Task] = {}
+        
+        # (pool size, ranked recommendations) keyed by (user ID, page size), reused for follow-up pages
+        self._reco_cache: TTLCache = TTLCache(maxsize=1000, ttl=30)
+        
+        # Organization IDs keyed by user ID; membership rarely changes
+        self._org_cache: TTLCache = TTLCache(maxsize=50_000, ttl=600)
     
     async def connect(self) -> None:
-        """Connect to required services."""
-        pass  # No specific connection needed
+        """Connect to the database and open pooled connections up front.
+        
+        Issues concurrent warm-up queries so the first requests don't each
+        pay for a new connection handshake.
+        """
+        try:
+            if not prisma.is_connected():
+                await prisma.connect()
+            
+            await asyncio.gather(*[
+                prisma.query_raw("SELECT 1")
+                for _ in range(settings.DATABASE_POOL_WARMUP)
+            ])
+            logger.info(f"Warmed {settings.DATABASE_POOL_WARMUP} database connections")
+        except Exception as e:
+            logger.error(f"Error warming database connections: {str(e)}")
     
     async def disconnect(self) -> None:
         """Disconnect from services."""
@@ -52,59 +130,81 @@ class PersonalizationService:
             Dictionary of user preferences
         """
         try:
-            # Get user preferences from database
-            user_preference = await prisma.userpreference.find_unique(
-                where={"userId": user_id}
-            )
-            
-            # Start with default preferences
-            preferences = self.preference_defaults.copy()
-            
-            if user_preference:
-                # Update with stored preferences
-                if user_preference.ui_preferences:
-                    try:
-                        ui_prefs = json.loads(user_preference.ui_preferences)
-                        preferences.update(ui_prefs)
-                    except json.JSONDecodeError:
-                        logger.error(f"Error parsing UI preferences for user {user_id}")
-                
-                # Add learning style if available
-                if user_preference.learning_style:
-                    preferences["learning_style"] = user_preference.learning_style
-                
-                # Add interests if available
-                if user_preference.interests:
-                    try:
-                        interests = json.loads(user_preference.interests)
-                        preferences["interests"] = interests
-                    except json.JSONDecodeError:
-                        logger.error(f"Error parsing interests for user {user_id}")
-            
-            # Get learning style data
-            learning_style = await learning_style_service.get_user_learning_style(user_id)
-            if learning_style:
-                preferences["learning_style_details"] = {
-                    "visual_score": learning_style.get("visual_score", 0),
-                    "auditory_score": learning_style.get("auditory_score", 0),
-                    "reading_score": learning_style.get("reading_score", 0),
-                    "kinesthetic_score": learning_style.get("kinesthetic_score", 0)
-                }
-                
-                # Determine primary learning style
-                scores = [
-                    ("visual", preferences["learning_style_details"]["visual_score"]),
-                    ("auditory", preferences["learning_style_details"]["auditory_score"]),
-                    ("reading", preferences["learning_style_details"]["reading_score"]),
-                    ("kinesthetic", preferences["learning_style_details"]["kinesthetic_score"])
-                ]
-                primary_style = max(scores, key=lambda x: x[1])[0]
-                preferences["primary_learning_style"] = primary_style
-            
-            return preferences
+            preferences = self._pref_cache.get(user_id)
+            if preferences is None:
+                # Only one request per user loads preferences on a cache miss;
+                # the others await the same load
+                load = self._pref_loads.get(user_id)
+                if load is None:
+                    load = asyncio.ensure_future(self._cache_user_preferences(user_id))
+                    self._pref_loads[user_id] = load
+                    # Dropped once the load settles, whether it succeeded or not
+                    load.add_done_callback(lambda _: self._pref_loads.pop(user_id, None))
+                preferences = await asyncio.shield(load)
+            
+            return orjson.loads(preferences)
         except Exception as e:
             logger.error(f"Error getting user preferences: {str(e)}")
-            return self.preference_defaults.copy()
+            return dict(self.preference_defaults)
+    
+    async def _cache_user_preferences(self, user_id: str) -> bytes:
+        """Load user preferences and cache them as JSON."""
+        preferences = orjson.dumps(await self._load_user_preferences(user_id))
+        self._pref_cache[user_id] = preferences
+        return preferences
+    
+    async def _load_user_preferences(self, user_id: str) -> Dict[str, Any]:
+        """Load user preferences from the database.
+        
+        Args:
+            user_id: The user's ID
+            
+        Returns:
+            Dictionary of user preferences
+        """
+        # Get stored preferences and learning style data concurrently
+        user_preference, learning_style = await asyncio.gather(
+            prisma.userpreference.find_unique(
+                where={"userId": user_id}
+            ),
+            learning_style_service.get_user_learning_style(user_id)
+        )
+        
+        # Parse stored UI preferences
+        ui_prefs = {}
+        if user_preference and user_preference.ui_preferences:
+            try:
+                ui_prefs = orjson.loads(user_preference.ui_preferences)
+            except orjson.JSONDecodeError:
+                logger.error(f"Error parsing UI preferences for user {user_id}")
+        
+        # Start with default preferences overridden by stored ones
+        preferences = {**self.preference_defaults, **ui_prefs}
+        
+        if user_preference:
+            # Add learning style if available
+            if user_preference.learning_style:
+                preferences["learning_style"] = user_preference.learning_style
+            
+            # Add interests if available
+            if user_preference.interests:
+                preferences["interests"] = list(user_preference.interests)
+        
+        # Add learning style data if available
+        if learning_style:
+            preferences["learning_style_details"] = {
+                "visual_score": learning_style.get("visual_score", 0),
+                "auditory_score": learning_style.get("auditory_score", 0),
+                "reading_score": learning_style.get("reading_score", 0),
+                "kinesthetic_score": learning_style.get("kinesthetic_score", 0)
+            }
+            
+            # Determine primary learning style (first style wins ties)
+            details = preferences["learning_style_details"]
+            scores = tuple(details[f"{style}_score"] for style in LEARNING_STYLES)
+            preferences["primary_learning_style"] = LEARNING_STYLES[max(range(len(scores)), key=scores.__getitem__)]
+        
+        return preferences
     
     async def update_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> bool:
         """Update user preferences.
@@ -117,11 +217,6 @@ class PersonalizationService:
             True if successful, False otherwise
         """
         try:
-            # Get existing user preference
-            user_preference = await prisma.userpreference.find_unique(
-                where={"userId": user_id}
-            )
-            
             # Prepare data for update
             ui_preferences = {}
             interests = []
@@ -136,165 +231,179 @@ class PersonalizationService:
                 else:
                     ui_preferences[key] = value
             
-            # Convert to JSON strings
-            ui_preferences_json = json.dumps(ui_preferences) if ui_preferences else None
-            interests_json = json.dumps(interests) if interests else None
-            
-            if user_preference:
-                # Update existing preference
-                await prisma.userpreference.update(
-                    where={"id": user_preference.id},
-                    data={
-                        "ui_preferences": ui_preferences_json,
-                        "interests": interests_json,
-                        "learning_style": learning_style
-                    }
-                )
-            else:
-                # Create new preference
-                await prisma.userpreference.create(
-                    data={
-                        "userId": user_id,
-                        "ui_preferences": ui_preferences_json,
-                        "interests": interests_json,
-                        "learning_style": learning_style
-                    }
-                )
+            # Convert UI preferences to a JSON string; interests are stored as an array
+            ui_preferences_json = orjson.dumps(ui_preferences).decode() if ui_preferences else None
+            
+            data = {
+                "ui_preferences": ui_preferences_json,
+                "interests": interests,
+                "learning_style": learning_style
+            }
+            
+            # Create or update the preference in a single round trip
+            await prisma.userpreference.upsert(
+                where={"userId": user_id},
+                data={
+                    "create": {"userId": user_id, **data},
+                    "update": data
+                }
+            )
+            
+            # Drop cached preferences and rankings so the next read sees the update
+            self._pref_cache.pop(user_id, None)
+            for cache_key in [key for key in self._reco_cache if key[0] == user_id]:
+                self._reco_cache.pop(cache_key, None)
             
             return True
         except Exception as e:
             logger.error(f"Error updating user preferences: {str(e)}")
             return False
     
-    async def get_personalized_recommendations(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+    async def get_personalized_recommendations(self, user_id: str, limit: int = 5, offset: int = 0) -> List[Dict[str, Any]]:
         """Get personalized content recommendations for a user.
         
+        At least the top limit * 4 candidates are ranked and cached briefly, so
+        follow-up pages for the same limit are served without re-querying.
+        Pages past the end of a cached ranking rank more candidates.
+        
         Args:
             user_id: The user's ID
             limit: Maximum number of recommendations to return
+            offset: Number of ranked recommendations to skip
             
         Returns:
             List of recommended materials
         """
         try:
-            # Get user preferences and learning history
-            preferences = await self.get_user_preferences(user_id)
-            learning_history = await self._get_user_learning_history(user_id)
-            
-            # Get user's organization
-            user = await prisma.user.find_unique(
-                where={"id": user_id},
-                include={"organization": True}
-            )
-            
-            if not user or not user.organization:
-                return []
-            
-            organization_id = user.organization.id
-            
-            # Get materials from user's organization
-            materials = await prisma.material.find_many(
-                where={
-                    "organizationId": organization_id,
-                    "status": "PUBLISHED"
-                },
-                include={
-                    "topic": True
-                },
-                take=50  # Get a larger pool to filter from
-            )
+            cache_key = (user_id, limit)
+            pool_size = max(limit * 4, offset + limit)
+            cached = self._reco_cache.get(cache_key)
+            
+            # A cached ranking covers the page unless it was cut off at a smaller pool size
+            if cached is None or (cached[0] < pool_size and len(cached[1]) == cached[0]):
+                ranked = await self._rank_recommendations(user_id, pool_size)
+                self._reco_cache[cache_key] = (pool_size, ranked)
+            else:
+                ranked = cached[1]
             
-            if not materials:
-                return []
-            
-            # Filter out materials the user has already completed
-            completed_material_ids = set()
-            for material_id, history in learning_history.items():
-                if history.get("completed", False):
-                    completed_material_ids.add(material_id)
-            
-            available_materials = [m for m in materials if m.id not in completed_material_ids]
-            
-            if not available_materials:
-                return []
-            
-            # Score materials based on user preferences and learning history
-            scored_materials = []
-            for material in available_materials:
-                score = await self._calculate_recommendation_score(material, preferences, learning_history)
-                scored_materials.append((material, score))
-            
-            # Sort by score (descending) and take top recommendations
-            scored_materials.sort(key=lambda x: x[1], reverse=True)
-            top_recommendations = scored_materials[:limit]
-            
-            # Format recommendations
-            recommendations = []
-            for material, score in top_recommendations:
-                recommendations.append({
-                    "id": material.id,
-                    "title": material.title,
-                    "type": material.type,
-                    "topic": material.topic.name if material.topic else None,
-                    "recommendation_score": score,
-                    "recommendation_reason": await self._get_recommendation_reason(material, preferences, score)
-                })
-            
-            return recommendations
+            return ranked[offset:offset + limit]
         except Exception as e:
             logger.error(f"Error getting personalized recommendations: {str(e)}")
             return []
     
-    async def _calculate_recommendation_score(self, 
-                                             material: Any, 
-                                             preferences: Dict[str, Any], 
-                                             learning_history: Dict[str, Dict[str, Any]]) -> float:
-        """Calculate recommendation score for a material based on user preferences.
+    async def _rank_recommendations(self, user_id: str, pool_size: int) -> List[Dict[str, Any]]:
+        """Rank candidate materials for a user.
         
         Args:
-            material: Material to score
-            preferences: User preferences
-            learning_history: User's learning history
+            user_id: The user's ID
+            pool_size: Maximum number of candidate materials to rank
             
         Returns:
-            Recommendation score (0-1)
+            List of recommended materials, best first
         """
-        score = 0.5  # Base score
+        # Get user preferences and organization concurrently
+        preferences, organization_id = await asyncio.gather(
+            self.get_user_preferences(user_id),
+            self._get_org_id(user_id)
+        )
         
-        # Adjust based on material type and preferred content format
-        content_format = preferences.get("content_format", "mixed")
-        if content_format != "mixed":
-            if content_format == "text" and material.type in ["DOCUMENT", "ARTICLE"]:
-                score += 0.2
-            elif content_format == "video" and material.type == "VIDEO":
-                score += 0.2
-            elif content_format == "interactive" and material.type in ["INTERACTIVE", "QUIZ"]:
-                score += 0.2
-        
-        # Adjust based on user interests
-        if "interests" in preferences and material.topic:
-            interests = preferences["interests"]
-            if material.topic.name.lower() in [interest.lower() for interest in interests]:
-                score += 0.3
-        
-        # Adjust based on learning path progression
-        if material.topic and material.topic.id in learning_history.get("topic_progress", {}):
-            topic_progress = learning_history["topic_progress"][material.topic.id]
-            if topic_progress.get("completed_count", 0) > 0:
-                # User has made progress in this topic, boost score
-                score += 0.1
-        
-        # Cap score at 1.0
-        return min(score, 1.0)
+        if not organization_id:
+            return []
+        
+        # Material types that match the preferred content format
+        format_types = list(CONTENT_FORMAT_TYPES.get(preferences.get("content_format", "mixed"), ()))
+        interests_lower = sorted(_lowered_interests(tuple(preferences.get("interests", ()))))
+        
+        # Score, filter and rank the organization's materials in the database.
+        # Materials belong to an organization through topic, module and course.
+        # Completed materials are excluded and topics the user has completed
+        # material in get a progress boost.
+        scored_materials = await prisma.query_raw(
+            """
+            SELECT
+                m.id,
+                m.title,
+                m."fileType" AS type,
+                t.title AS topic_name,
+                LEAST(
+                    0.5
+                    + CASE WHEN m."fileType"::text = ANY($3::text[]) THEN 0.2 ELSE 0 END
+                    + CASE WHEN lower(t.title) = ANY($4::text[]) THEN 0.3 ELSE 0 END
+                    + CASE WHEN EXISTS (
+                        SELECT 1
+                        FROM analytics_events e
+                        JOIN materials tm ON tm.id = e."materialId"
+                        WHERE e."userId" = $1
+                          AND e."eventType" = 'MATERIAL_COMPLETE'
+                          AND tm."topicId" = m."topicId"
+                    ) THEN 0.1 ELSE 0 END,
+                    1.0
+                )::float AS score
+            FROM materials m
+            JOIN topics t ON t.id = m."topicId"
+            JOIN modules mo ON mo.id = t."moduleId"
+            JOIN courses c ON c.id = mo."courseId"
+            WHERE c."organizationId" = $2
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM analytics_events done
+                  WHERE done."userId" = $1
+                    AND done."eventType" = 'MATERIAL_COMPLETE'
+                    AND done."materialId" = m.id
+              )
+            ORDER BY score DESC, m.id
+            LIMIT $5
+            """,
+            user_id,
+            organization_id,
+            format_types,
+            interests_lower,
+            pool_size
+        )
+        
+        # Format recommendations
+        return [
+            {
+                "id": material["id"],
+                "title": material["title"],
+                "type": material["type"],
+                "topic": material["topic_name"],
+                "recommendation_score": material["score"],
+                "recommendation_reason": self._get_recommendation_reason(material, preferences, material["score"])
+            }
+            for material in scored_materials
+        ]
     
-    async def _get_recommendation_reason(self, 
-                                        material: Any, 
-                                        preferences: Dict[str, Any], 
-                                        score: float) -> str:
+    async def _get_org_id(self, user_id: str) -> Optional[str]:
+        """Get the organization ID of a user, cached per user.
+        
+        Args:
+            user_id: The user's ID
+            
+        Returns:
+            Organization ID, or None if the user does not exist
+        """
+        organization_id = self._org_cache.get(user_id)
+        if organization_id is None:
+            user = await prisma.user.find_unique(
+                where={"id": user_id}
+            )
+            if not user or not user.organizationId:
+                return None
+            
+            organization_id = user.organizationId
+            self._org_cache[user_id] = organization_id
+        
+        return organization_id
+    
+    def _get_recommendation_reason(self, 
+                                  material: Dict[str, Any], 
+                                  preferences: Dict[str, Any], 
+                                  score: float) -> str:
         """Generate a human-readable reason for the recommendation.
         
         Args:
-            material: Recommended material
+            material: Recommended material row
             preferences: User preferences
             score: Recommendation score
             
@@ -306,30 +415,30 @@ class PersonalizationService:
         # Reason based on content format
         content_format = preferences.get("content_format", "mixed")
         if content_format != "mixed":
-            if content_format == "text" and material.type in ["DOCUMENT", "ARTICLE"]:
+            if content_format == "text" and material["type"] in ["DOCUMENT", "ARTICLE"]:
                 reasons.append("Matches your preference for text-based content")
-            elif content_format == "video" and material.type == "VIDEO":
+            elif content_format == "video" and material["type"] == "VIDEO":
                 reasons.append("Matches your preference for video content")
-            elif content_format == "interactive" and material.type in ["INTERACTIVE", "QUIZ"]:
+            elif content_format == "interactive" and material["type"] in ["INTERACTIVE", "QUIZ"]:
                 reasons.append("Matches your preference for interactive content")
         
         # Reason based on learning style
         if "primary_learning_style" in preferences:
             primary_style = preferences["primary_learning_style"]
-            if primary_style == "visual" and material.type in ["VIDEO", "INTERACTIVE"]:
+            if primary_style == "visual" and material["type"] in ["VIDEO", "INTERACTIVE"]:
                 reasons.append("Suitable for your visual learning style")
-            elif primary_style == "auditory" and material.type == "VIDEO":
+            elif primary_style == "auditory" and material["type"] == "VIDEO":
                 reasons.append("Suitable for your auditory learning style")
-            elif primary_style == "reading" and material.type in ["DOCUMENT", "ARTICLE"]:
+            elif primary_style == "reading" and material["type"] in ["DOCUMENT", "ARTICLE"]:
                 reasons.append("Suitable for your reading/writing learning style")
-            elif primary_style == "kinesthetic" and material.type == "INTERACTIVE":
+            elif primary_style == "kinesthetic" and material["type"] == "INTERACTIVE":
                 reasons.append("Suitable for your kinesthetic learning style")
         
         # Reason based on interests
-        if "interests" in preferences and material.topic:
-            interests = preferences["interests"]
-            if material.topic.name.lower() in [interest.lower() for interest in interests]:
-                reasons.append(f"Related to your interest in {material.topic.name}")
+        topic_name = material.get("topic_name")
+        if "interests" in preferences and topic_name:
+            if topic_name.lower() in _lowered_interests(tuple(preferences["interests"])):
+                reasons.append(f"Related to your interest in {topic_name}")
         
         # Fallback reason
         if not reasons:
@@ -342,93 +451,77 @@ class PersonalizationService:
         
         return "; ".join(reasons)
     
-    async def _get_user_learning_history(self, user_id: str) -> Dict[str, Any]:
-        """Get user's learning history.
+    async def record_material_completed(self, user_id: str, material_id: str) -> None:
+        """Add a material to the user's completed set.
+        
+        Call this after recording a MATERIAL_COMPLETE event. Sets that are not
+        populated yet are left alone and rebuilt on the next read.
         
         Args:
-            user_id: User ID
-            
-        Returns:
-            Dictionary with learning history data
+            user_id: The user's ID
+            material_id: The completed material's ID
         """
+        client = get_redis()
+        if client is None:
+            return
+        
+        key = COMPLETED_SET_KEY.format(user_id=user_id)
         try:
-            # Get user's interactions with materials
-            interactions = await prisma.userinteraction.find_many(
-                where={
-                    "userId": user_id,
-                    "type": {"in": ["VIEW", "COMPLETE", "QUIZ"]}
-                },
-                order_by={
-                    "createdAt": "desc"
-                },
-                include={
-                    "material": {
-                        "include": {
-                            "topic": True
-                        }
-                    }
-                },
-                take=100  # Limit to recent interactions
-            )
-            
-            # Organize by material ID
-            material_history = {}
-            topic_progress = {}
-            
-            for interaction in interactions:
-                if not interaction.material:
-                    continue
-                
-                material_id = interaction.material.id
-                if material_id not in material_history:
-                    material_history[material_id] = {
-                        "interaction_count": 0,
-                        "last_interaction": None,
-                        "completed": False
-                    }
-                
-                material_history[material_id]["interaction_count"] += 1
-                
-                # Update last interaction time
-                if not material_history[material_id]["last_interaction"] or \
-                   interaction.created_at > material_history[material_id]["last_interaction"]:
-                    material_history[material_id]["last_interaction"] = interaction.created_at
-                
-                # Check if material was completed
-                if interaction.type == "COMPLETE":
-                    material_history[material_id]["completed"] = True
-                
-                # Update topic progress
-                if interaction.material.topic:
-                    topic_id = interaction.material.topic.id
-                    if topic_id not in topic_progress:
-                        topic_progress[topic_id] = {
-                            "name": interaction.material.topic.name,
-                            "interaction_count": 0,
-                            "completed_count": 0,
-                            "last_interaction": None
-                        }
-                    
-                    topic_progress[topic_id]["interaction_count"] += 1
-                    
-                    if interaction.type == "COMPLETE":
-                        topic_progress[topic_id]["completed_count"] += 1
-                    
-                    if not topic_progress[topic_id]["last_interaction"] or \
-                       interaction.created_at > topic_progress[topic_id]["last_interaction"]:
-                        topic_progress[topic_id]["last_interaction"] = interaction.created_at
-            
-            return {
-                "materials": material_history,
-                "topic_progress": topic_progress
-            }
+            await client.eval(COMPLETED_SET_ADD_SCRIPT, 1, key, material_id)
         except Exception as e:
-            logger.error(f"Error getting user learning history: {str(e)}")
-            return {"materials": {}, "topic_progress": {}}
+            logger.warning(f"Error updating completed materials for user {user_id}: {str(e)}")
+    
+    async def _completed_ids(self, user_id: str) -> Set[str]:
+        """Get the IDs of materials a user has completed.
+        
+        Reads the user's Redis set and falls back to the MATERIAL_COMPLETE
+        analytics events, repopulating the set from them.
+        
+        Args:
+            user_id: The user's ID
+            
+        Returns:
+            Set of completed material IDs
+        """
+        client = get_redis()
+        key = COMPLETED_SET_KEY.format(user_id=user_id)
+        
+        if client is not None:
+            try:
+                members = await client.smembers(key)
+                if members:
+                    return {m for m in members if m != COMPLETED_SET_SENTINEL}
+            except Exception as e:
+                logger.warning(f"Error reading completed materials for user {user_id}: {str(e)}")
+        
+        rows = await prisma.query_raw(
+            """
+            SELECT DISTINCT "materialId" AS material_id
+            FROM analytics_events
+            WHERE "userId" = $1
+            AND "eventType" = 'MATERIAL_COMPLETE'
+            AND "materialId" IS NOT NULL
+            """,
+            user_id
+        )
+        completed = {row["material_id"] for row in rows if row["material_id"]}
+        
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.sadd(key, COMPLETED_SET_SENTINEL, *completed)
+                    pipe.expire(key, COMPLETED_SET_TTL)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Error caching completed materials for user {user_id}: {str(e)}")
+        
+        return completed
     
     async def generate_personalized_study_plan(self, user_id: str, topic_id: Optional[str] = None) -> Dict[str, Any]:
         """Generate a personalized study plan for a user.
         
+        Each topic lists only its next few incomplete materials, oldest first.
+        
         Args:
             user_id: The user's ID
             topic_id: Optional topic ID to focus on
@@ -437,91 +530,94 @@ class PersonalizationService:
             Dictionary with study plan details
         """
         try:
-            # Get user preferences and learning history
-            preferences = await self.get_user_preferences(user_id)
-            learning_history = await self._get_user_learning_history(user_id)
-            
-            # Get user's organization
-            user = await prisma.user.find_unique(
-                where={"id": user_id},
-                include={"organization": True}
+            # Get user preferences, completed materials and organization concurrently
+            preferences, completed_material_ids, organization_id = await asyncio.gather(
+                self.get_user_preferences(user_id),
+                self._completed_ids(user_id),
+                self._get_org_id(user_id)
             )
             
-            if not user or not user.organization:
+            if not organization_id:
                 return {"error": "User or organization not found"}
             
-            organization_id = user.organization.id
-            
-            # Get materials for the study plan
-            materials_query = {
-                "organizationId": organization_id,
-                "status": "PUBLISHED"
-            }
-            
-            if topic_id:
-                materials_query["topicId"] = topic_id
-            
-            materials = await prisma.material.find_many(
-                where=materials_query,
-                include={
-                    "topic": True
-                },
-                order_by={
-                    "createdAt": "asc"  # Start with older materials first
-                }
+            # Get per-topic material counts and the leading incomplete materials
+            # of each topic, oldest first. Fully completed topics return a single
+            # completed row so they still show up in the plan.
+            rows = await prisma.query_raw(
+                """
+                WITH topic_materials AS (
+                    SELECT
+                        m.id,
+                        m.title,
+                        m."fileType" AS type,
+                        m."topicId" AS topic_id,
+                        t.title AS topic_name,
+                        m."createdAt" AS created_at,
+                        m.id = ANY($3::text[]) AS completed
+                    FROM materials m
+                    JOIN topics t ON t.id = m."topicId"
+                    JOIN modules mo ON mo.id = t."moduleId"
+                    JOIN courses c ON c.id = mo."courseId"
+                    WHERE c."organizationId" = $1
+                      AND ($2::text IS NULL OR m."topicId" = $2)
+                ),
+                ranked AS (
+                    SELECT
+                        *,
+                        row_number() OVER (PARTITION BY topic_id, completed ORDER BY created_at) AS rn,
+                        min(created_at) OVER (PARTITION BY topic_id) AS topic_started,
+                        count(*) OVER (PARTITION BY topic_id)::int AS total_count,
+                        (count(*) FILTER (WHERE completed) OVER (PARTITION BY topic_id))::int AS completed_count
+                    FROM topic_materials
+                )
+                SELECT id, title, type, topic_id, topic_name, completed, total_count, completed_count
+                FROM ranked
+                WHERE (NOT completed AND rn <= $4)
+                   OR (completed_count = total_count AND rn = 1)
+                ORDER BY topic_started, topic_id, rn
+                """,
+                organization_id,
+                topic_id,
+                list(completed_material_ids),
+                STUDY_PLAN_MATERIALS_PER_TOPIC
             )
             
-            if not materials:
+            if not rows:
                 return {"error": "No materials found for study plan"}
             
-            # Get completed materials
-            completed_material_ids = set()
-            for material_id, history in learning_history.get("materials", {}).items():
-                if history.get("completed", False):
-                    completed_material_ids.add(material_id)
-            
-            # Filter and organize materials by topic
+            # Organize materials by topic
             topics_map = {}
-            for material in materials:
-                if not material.topic:
-                    continue
-                
-                topic_id = material.topic.id
+            for row in rows:
+                topic_id = row["topic_id"]
                 if topic_id not in topics_map:
                     topics_map[topic_id] = {
                         "id": topic_id,
-                        "name": material.topic.name,
+                        "name": row["topic_name"],
                         "materials": [],
-                        "completed_count": 0,
-                        "total_count": 0
+                        "completed_count": row["completed_count"],
+                        "total_count": row["total_count"]
                     }
                 
-                # Add material to topic
-                material_data = {
-                    "id": material.id,
-                    "title": material.title,
-                    "type": material.type,
-                    "completed": material.id in completed_material_ids
-                }
-                
-                topics_map[topic_id]["materials"].append(material_data)
-                topics_map[topic_id]["total_count"] += 1
-                
-                if material.id in completed_material_ids:
-                    topics_map[topic_id]["completed_count"] += 1
+                if not row["completed"]:
+                    topics_map[topic_id]["materials"].append({
+                        "id": row["id"],
+                        "title": row["title"],
+                        "type": row["type"],
+                        "completed": False
+                    })
             
-            # Convert to list and calculate progress
-            topics = []
-            for topic_data in topics_map.values():
-                if topic_data["total_count"] > 0:
-                    topic_data["progress"] = (topic_data["completed_count"] / topic_data["total_count"]) * 100
-                else:
-                    topic_data["progress"] = 0
-                
-                topics.append(topic_data)
+            # Calculate progress for all topics at once
+            topic_list = list(topics_map.values())
+            completed = np.fromiter((t["completed_count"] for t in topic_list), dtype=np.int32, count=len(topic_list))
+            total = np.fromiter((t["total_count"] for t in topic_list), dtype=np.int32, count=len(topic_list))
+            progress = np.where(total > 0, completed / np.maximum(total, 1) * 100, 0.0)
             
             # Sort topics by progress (ascending, so least complete first)
-            topics.sort(key=lambda x: x["progress"])
+            topics = []
+            for index in np.argsort(progress, kind="stable").tolist():
+                topic_data = topic_list[index]
+                topic_data["progress"] = float(progress[index])
+                topics.append(topic_data)
             
             # Generate study plan
             study_plan = {
@@ -531,8 +627,11 @@ class PersonalizationService:
                 "recommendations": []
             }
             
-            # Add personalized recommendations
+            # Add personalized recommendations, stopping once the top 5 are found
             for topic in topics:
+                if len(study_plan["recommendations"]) >= 5:
+                    break
+                
                 # Skip topics that are 100% complete
                 if topic["progress"] == 100:
                     continue
@@ -562,11 +661,8 @@ class PersonalizationService:
                             
                             scored_materials.append((material, score))
                         
-                        # Sort by score (descending)
-                        scored_materials.sort(key=lambda x: x[1], reverse=True)
-                        
                         # Take top 2 materials from each topic
-                        for material, score in scored_materials[:2]:
+                        for material, score in heapq.nlargest(2, scored_materials, key=operator.itemgetter(1)):
                             study_plan["recommendations"].append({
                                 "material_id": material["id"],
                                 "title": material["title"],
@@ -606,40 +702,48 @@ class PersonalizationService:
             Difficulty level (beginner, intermediate, advanced)
         """
         try:
-            # Get user's quiz performance
-            quiz_results = await prisma.quizresult.find_many(
-                where={
-                    "userId": user_id,
-                    "quiz": {
-                        "material": {
-                            "topicId": topic_id
-                        } if topic_id else None
-                    }
-                },
-                include={
-                    "quiz": True
-                },
-                order_by={
-                    "createdAt": "desc"
-                },
-                take=10  # Consider recent quiz results
+            # Count correct and total answers of the user's most recent completed
+            # quiz attempts in the database. Quizzes belong to courses, so a topic
+            # narrows the attempts to quizzes of the topic's course.
+            topic_join = ""
+            params = [user_id]
+            if topic_id:
+                topic_join = """
+                    JOIN quizzes q ON q.id = a."quizId"
+                    JOIN modules mo ON mo."courseId" = q."courseId"
+                    JOIN topics t ON t."moduleId" = mo.id AND t.id = $2
+                """
+                params.append(topic_id)
+            
+            rows = await prisma.query_raw(
+                f"""
+                WITH recent AS (
+                    SELECT a.id
+                    FROM quiz_attempts a
+                    {topic_join}
+                    WHERE a."userId" = $1
+                      AND a."completedAt" IS NOT NULL
+                    ORDER BY a."completedAt" DESC
+                    LIMIT 10
+                )
+                SELECT
+                    count(DISTINCT r.id)::int AS result_count,
+                    (count(qa.id) FILTER (WHERE qa."isCorrect"))::float AS total_score,
+                    count(qa.id)::float AS total_possible
+                FROM recent r
+                LEFT JOIN question_answers qa ON qa."quizAttemptId" = r.id
+                """,
+                *params
             )
             
-            if not quiz_results:
+            totals = rows[0] if rows else {}
+            if not totals.get("result_count"):
                 return "beginner"  # Default to beginner if no quiz results
             
-            # Calculate average score
-            total_score = 0
-            total_possible = 0
-            
-            for result in quiz_results:
-                total_score += result.score
-                total_possible += result.possible_score
-            
-            if total_possible == 0:
+            if not totals.get("total_possible"):
                 return "beginner"  # Default to beginner if no possible score
             
-            average_percentage = (total_score / total_possible) * 100
+            average_percentage = (totals["total_score"] / totals["total_possible"]) * 100
             
             # Determine difficulty level based on average score
             if average_percentage < 60:
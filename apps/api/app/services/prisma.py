@@ -1,44 +1,327 @@
 import os
 import asyncio
-from typing import Any, Dict, List, Optional, Type, TypeVar, Union, Generic
-from pydantic import BaseModel
+import functools
+import hashlib
+import logging
+import re
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple, Type, TypeVar, Union, Generic
+import httpx
+import orjson
+from cachetools import TTLCache
+from pydantic import BaseModel, create_model
 from prisma import Prisma
-from prisma.errors import PrismaError
+from prisma import _async_http
+from prisma.errors import ForeignKeyViolationError, PrismaError, UniqueViolationError, UnsupportedDatabaseError
 from fastapi import HTTPException, status
 
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+async def _orjson_response_json(self, **kwargs: Any) -> Any:
+    """Parse a query engine response body with orjson instead of json."""
+    return orjson.loads(await self.original.aread())
+
+# Engine responses are plain JSON; Prisma's models still parse datetimes and decimals
+_async_http.Response.json = _orjson_response_json
+
+def _engine_http_config() -> Dict[str, Any]:
+    """Build the httpx client options for the query engine connection.
+    
+    Keep-alive connections are reused across queries. With DATABASE_HTTP2
+    set, queries are multiplexed over HTTP/2 with prior knowledge, which
+    needs the h2 package and an engine that accepts cleartext HTTP/2.
+    """
+    config: Dict[str, Any] = {
+        "limits": httpx.Limits(
+            max_connections=settings.DATABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DATABASE_HTTP_KEEPALIVE
+        ),
+        "timeout": settings.DATABASE_HTTP_TIMEOUT
+    }
+    if settings.DATABASE_HTTP2:
+        config.update(http1=False, http2=True)
+    return config
+
 # Initialize Prisma client
-prisma = Prisma()
+prisma = Prisma(http=_engine_http_config())
+
+# Upper bound on rows returned by a single get_many call
+MAX_TAKE = 1000
+
+# Positional parameter placeholders in raw SQL ($1, $2, ...)
+_PLACEHOLDER = re.compile(r"\$(\d+)")
 
 # Type variable for generic database operations
 T = TypeVar('T')
 
+@functools.lru_cache(maxsize=256)
+def _partial_model(model: Type[BaseModel], fields: FrozenSet[str]) -> Type[BaseModel]:
+    """Build a partial model type with only the given fields.
+    
+    Prisma's query builder selects exactly the fields of the model type a
+    query is bound to, the same mechanism as generated partial types.
+    """
+    definitions = {}
+    for name in sorted(fields):
+        info = model.__fields__[name]
+        definitions[name] = (info.outer_type_, ... if info.required else info.default)
+    
+    partial_name = f"{model.__name__}Select{''.join(name.title() for name in sorted(fields))}"
+    return create_model(partial_name, __base__=model.__bases__[0], **definitions)
+
+class PageInfo(NamedTuple):
+    """A page of records with the total number of matching records."""
+    data: List[Any]
+    total: int
+    has_next: bool
+
+class BatchLoader:
+    """Coalesce lookups by ID made in the same event loop tick into one query."""
+    
+    def __init__(self, model_instance: Any):
+        """Initialize the loader for a Prisma model."""
+        self.model_instance = model_instance
+        self.futures: Dict[str, List[asyncio.Future]] = {}
+        self.scheduled = False
+        # Running flushes, referenced until done so they are not garbage collected
+        self.flush_tasks: Set[asyncio.Task] = set()
+    
+    def load(self, id: str) -> asyncio.Future:
+        """Queue a lookup and return a future resolved with the record or None."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.futures.setdefault(id, []).append(future)
+        
+        if not self.scheduled:
+            self.scheduled = True
+            loop.call_soon(self._start_flush)
+        
+        return future
+    
+    def _start_flush(self):
+        """Start a flush task and keep a reference to it until it finishes."""
+        task = asyncio.ensure_future(self.flush())
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+    
+    async def flush(self):
+        """Fetch all queued IDs with a single find_many and resolve their futures."""
+        futures, self.futures, self.scheduled = self.futures, {}, False
+        
+        try:
+            records = await self.model_instance.find_many(
+                where={"id": {"in": list(futures)}}
+            )
+        except Exception as e:
+            for waiters in futures.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        records_by_id = {record.id: record for record in records}
+        for id, waiters in futures.items():
+            for future in waiters:
+                if not future.done():
+                    future.set_result(records_by_id.get(id))
+
 class PrismaService(Generic[T]):
     """Service for interacting with Prisma ORM."""
     
     def __init__(self):
         """Initialize the Prisma client."""
         self.prisma = prisma
-        self.connected = False
+        self._connect_lock = asyncio.Lock()
+        self._models: Dict[str, Any] = {}
+        self._loaders: Dict[Tuple[str, Optional[FrozenSet[str]]], BatchLoader] = {}
+        
+        # Short-lived cache of opted-in read results, invalidated per model on writes
+        self._cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+        self._cache_keys: Dict[str, Set[bytes]] = defaultdict(set)
+        
+        # Cached reads in progress, shared by concurrent identical calls
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        
+        # List validators built once per response schema
+        self._adapters: Dict[Type[BaseModel], Type[BaseModel]] = {}
     
     async def connect(self):
-        """Connect to the database."""
-        if not self.connected:
-            await self.prisma.connect()
-            self.connected = True
+        """Connect to the database.
+        
+        Called once at application startup; CRUD methods assume an open connection.
+        """
+        async with self._connect_lock:
+            if not self.prisma.is_connected():
+                await self.prisma.connect()
     
     async def disconnect(self):
         """Disconnect from the database."""
-        if self.connected:
-            await self.prisma.disconnect()
-            self.connected = False
+        async with self._connect_lock:
+            if self.prisma.is_connected():
+                await self.prisma.disconnect()
+    
+    def _model(self, model: str) -> Any:
+        """Get a model's query actions, memoized per model name.
+        
+        Raises:
+            HTTPException: If the client has no such model
+        """
+        model_instance = self._models.get(model)
+        if model_instance is None:
+            model_instance = getattr(self.prisma, model, None)
+            if model_instance is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid model: {model}"
+                )
+            self._models[model] = model_instance
+        return model_instance
+    
+    async def _with_timeout(self, awaitable: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Await a database call, giving up after the query timeout.
+        
+        Raises a 504 when the deadline passes. Cancellation of the calling
+        request propagates into the call, so abandoned queries stop too.
+        """
+        try:
+            return await asyncio.wait_for(awaitable, timeout or settings.DATABASE_QUERY_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Database call timed out after {timeout or settings.DATABASE_QUERY_TIMEOUT}s")
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Database query timed out"
+            )
+    
+    def _read_key(self, model: str, op: str, params: Dict[str, Any]) -> bytes:
+        """Build the key identifying a read and its parameters."""
+        return orjson.dumps([model, op, params], option=orjson.OPT_SORT_KEYS, default=str)
     
-    async def get(self, model: str, id: str) -> Optional[Dict[str, Any]]:
-        """Get a record by ID."""
+    async def _single_flight(self, key: bytes, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a read once for all concurrent callers with the same key.
+        
+        Callers arriving while the read is in progress await the same
+        future, so a burst of identical reads costs one database query.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only this caller was cancelled; otherwise the read that was
+                # shared was cancelled with its caller, so run it here instead
+                if not future.cancelled():
+                    raise
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
         try:
-            await self.connect()
-            model_instance = getattr(self.prisma, model)
-            result = await model_instance.find_unique(where={"id": id})
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case no other caller was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def _cached(self, model: str, op: str, params: Dict[str, Any], fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached read result, fetching it once on a miss."""
+        key = self._read_key(model, op, params)
+        if key in self._cache:
+            return self._cache[key]
+        
+        async def fetch_and_store() -> Any:
+            result = await fetch()
+            # Stored before waiters resume, so later arrivals hit the cache
+            self._cache[key] = result
+            
+            model_keys = self._cache_keys[model]
+            model_keys.add(key)
+            if len(model_keys) > self._cache.maxsize:
+                model_keys.intersection_update(self._cache.keys())
             return result
+        
+        return await self._single_flight(key, fetch_and_store)
+    
+    def _invalidate(self, model: str):
+        """Drop all cached reads for a model."""
+        for key in self._cache_keys.pop(model, set()):
+            self._cache.pop(key, None)
+    
+    def _select_fields(
+        self,
+        model_instance: Any,
+        select: Optional[Dict[str, Any]],
+        include: Optional[Dict[str, Any]] = None
+    ) -> Optional[FrozenSet[str]]:
+        """Validate a select projection and return the fields to fetch."""
+        if not select:
+            return None
+        
+        model_fields = model_instance._model.__fields__
+        for field, value in select.items():
+            if field not in model_fields:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown field in select: {field}"
+                )
+            if include and field in include:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Field {field} cannot be in both select and include"
+                )
+            if value is not True:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Select scalar fields only; fetch relation {field} with include"
+                )
+        
+        # Included relations must exist on the partial model to be loaded
+        return frozenset(select) | frozenset(include or ())
+    
+    def _actions(self, model_instance: Any, fields: Optional[FrozenSet[str]]) -> Any:
+        """Get the model's query actions, bound to a partial model if fields are given."""
+        if fields is None:
+            return model_instance
+        return type(model_instance)(model_instance._client, _partial_model(model_instance._model, fields))
+    
+    async def get(
+        self,
+        model: str,
+        id: str,
+        select: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cache: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Get a record by ID.
+        
+        Lookups for the same model made in the same event loop tick are
+        batched into a single find_many. Pass select={field: True, ...} to
+        fetch only those scalar fields, timeout to override
+        DATABASE_QUERY_TIMEOUT, and cache=True to reuse the result for up to
+        30 seconds.
+        """
+        try:
+            model_instance = self._model(model)
+            fields = self._select_fields(model_instance, select)
+            if fields is not None:
+                fields = fields | {"id"}
+            
+            loader = self._loaders.get((model, fields))
+            if loader is None:
+                loader = self._loaders[(model, fields)] = BatchLoader(self._actions(model_instance, fields))
+            if cache:
+                return await self._cached(model, "get", {"id": id, "select": sorted(fields or ())}, lambda: self._with_timeout(loader.load(id), timeout))
+            return await self._with_timeout(loader.load(id), timeout)
         except PrismaError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -51,53 +334,199 @@ class PrismaService(Generic[T]):
         where: Optional[Dict[str, Any]] = None,
         order_by: Optional[Dict[str, str]] = None,
         skip: int = 0,
-        take: int = 100,
-        include: Optional[Dict[str, bool]] = None
+        take: Optional[int] = 100,
+        include: Optional[Dict[str, bool]] = None,
+        cache: bool = False,
+        select: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
     ) -> List[Dict[str, Any]]:
-        """Get multiple records with filtering and pagination."""
-        try:
-            await self.connect()
-            model_instance = getattr(self.prisma, model)
-            result = await model_instance.find_many(
-                where=where,
-                order_by=order_by,
-                skip=skip,
-                take=take,
-                include=include
+        """Get multiple records with filtering and pagination.
+        
+        take is always sent to the database (100 when None) and capped at MAX_TAKE.
+        Pass cache=True to reuse the result for up to 30 seconds,
+        select={field: True, ...} to fetch only those scalar fields, and
+        timeout to override DATABASE_QUERY_TIMEOUT.
+        """
+        if skip < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="skip must not be negative"
             )
-            return result
+        take = min(100 if take is None else take, MAX_TAKE)
+        
+        result = await self._find_many(model, where, order_by, skip, take, include, cache, select, timeout)
+        if take and len(result) == take and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"get_many on {model} returned a full page of {take} rows; more may match")
+        return result
+    
+    async def _find_many(
+        self,
+        model: str,
+        where: Optional[Dict[str, Any]],
+        order_by: Optional[Dict[str, str]],
+        skip: int,
+        take: int,
+        include: Optional[Dict[str, bool]],
+        cache: bool,
+        select: Optional[Dict[str, Any]],
+        timeout: Optional[float]
+    ) -> List[Any]:
+        """Run a find_many for get_many and the internal batched lookups."""
+        try:
+            model_instance = self._model(model)
+            fields = self._select_fields(model_instance, select, include)
+            actions = self._actions(model_instance, fields)
+            params = {
+                "where": where,
+                "order_by": order_by,
+                "skip": skip,
+                "take": take,
+                "include": include
+            }
+            if cache:
+                cache_params = {**params, "select": sorted(fields or ())}
+                return await self._cached(model, "get_many", cache_params, lambda: self._with_timeout(actions.find_many(**params), timeout))
+            return await self._with_timeout(actions.find_many(**params), timeout)
         except PrismaError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Database error: {str(e)}"
             )
     
-    async def create(self, model: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def find_many_and_count(
+        self,
+        model: str,
+        where: Optional[Dict[str, Any]] = None,
+        order_by: Optional[Dict[str, str]] = None,
+        skip: int = 0,
+        take: Optional[int] = 100,
+        include: Optional[Dict[str, bool]] = None,
+        select: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cache: bool = False
+    ) -> PageInfo:
+        """Get a page of records and the total count of matching records.
+        
+        Both queries run concurrently, so a paginated listing costs one
+        round trip of latency instead of two.
+        """
+        rows, total = await asyncio.gather(
+            self.get_many(
+                model,
+                where=where,
+                order_by=order_by,
+                skip=skip,
+                take=take,
+                include=include,
+                cache=cache,
+                select=select,
+                timeout=timeout
+            ),
+            self.count(model, where=where, timeout=timeout, cache=cache)
+        )
+        return PageInfo(data=rows, total=total, has_next=skip + len(rows) < total)
+    
+    async def get_by_ids(
+        self,
+        model: str,
+        ids: List[str],
+        fk: str = "id",
+        include: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        """Get records whose `fk` field is in ids, keyed by that field.
+        
+        Issues one find_many per MAX_TAKE ids instead of one query per id.
+        Ids without a matching record are missing from the result.
+        """
+        unique = list(dict.fromkeys(ids))
+        if not unique:
+            return {}
+        
+        chunks = [unique[i:i + MAX_TAKE] for i in range(0, len(unique), MAX_TAKE)]
+        # A chunk matches at most one row per id, so a full page is expected
+        pages = await asyncio.gather(*[
+            self._find_many(model, {fk: {"in": chunk}}, None, 0, len(chunk), include, False, None, None)
+            for chunk in chunks
+        ])
+        return {getattr(row, fk): row for rows in pages for row in rows}
+    
+    async def get_grouped_by(
+        self,
+        model: str,
+        ids: List[str],
+        fk: str,
+        include: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, List[Any]]:
+        """Get records whose `fk` field is in ids, grouped by that field.
+        
+        For one-to-many lookups; every id is present in the result, with an
+        empty list when it has no records. Records are read MAX_TAKE at a
+        time until all of them have been fetched.
+        """
+        unique = list(dict.fromkeys(ids))
+        if not unique:
+            return {}
+        
+        grouped: Dict[str, List[Any]] = {id: [] for id in unique}
+        where = {fk: {"in": unique}}
+        skip = 0
+        while True:
+            rows = await self._find_many(model, where, {"id": "asc"}, skip, MAX_TAKE, include, False, None, None)
+            for row in rows:
+                grouped[getattr(row, fk)].append(row)
+            if len(rows) < MAX_TAKE:
+                return grouped
+            skip += MAX_TAKE
+    
+    def _adapter(self, cls: Type[BaseModel]) -> Type[BaseModel]:
+        """Get the cached List[cls] validator for a response schema."""
+        adapter = self._adapters.get(cls)
+        if adapter is None:
+            adapter = create_model(f"{cls.__name__}List", __root__=(List[cls], ...))
+            self._adapters[cls] = adapter
+        return adapter
+    
+    async def get_many_as(self, model: str, cls: Type[BaseModel], **kwargs: Any) -> List[BaseModel]:
+        """Get multiple records validated into a response schema.
+        
+        Takes the same keyword arguments as get_many. Records are read
+        through the schema's orm_mode, so Prisma models need no dict() copy.
+        """
+        rows = await self.get_many(model, **kwargs)
+        return self._adapter(cls).parse_obj(rows).__root__
+    
+    async def create(self, model: str, data: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
         """Create a new record."""
         try:
-            await self.connect()
-            print(f"\n=== Creating {model} ===\nData:", data)
-            
-            # Verify model exists
-            if not hasattr(self.prisma, model):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid model: {model}"
-                )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Creating {model} with data: {data}")
             
             # Get model instance
-            model_instance = getattr(self.prisma, model)
+            model_instance = self._model(model)
             
             # Attempt to create record
             try:
-                result = await model_instance.create(data=data)
-                print(f"\n=== Successfully created {model} ===\nResult:", result)
+                result = await self._with_timeout(model_instance.create(data=data), timeout)
+                self._invalidate(model)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Created {model}: {result}")
                 return result
+            except UniqueViolationError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"A {model} with these details already exists"
+                )
+            except ForeignKeyViolationError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Referenced record not found"
+                )
+            except HTTPException:
+                raise
             except Exception as e:
-                print(f"\n=== Error creating {model} ===\nError:", str(e))
-                print("Error details:", e.__dict__)
+                logger.exception(f"Error creating {model}")
                 
-                # Check for common errors
+                # Fall back to the message for errors Prisma doesn't type
                 error_str = str(e).lower()
                 if "unique constraint" in error_str:
                     raise HTTPException(
@@ -118,22 +547,65 @@ class PrismaService(Generic[T]):
         except HTTPException as e:
             raise e
         except Exception as e:
-            print(f"\n=== Unexpected error creating {model} ===\nError:", str(e))
-            print("Error details:", e.__dict__)
+            logger.exception(f"Unexpected error creating {model}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Unexpected error: {str(e)}"
             )
     
-    async def update(self, model: str, id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_many(
+        self,
+        model: str,
+        data: List[Dict[str, Any]],
+        skip_duplicates: bool = True,
+        timeout: Optional[float] = None
+    ) -> int:
+        """Create multiple records in a single statement.
+        
+        Falls back to one create per record inside a transaction on databases
+        without createMany support.
+        
+        Returns:
+            Number of records created
+        """
+        if not data:
+            return 0
+        
+        try:
+            model_instance = self._model(model)
+            try:
+                count = await self._with_timeout(
+                    model_instance.create_many(data=data, skip_duplicates=skip_duplicates),
+                    timeout
+                )
+            except UnsupportedDatabaseError:
+                count = 0
+                async with self.prisma.tx() as tx:
+                    tx_model = getattr(tx, model)
+                    for record in data:
+                        try:
+                            await tx_model.create(data=record)
+                            count += 1
+                        except UniqueViolationError:
+                            if not skip_duplicates:
+                                raise
+            self._invalidate(model)
+            return count
+        except PrismaError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}"
+            )
+    
+    async def update(self, model: str, id: str, data: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
         """Update an existing record."""
         try:
-            await self.connect()
-            model_instance = getattr(self.prisma, model)
-            result = await model_instance.update(
-                where={"id": id},
-                data=data
+            model_instance = self._model(model)
+            result = await self._with_timeout(
+                model_instance.update(where={"id": id}, data=data),
+                timeout
             )
+            self._invalidate(model)
             return result
         except PrismaError as e:
             raise HTTPException(
@@ -141,12 +613,12 @@ class PrismaService(Generic[T]):
                 detail=f"Database error: {str(e)}"
             )
     
-    async def delete(self, model: str, id: str) -> Dict[str, Any]:
+    async def delete(self, model: str, id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
         """Delete a record."""
         try:
-            await self.connect()
-            model_instance = getattr(self.prisma, model)
-            result = await model_instance.delete(where={"id": id})
+            model_instance = self._model(model)
+            result = await self._with_timeout(model_instance.delete(where={"id": id}), timeout)
+            self._invalidate(model)
             return result
         except PrismaError as e:
             raise HTTPException(
@@ -154,18 +626,126 @@ class PrismaService(Generic[T]):
                 detail=f"Database error: {str(e)}"
             )
     
-    async def count(self, model: str, where: Optional[Dict[str, Any]] = None) -> int:
-        """Count records with optional filtering."""
+    async def update_many(
+        self,
+        model: str,
+        where: Dict[str, Any],
+        data: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> int:
+        """Update all records matching a filter in a single statement.
+        
+        Returns:
+            Number of records updated
+        """
         try:
-            await self.connect()
-            model_instance = getattr(self.prisma, model)
-            result = await model_instance.count(where=where)
-            return result
+            model_instance = self._model(model)
+            count = await self._with_timeout(model_instance.update_many(where=where, data=data), timeout)
+            self._invalidate(model)
+            return count
         except PrismaError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Database error: {str(e)}"
             )
+    
+    async def delete_many(
+        self,
+        model: str,
+        where: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> int:
+        """Delete all records matching a filter in a single statement.
+        
+        Returns:
+            Number of records deleted
+        """
+        try:
+            model_instance = self._model(model)
+            count = await self._with_timeout(model_instance.delete_many(where=where), timeout)
+            self._invalidate(model)
+            return count
+        except PrismaError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}"
+            )
+    
+    async def count(self, model: str, where: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None, cache: bool = False) -> int:
+        """Count records with optional filtering.
+        
+        Pass cache=True to reuse the count for up to 30 seconds.
+        """
+        try:
+            model_instance = self._model(model)
+            if cache:
+                return await self._cached(model, "count", {"where": where}, lambda: self._with_timeout(model_instance.count(where=where), timeout))
+            return await self._with_timeout(model_instance.count(where=where), timeout)
+        except PrismaError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}"
+            )
+    
+    def _check_params(self, sql: str, args: Tuple[Any, ...]):
+        """Require every value in raw SQL to be bound as a $n parameter.
+        
+        SQL built by interpolating values leaves the placeholders out of
+        step with the arguments, so that mismatch is refused.
+        """
+        highest = max((int(n) for n in _PLACEHOLDER.findall(sql)), default=0)
+        if highest != len(args):
+            raise ValueError(f"Raw SQL uses {highest} parameters but {len(args)} were given; bind values as $1..$n")
+    
+    async def _run_raw(self, op: str, sql: str, run: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Run a raw query, logging its duration under a hash of the SQL."""
+        sql_hash = hashlib.sha1(sql.encode()).hexdigest()[:12]
+        start = time.perf_counter()
+        try:
+            return await self._with_timeout(run(), timeout)
+        except PrismaError as e:
+            logger.error(f"Error in {op} {sql_hash}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}"
+            )
+        finally:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"{op} {sql_hash} took {(time.perf_counter() - start) * 1000:.1f}ms")
+    
+    async def query_raw(
+        self,
+        sql: str,
+        *args: Any,
+        model: Optional[Type[BaseModel]] = None,
+        timeout: Optional[float] = None
+    ) -> List[Any]:
+        """Run a parameterized SQL query for hot analytical reads.
+        
+        Results are a list of dicts, or of `model` instances when given;
+        callers validate the shape themselves. Results are not cached.
+        """
+        self._check_params(sql, args)
+        if model is None:
+            return await self._run_raw("query_raw", sql, lambda: self.prisma.query_raw(sql, *args), timeout)
+        return await self._run_raw("query_raw", sql, lambda: self.prisma.query_raw(sql, *args, model=model), timeout)
+    
+    async def execute_raw(
+        self,
+        sql: str,
+        *args: Any,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> int:
+        """Run a parameterized SQL statement and return the affected row count.
+        
+        Pass the written model's name to drop its cached reads.
+        """
+        self._check_params(sql, args)
+        result = await self._run_raw("execute_raw", sql, lambda: self.prisma.execute_raw(sql, *args), timeout)
+        if model is not None:
+            self._invalidate(model)
+        return result
 
 # Create a singleton instance of the PrismaService
 prisma_service = PrismaService()
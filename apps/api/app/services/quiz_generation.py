@@ -1,17 +1,71 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
 import logging
-import json
 import random
+import orjson
+from prisma import Json, Prisma
 from prisma.models import Quiz, QuizQuestion, Material, Course
 from app.services.openai import openai_service
-from app.services.prisma import prisma
-from app.services.question_templates import question_template_service
+from app.services.prisma import prisma, prisma_service, MAX_TAKE
+from app.services.question_templates import question_template_service, DIFFICULTY_LEVELS, QUESTION_TYPES
 from app.services.ai_analytics import ai_analytics_service
+from app.services.cache import get_redis
+from app.core.config import settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Postgres allows at most 65535 bind parameters per statement; each
+# question row binds 8 columns
+QUESTION_COLUMNS = 8
+MAX_QUESTIONS_PER_INSERT = 65535 // QUESTION_COLUMNS
+
+# Question types with templates, fixed at import time
+_AVAILABLE_TYPES = frozenset(QUESTION_TYPES)
+
+# Prompt guidelines for each difficulty level
+_DIFFICULTY_GUIDELINES = {
+    "easy": "Focus on basic recall and understanding. Questions should test fundamental concepts and definitions.",
+    "medium": "Focus on application and analysis. Questions should require understanding relationships between concepts.",
+    "hard": "Focus on evaluation and synthesis. Questions should require critical thinking and applying concepts to new situations."
+}
+_DEFAULT_GUIDELINES = "Balance between recall, application, and critical thinking."
+
+# Material columns read when generating questions; other columns can be large
+MATERIAL_QUIZ_FIELDS = {"title": True, "content": True, "courseId": True, "updatedAt": True}
+COURSE_MATERIAL_FIELDS = {"id": True, "title": True, "content": True}
+
+_TRUE_FALSE_ANSWERS = frozenset({"true", "false"})
+
+def _normalize_answer(value: str) -> str:
+    """Normalize an answer or option for comparison, ignoring case and spacing."""
+    return " ".join(value.split()).casefold()
+
+# Quiz generation rubric. It never varies between calls so the API can cache
+# the prompt prefix; per-quiz details go in the user message instead.
+QUIZ_RUBRIC = """
+You are an expert educational quiz generator. Your task is to create high-quality quiz questions
+at the requested difficulty level based on the provided content. The questions should test
+understanding and critical thinking, not just memorization.
+
+Guidelines for creating questions:
+1. For multiple choice questions:
+   - Provide 4 options with only 1 correct answer
+   - Make distractors plausible but clearly incorrect
+   - Avoid using 'all of the above' or 'none of the above'
+
+2. For true/false questions:
+   - Make statements that are clearly true or false based on the content
+   - Avoid ambiguous statements
+
+3. For all questions:
+   - Include a brief explanation of the correct answer
+   - Ensure questions are directly related to the content
+   - Vary the difficulty according to the specified level and its guidelines
+"""
+
 class QuizGenerationService:
     """Service for generating quizzes from course materials."""
     
@@ -32,21 +86,17 @@ class QuizGenerationService:
             question_types = ["multiple_choice", "true_false"]
         
         # Validate question types
-        available_types = question_template_service.get_all_question_types()
-        question_types = [qt for qt in question_types if qt in available_types]
+        question_types = [qt for qt in question_types if qt in _AVAILABLE_TYPES]
         if not question_types:
             question_types = ["multiple_choice", "true_false"]
         
         # Validate difficulty
-        if difficulty not in ["easy", "medium", "hard"]:
+        if difficulty not in DIFFICULTY_LEVELS:
             difficulty = "medium"
         
         try:
             # Get the material
-            material = await prisma.material.find_unique(
-                where={"id": material_id},
-                include={"course": True}
-            )
+            material = await prisma_service.get("material", material_id, select=MATERIAL_QUIZ_FIELDS)
             
             if not material:
                 logger.error(f"Material not found: {material_id}")
@@ -54,7 +104,7 @@ class QuizGenerationService:
             
             # Get question templates if enabled
             templates = []
-            template_prompt = None
+            template_prompt = ""
             if use_templates:
                 for q_type in question_types:
                     templates.extend(question_template_service.get_templates(q_type, difficulty))
@@ -67,49 +117,34 @@ class QuizGenerationService:
                     # Create template prompt
                     template_examples = ""
                     for i, template in enumerate(templates):
-                        template_examples += f"Template {i+1}: {template['template']}"
-                        template_examples += f"Example: {template['example']}"
+                        template_examples += f"Template {i+1}: {template.template}"
+                        template_examples += f"Example: {template.example}"
                     
-                    template_prompt = f"""
-                    Use the following templates to generate {num_questions} {difficulty} difficulty questions:
-
-{template_examples}
-                    """
-            
-            # Generate quiz questions
-            system_message = f"""
-            You are an expert educational quiz generator. Your task is to create high-quality {difficulty} level quiz questions
-            based on the provided content. The questions should test understanding and critical thinking, not just memorization.
-            
-            Guidelines for creating questions:
-            1. For multiple choice questions:
-               - Provide 4 options with only 1 correct answer
-               - Make distractors plausible but clearly incorrect
-               - Avoid using 'all of the above' or 'none of the above'
-            
-            2. For true/false questions:
-               - Make statements that are clearly true or false based on the content
-               - Avoid ambiguous statements
-            
-            3. For all questions:
-               - Include a brief explanation of the correct answer
-               - Ensure questions are directly related to the content
-               - Vary the difficulty according to the specified level
-               - For {difficulty} difficulty: {self._get_difficulty_guidelines(difficulty)}
-            """
-            
-            # Add template instructions if provided
-            if template_prompt:
-                system_message += template_prompt
+                    template_prompt = f"Use the following templates to generate {num_questions} {difficulty} difficulty questions:\n{template_examples}\n"
+            
+            # Per-quiz details follow the static rubric in the user message
+            instructions = (
+                f"Difficulty: {difficulty}\n"
+                f"Guidelines: {self._get_difficulty_guidelines(difficulty)}\n"
+                f"{template_prompt}"
+            )
+            
+            # Reuse questions generated earlier for the same material version and settings
+            cache_key = self._questions_cache_key(material, num_questions, question_types, difficulty, use_templates)
+            questions = await self._get_cached_questions(cache_key)
             
             try:
-                questions = await openai_service.generate_quiz_questions(
-                    content=material.content,
-                    num_questions=num_questions,
-                    question_types=question_types,
-                    difficulty=difficulty,
-                    system_message=system_message
-                )
+                if questions is None:
+                    questions = await openai_service.generate_quiz_questions(
+                        content=material.content,
+                        num_questions=num_questions,
+                        question_types=question_types,
+                        difficulty=difficulty,
+                        system_message=QUIZ_RUBRIC,
+                        instructions=instructions
+                    )
+                    if questions:
+                        await self._cache_questions(cache_key, questions)
                 
                 if not questions:
                     logger.error("Failed to generate quiz questions")
@@ -118,55 +153,35 @@ class QuizGenerationService:
                 logger.error(f"Error generating quiz questions: {str(e)}")
                 return {"error": f"Failed to generate quiz questions: {str(e)}"}
             
-            # Validate questions
-            validated_questions = []
-            for q in questions:
-                validated_q = await self.validate_question(q)
-                if validated_q:
-                    validated_questions.append(validated_q)
-                    
+            # Validate questions concurrently, keeping their order
+            validated = await asyncio.gather(*(self.validate_question(q) for q in questions))
+            validated_questions = [q for q in validated if q]
+            
             if not validated_questions:
                 logger.error("No valid questions generated")
                 return {"error": "Failed to generate valid quiz questions"}
                 
             questions = validated_questions
             
-            # Create quiz in database
-            quiz = await prisma.quiz.create(
-                data={
-                    "title": f"Quiz on {material.title}",
-                    "description": f"Auto-generated quiz on {material.title}",
-                    "course_id": material.course_id,
-                    "material_id": material_id,
-                    "difficulty": difficulty,
-                    "time_limit": 10 * num_questions,  # 10 minutes per question
-                }
-            )
-            
-            # Create quiz questions in database
-            db_questions = []
-            for i, q in enumerate(questions):
-                options = json.dumps(q.get("options", [])) if q.get("options") else None
-                
-                question = await prisma.quizquestion.create(
+            # Create the quiz and its questions atomically
+            async with prisma.tx() as tx:
+                quiz = await tx.quiz.create(
                     data={
-                        "quiz_id": quiz.id,
-                        "question_text": q["question_text"],
-                        "question_type": q["question_type"],
-                        "options": options,
-                        "correct_answer": str(q["correct_answer"]),  # Convert to string for storage
-                        "explanation": q.get("explanation", ""),
-                        "points": 1,
-                        "order": i + 1,
+                        "title": f"Quiz on {material.title}",
+                        "description": f"Auto-generated quiz on {material.title}",
+                        "course_id": material.courseId,
+                        "material_id": material_id,
+                        "difficulty": difficulty,
+                        "time_limit": 10 * num_questions,  # 10 minutes per question
                     }
                 )
-                db_questions.append(question)
+                num_created = await self._create_questions(quiz.id, questions, tx)
             
             return {
                 "quiz_id": quiz.id,
                 "title": quiz.title,
                 "description": quiz.description,
-                "num_questions": len(db_questions),
+                "num_questions": num_created,
                 "difficulty": difficulty,
                 "time_limit": quiz.time_limit,
                 "questions": questions  # Return the generated questions
@@ -175,7 +190,7 @@ class QuizGenerationService:
             logger.error(f"Error generating quiz: {str(e)}")
             return {"error": f"Failed to generate quiz: {str(e)}"}
     
-    async def generate_quiz_from_course(self, course_id: str, num_questions: int = 10, question_types: List[str] = None, difficulty: str = "medium", use_templates: bool = True, adaptive: bool = False) -> Dict[str, Any]:
+    async def generate_quiz_from_course(self, course_id: str, num_questions: int = 10, question_types: List[str] = None, difficulty: str = "medium", use_templates: bool = True, adaptive: bool = False, background: bool = False) -> Dict[str, Any]:
         """Generate a comprehensive quiz from all materials in a course.
         
         Args:
@@ -185,6 +200,9 @@ class QuizGenerationService:
             difficulty: Difficulty level
             use_templates: Whether to use question templates for generation
             adaptive: Whether to generate adaptive questions based on student performance
+            background: Whether to generate the questions with an OpenAI Batch job.
+                The quiz is created without questions; collect_quiz_batch adds them
+                once the batch completes.
             
         Returns:
             Dictionary with quiz data and metadata
@@ -193,103 +211,109 @@ class QuizGenerationService:
             question_types = ["multiple_choice", "true_false"]
             
         # Validate question types
-        available_types = question_template_service.get_all_question_types()
-        question_types = [qt for qt in question_types if qt in available_types]
+        question_types = [qt for qt in question_types if qt in _AVAILABLE_TYPES]
         if not question_types:
             question_types = ["multiple_choice", "true_false"]
         
         # Validate difficulty
-        if difficulty not in ["easy", "medium", "hard"]:
+        if difficulty not in DIFFICULTY_LEVELS:
             difficulty = "medium"
         
         try:
             # Get the course and its materials
-            course = await prisma.course.find_unique(
-                where={"id": course_id},
-                include={"materials": True}
-            )
+            course = await prisma_service.get("course", course_id, select={"title": True})
             
             if not course:
                 logger.error(f"Course not found: {course_id}")
                 return {"error": "Course not found"}
             
-            if not course.materials or len(course.materials) == 0:
+            materials = await self._get_course_materials(course_id)
+            if not materials:
                 logger.error(f"No materials found for course: {course_id}")
                 return {"error": "No materials found for this course"}
             
             # Determine how many questions to generate per material
-            materials = course.materials
             questions_per_material = max(1, num_questions // len(materials))
             remaining_questions = num_questions % len(materials)
             
-            # Generate questions for each material
+            # Allocate questions to each material
+            allocations = [
+                (material, questions_per_material + (1 if i < remaining_questions else 0))
+                for i, material in enumerate(materials)
+            ]
+            allocations = [(material, count) for material, count in allocations if count > 0]
+            
+            if background:
+                return await self._submit_course_quiz_batch(course, allocations, question_types, difficulty)
+            
+            # Generate questions for all materials concurrently, within the OpenAI fan-out limit
+            semaphore = asyncio.Semaphore(openai_service.max_concurrent_requests)
+            
+            async def generate_for(material: Material, count: int) -> List[Dict[str, Any]]:
+                async with semaphore:
+                    return await openai_service.generate_quiz_questions(
+                        content=material.content,
+                        num_questions=count,
+                        question_types=question_types,
+                        difficulty=difficulty
+                    )
+            
+            # Materials with identical content share one request for all their questions
+            groups: Dict[str, List[Tuple[Material, int]]] = {}
+            for material, count in allocations:
+                content_hash = hashlib.sha256((material.content or "").encode()).hexdigest()
+                groups.setdefault(content_hash, []).append((material, count))
+            
+            results = await asyncio.gather(
+                *(generate_for(group[0][0], sum(count for _, count in group)) for group in groups.values()),
+                return_exceptions=True
+            )
+            
             all_questions = []
             material_distribution = []
             
-            for i, material in enumerate(materials):
-                # Allocate questions to this material
-                material_questions = questions_per_material
-                if i < remaining_questions:
-                    material_questions += 1
-                
-                if material_questions == 0:
+            for group, questions in zip(groups.values(), results):
+                # A failed material is skipped rather than failing the whole quiz
+                if isinstance(questions, Exception):
+                    material_ids = ", ".join(material.id for material, _ in group)
+                    logger.error(f"Error generating questions for material {material_ids}: {str(questions)}")
                     continue
                 
-                # Generate questions for this material
-                questions = await openai_service.generate_quiz_questions(
-                    content=material.content,
-                    num_questions=material_questions,
-                    question_types=question_types,
-                    difficulty=difficulty
-                )
-                
-                if questions:
-                    all_questions.extend(questions)
-                    material_distribution.append({
-                        "material_id": material.id,
-                        "material_title": material.title,
-                        "num_questions": len(questions)
-                    })
+                # Split the shared questions between the materials in the group
+                offset = 0
+                for material, count in group:
+                    material_questions = (questions or [])[offset:offset + count]
+                    offset += count
+                    if material_questions:
+                        all_questions.extend(material_questions)
+                        material_distribution.append({
+                            "material_id": material.id,
+                            "material_title": material.title,
+                            "num_questions": len(material_questions)
+                        })
             
             if not all_questions:
                 logger.error("Failed to generate any quiz questions")
                 return {"error": "Failed to generate quiz questions"}
             
-            # Create quiz in database
-            quiz = await prisma.quiz.create(
-                data={
-                    "title": f"Comprehensive Quiz for {course.title}",
-                    "description": f"Auto-generated quiz covering all materials in {course.title}",
-                    "course_id": course_id,
-                    "difficulty": difficulty,
-                    "time_limit": 10 * len(all_questions),  # 10 minutes per question
-                }
-            )
-            
-            # Create quiz questions in database
-            db_questions = []
-            for i, q in enumerate(all_questions):
-                options = json.dumps(q.get("options", [])) if q.get("options") else None
-                
-                question = await prisma.quizquestion.create(
+            # Create the quiz and its questions atomically
+            async with prisma.tx() as tx:
+                quiz = await tx.quiz.create(
                     data={
-                        "quiz_id": quiz.id,
-                        "question_text": q["question_text"],
-                        "question_type": q["question_type"],
-                        "options": options,
-                        "correct_answer": str(q["correct_answer"]),  # Convert to string for storage
-                        "explanation": q.get("explanation", ""),
-                        "points": 1,
-                        "order": i + 1,
+                        "title": f"Comprehensive Quiz for {course.title}",
+                        "description": f"Auto-generated quiz covering all materials in {course.title}",
+                        "course_id": course_id,
+                        "difficulty": difficulty,
+                        "time_limit": 10 * len(all_questions),  # 10 minutes per question
                     }
                 )
-                db_questions.append(question)
+                num_created = await self._create_questions(quiz.id, all_questions, tx)
             
             return {
                 "quiz_id": quiz.id,
                 "title": quiz.title,
                 "description": quiz.description,
-                "num_questions": len(db_questions),
+                "num_questions": num_created,
                 "difficulty": difficulty,
                 "time_limit": quiz.time_limit,
                 "material_distribution": material_distribution,
@@ -299,7 +323,214 @@ class QuizGenerationService:
             logger.error(f"Error generating course quiz: {str(e)}")
             return {"error": f"Failed to generate course quiz: {str(e)}"}
 
-    def _get_difficulty_guidelines(self, difficulty: str) -> str:
+    def _questions_cache_key(self, material: Material, num_questions: int, question_types: List[str], difficulty: str, use_templates: bool) -> str:
+        """Build the cache key of the questions generated for a material.
+        
+        The key covers the material's content and last update, so editing a
+        material stops its cached questions from being used.
+        """
+        content_hash = hashlib.sha256((material.content or "").encode()).hexdigest()
+        parts = [
+            material.id,
+            content_hash,
+            str(material.updatedAt),
+            ",".join(sorted(question_types)),
+            difficulty,
+            str(num_questions),
+            "templates" if use_templates else "plain"
+        ]
+        return "quiz:questions:" + hashlib.sha256(":".join(parts).encode()).hexdigest()
+    
+    async def _get_cached_questions(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Get cached generated questions, or None on a miss or without Redis."""
+        client = get_redis()
+        if client is None:
+            return None
+        
+        try:
+            cached = await client.get(key)
+            return orjson.loads(cached) if cached is not None else None
+        except Exception as e:
+            logger.warning(f"Error reading cached quiz questions {key}: {str(e)}")
+            return None
+    
+    async def _cache_questions(self, key: str, questions: List[Dict[str, Any]]) -> None:
+        """Cache generated questions for QUIZ_QUESTIONS_CACHE_TTL seconds."""
+        client = get_redis()
+        if client is None:
+            return
+        
+        try:
+            await client.set(key, orjson.dumps(questions), ex=settings.QUIZ_QUESTIONS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Error caching quiz questions {key}: {str(e)}")
+    
+    async def _submit_course_quiz_batch(self, course: Course, allocations: List[Any], question_types: List[str], difficulty: str) -> Dict[str, Any]:
+        """Submit a course quiz's question generation as one OpenAI Batch job.
+        
+        Args:
+            course: The course the quiz covers
+            allocations: (material, number of questions) pairs
+            question_types: Types of questions to generate
+            difficulty: Difficulty level
+            
+        Returns:
+            Dictionary with the pending quiz and its batch ID
+        """
+        batch_id = await openai_service.submit_quiz_batch({
+            material.id: {
+                "content": material.content,
+                "num_questions": count,
+                "question_types": question_types,
+                "difficulty": difficulty
+            }
+            for material, count in allocations
+        })
+        
+        num_questions = sum(count for _, count in allocations)
+        quiz = await prisma.quiz.create(
+            data={
+                "title": f"Comprehensive Quiz for {course.title}",
+                "description": f"Auto-generated quiz covering all materials in {course.title}",
+                "course_id": course.id,
+                "difficulty": difficulty,
+                "time_limit": 10 * num_questions,  # 10 minutes per question
+                "batch_id": batch_id,
+            }
+        )
+        
+        return {
+            "quiz_id": quiz.id,
+            "title": quiz.title,
+            "description": quiz.description,
+            "status": "pending",
+            "batch_id": batch_id,
+            "difficulty": difficulty,
+            "material_distribution": [
+                {"material_id": material.id, "material_title": material.title, "num_questions": count}
+                for material, count in allocations
+            ]
+        }
+    
+    async def collect_quiz_batch(self, quiz_id: str) -> Dict[str, Any]:
+        """Add the questions of a completed batch job to its quiz.
+        
+        Args:
+            quiz_id: ID of a quiz created with background=True
+            
+        Returns:
+            Dictionary with the collection status and number of questions created.
+            A batch that failed or produced no valid questions is reported as
+            failed and stays on the quiz.
+        """
+        try:
+            quiz = await prisma.quiz.find_unique(where={"id": quiz_id})
+            if not quiz or not quiz.batch_id:
+                return {"error": "No pending batch for this quiz"}
+            
+            try:
+                results = await openai_service.get_quiz_batch_results(quiz.batch_id)
+            except RuntimeError as e:
+                # The quiz keeps its batch ID so the failure is reported on every run
+                logger.error(f"Error collecting quiz batch: {str(e)}")
+                return {"quiz_id": quiz_id, "status": "failed", "error": str(e)}
+            if results is None:
+                return {"quiz_id": quiz_id, "status": "pending"}
+            
+            # Keep material order stable across results
+            validated = await asyncio.gather(*(
+                self.validate_question(q)
+                for material_id in sorted(results)
+                for q in results[material_id]
+            ))
+            questions = [q for q in validated if q]
+            if not questions:
+                logger.error(f"Quiz batch {quiz.batch_id} produced no valid questions")
+                return {"quiz_id": quiz_id, "status": "failed", "error": "Quiz batch produced no valid questions"}
+            
+            # Questions are stored and the batch cleared together, so a failed
+            # collection can be retried without duplicating questions
+            async with prisma.tx() as tx:
+                num_created = await self._create_questions(quiz_id, questions, tx)
+                await tx.quiz.update(
+                    where={"id": quiz_id},
+                    data={"batch_id": None, "time_limit": 10 * num_created}
+                )
+            
+            return {"quiz_id": quiz_id, "status": "completed", "num_questions": num_created}
+        except Exception as e:
+            logger.error(f"Error collecting quiz batch: {str(e)}")
+            return {"error": f"Failed to collect quiz batch: {str(e)}"}
+    
+    async def collect_pending_quiz_batches(self) -> List[Dict[str, Any]]:
+        """Collect every quiz whose batch job has not been collected yet.
+        
+        Returns:
+            Collection result of each pending quiz
+        """
+        quizzes = await prisma.quiz.find_many(where={"batch_id": {"not": None}})
+        return [await self.collect_quiz_batch(quiz.id) for quiz in quizzes]
+    
+    async def _get_course_materials(self, course_id: str) -> List[Material]:
+        """Get the ID, title and content of every material in a course.
+        
+        Args:
+            course_id: ID of the course
+            
+        Returns:
+            The course's materials, read a page at a time
+        """
+        materials = []
+        while True:
+            page = await prisma_service.get_many(
+                "material",
+                where={"courseId": course_id},
+                order_by={"id": "asc"},
+                skip=len(materials),
+                take=MAX_TAKE,
+                select=COURSE_MATERIAL_FIELDS
+            )
+            materials.extend(page)
+            if len(page) < MAX_TAKE:
+                return materials
+    
+    async def _create_questions(self, quiz_id: str, questions: List[Dict[str, Any]], client: Optional[Prisma] = None) -> int:
+        """Insert quiz questions with as few statements as possible.
+        
+        Args:
+            quiz_id: ID of the quiz the questions belong to
+            questions: Validated questions in quiz order
+            client: Client to insert with, such as an open transaction.
+                Defaults to the shared client.
+            
+        Returns:
+            Number of questions created
+        """
+        rows = [
+            {
+                "quiz_id": quiz_id,
+                "question_text": q["question_text"],
+                "question_type": q["question_type"],
+                "options": Json(q["options"]) if q.get("options") else None,
+                "correct_answer": str(q["correct_answer"]),  # Convert to string for storage
+                "explanation": q.get("explanation", ""),
+                "points": 1,
+                "order": i + 1,
+            }
+            for i, q in enumerate(questions)
+        ]
+        
+        client = client or prisma
+        created = 0
+        for start in range(0, len(rows), MAX_QUESTIONS_PER_INSERT):
+            created += await client.quizquestion.create_many(
+                data=rows[start:start + MAX_QUESTIONS_PER_INSERT],
+                skip_duplicates=False
+            )
+        return created
+    
+    @staticmethod
+    def _get_difficulty_guidelines(difficulty: str) -> str:
         """Get guidelines for a specific difficulty level.
         
         Args:
@@ -308,14 +539,7 @@ class QuizGenerationService:
         Returns:
             Guidelines string for the specified difficulty
         """
-        if difficulty == "easy":
-            return "Focus on basic recall and understanding. Questions should test fundamental concepts and definitions."
-        elif difficulty == "medium":
-            return "Focus on application and analysis. Questions should require understanding relationships between concepts."
-        elif difficulty == "hard":
-            return "Focus on evaluation and synthesis. Questions should require critical thinking and applying concepts to new situations."
-        else:
-            return "Balance between recall, application, and critical thinking."
+        return _DIFFICULTY_GUIDELINES.get(difficulty, _DEFAULT_GUIDELINES)
     
     async def validate_question(self, question: Dict[str, Any]) -> Dict[str, Any]:
         """Validate a generated question for quality and correctness.
@@ -340,26 +564,33 @@ class QuizGenerationService:
                 logger.error("Question missing correct_answer")
                 return None
             
+            question_type = question["question_type"]
+            correct_answer = question["correct_answer"]
+            
             # Type-specific validation
-            if question["question_type"] == "multiple_choice":
+            if question_type == "multiple_choice":
                 # Ensure options exist and are a list
-                if "options" not in question or not isinstance(question["options"], list):
+                options = question.get("options")
+                if not isinstance(options, list):
                     logger.error("Multiple choice question missing options list")
                     return None
                 
                 # Ensure there are at least 2 options
-                if len(question["options"]) < 2:
+                if len(options) < 2:
                     logger.error("Multiple choice question has fewer than 2 options")
                     return None
                 
-                # Ensure correct answer is in options
-                if question["correct_answer"] not in question["options"]:
+                # Ensure correct answer is in options, matching the option's exact text
+                normalized_options = {_normalize_answer(o): o for o in options if isinstance(o, str)}
+                option = normalized_options.get(_normalize_answer(correct_answer)) if isinstance(correct_answer, str) else None
+                if option is None:
                     logger.error("Multiple choice question correct answer not in options")
                     return None
+                question["correct_answer"] = option
             
-            elif question["question_type"] == "true_false":
+            elif question_type == "true_false":
                 # Ensure correct answer is boolean or string boolean
-                if not isinstance(question["correct_answer"], bool) and question["correct_answer"].lower() not in ["true", "false"]:
+                if not isinstance(correct_answer, bool) and correct_answer.lower() not in _TRUE_FALSE_ANSWERS:
                     logger.error("True/false question correct answer not boolean")
                     return None
             
@@ -1,11 +1,87 @@
+import os
 import re
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from bisect import bisect_right
+from typing import List, Dict, Any, Callable, Iterator, NamedTuple, Optional, Tuple, Union
 import logging
 
+# Native splitters, used instead of the pure-Python cascade when installed
+try:
+    from semantic_text_splitter import MarkdownSplitter, TextSplitter
+except ImportError:
+    MarkdownSplitter = TextSplitter = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Patterns compiled once rather than looked up on every call
+_MULTI_NEWLINE = re.compile(r'\n{3,}')
+_MULTI_SPACE = re.compile(r'[ \t]{2,}')
+# Every pair of characters that starts a run _MULTI_SPACE collapses
+_SPACE_PAIRS = ('  ', '\t\t', ' \t', '\t ')
+# Header lines anywhere in a document; the gap after the hashes may not span lines
+_MARKDOWN_HEADER = re.compile(r'^#{1,6}[^\S\n]+.+$', re.MULTILINE)
+
+# Break candidates, as lookaheads so overlapping matches are all found
+_PARAGRAPH_BREAK = re.compile(r'(?=\n\n)')
+_LINE_BREAK = re.compile(r'\n')
+_SENTENCE_BREAK = re.compile(r'(?=[.!?][ \n])')
+_WORD_BREAK = re.compile(r' ')
+_BREAK_PATTERNS = (_PARAGRAPH_BREAK, _LINE_BREAK, _SENTENCE_BREAK, _WORD_BREAK)
+# The same patterns over UTF-8 bytes; every break is ASCII so it is always a character boundary
+_BYTE_BREAK_PATTERNS = tuple(re.compile(p.pattern.encode()) for p in _BREAK_PATTERNS)
+
+# Priority of the break a chunk ended at, strongest first
+PARAGRAPH_BREAK = 3
+LINE_BREAK = 2
+SENTENCE_BREAK = 1
+WORD_BREAK = 0
+NO_BREAK = -1
+
+class BreakIndex(NamedTuple):
+    """Sorted start positions of each kind of break point in a text."""
+    paragraphs: List[int]
+    lines: List[int]
+    sentences: List[int]
+    words: List[int]
+
+def _last_break(positions: List[int], start: int, end: int, length: int) -> int:
+    """Find the last break of the given length lying entirely in text[start:end].
+    
+    Returns:
+        The break's start position, or -1 if there is none
+    """
+    i = bisect_right(positions, end - length) - 1
+    if i >= 0 and positions[i] >= start:
+        return positions[i]
+    return -1
+
+def _char_boundary(data: bytes, position: int) -> int:
+    """Move a byte offset forward past UTF-8 continuation bytes.
+    
+    Returns:
+        The first offset at or after position that starts a character
+    """
+    while position < len(data) and data[position] & 0xC0 == 0x80:
+        position += 1
+    return position
+
+# Chunking service of a chunk_many worker process
+_worker_service: Optional["TextChunkingService"] = None
+
+def _init_chunk_worker(chunk_size: int, chunk_overlap: int) -> None:
+    """Create the chunking service used by a chunk_many worker process."""
+    global _worker_service
+    _worker_service = TextChunkingService(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+def _chunk_in_worker(markdown: bool, text: str) -> List[str]:
+    """Chunk one text in a chunk_many worker process."""
+    if markdown:
+        return _worker_service.chunk_markdown(text)
+    return _worker_service.chunk_text(text)
+
 class TextChunkingService:
     """Service for chunking text content for embedding generation."""
     
@@ -18,6 +94,13 @@ class TextChunkingService:
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        
+        # Split with the native splitters when semantic-text-splitter is installed
+        self._splitter = None
+        self._markdown_splitter = None
+        if TextSplitter is not None:
+            self._splitter = TextSplitter(capacity=chunk_size, overlap=chunk_overlap)
+            self._markdown_splitter = MarkdownSplitter(capacity=chunk_size, overlap=chunk_overlap)
     
     def chunk_text(self, text: str) -> List[str]:
         """Split text into overlapping chunks of specified size.
@@ -28,42 +111,120 @@ class TextChunkingService:
         Returns:
             List of text chunks
         """
+        return list(self.iter_chunks(text))
+    
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """Lazily split text into overlapping chunks of specified size.
+        
+        Yields the same chunks as chunk_text one at a time, so consumers that
+        process chunks one by one never hold the whole list in memory.
+        
+        Args:
+            text: The text to split into chunks
+            
+        Yields:
+            Text chunks
+        """
         if not text:
-            return []
+            return
         
         # Clean the text
         text = self._clean_text(text)
         
-        # If text is shorter than chunk size, return it as a single chunk
+        if self._splitter is not None:
+            yield from self._splitter.chunks(text)
+            return
+        
+        # If text is shorter than chunk size, yield it as a single chunk
         if len(text) <= self.chunk_size:
-            return [text]
+            yield text
+            return
         
-        chunks = []
+        # Index every break point once instead of scanning for each chunk
+        breaks = self._build_break_index(text)
+        
+        for start, chunk_end in self._chunk_bounds(len(text), breaks):
+            yield text[start:chunk_end]
+    
+    def iter_chunks_bytes(self, text: str) -> Iterator[memoryview]:
+        """Split text into overlapping chunks of UTF-8 bytes without copying them.
+        
+        The text is encoded once and every chunk is a memoryview slice of that
+        buffer. Sizes and overlaps are measured in bytes, and chunk edges are
+        moved forward so they never split a multi-byte character.
+        
+        Args:
+            text: The text to split into chunks
+            
+        Yields:
+            Read-only memoryview slices of the encoded text
+        """
+        if not text:
+            return
+        
+        data = self._clean_text(text).encode('utf-8')
+        view = memoryview(data)
+        
+        if len(data) <= self.chunk_size:
+            yield view
+            return
+        
+        breaks = self._build_break_index(data)
+        align = partial(_char_boundary, data)
+        
+        for start, chunk_end in self._chunk_bounds(len(data), breaks, align):
+            yield view[start:chunk_end]
+    
+    def _chunk_bounds(
+        self,
+        length: int,
+        breaks: BreakIndex,
+        align: Optional[Callable[[int], int]] = None
+    ) -> Iterator[Tuple[int, int]]:
+        """Compute the start and end offsets of each chunk.
+        
+        Args:
+            length: Length of the text being chunked
+            breaks: Break index of the text being chunked
+            align: Optional function moving an offset to a valid boundary
+            
+        Yields:
+            (start, end) offsets of each chunk
+        """
         start = 0
         
-        while start < len(text):
+        while start < length:
             # Find the end of the current chunk
             end = start + self.chunk_size
             
-            if end >= len(text):
+            if end >= length:
                 # Last chunk
-                chunks.append(text[start:])
+                yield start, length
                 break
             
             # Try to find a natural break point (paragraph, sentence, or word boundary)
-            chunk_end = self._find_break_point(text, end)
+            chunk_end, priority = self._find_break_point(breaks, end)
             
-            # Add the chunk
-            chunks.append(text[start:chunk_end])
+            # A break too close to the start would not advance past the overlap
+            if chunk_end - self.chunk_overlap <= start:
+                chunk_end, priority = end, NO_BREAK
+            if align:
+                chunk_end = align(chunk_end)
             
-            # Move the start position for the next chunk, accounting for overlap
-            start = chunk_end - self.chunk_overlap
+            yield start, chunk_end
             
-            # Ensure we're not stuck in a loop
-            if start >= len(text) - 1:
-                break
-        
-        return chunks
+            # A paragraph ends a thought, so the next chunk starts fresh after it;
+            # otherwise move the start back to overlap with this chunk
+            if priority == PARAGRAPH_BREAK:
+                start = chunk_end
+            else:
+                start = chunk_end - self.chunk_overlap
+                if align:
+                    start = align(start)
+                
+                # Ensure we're not stuck in a loop
+                if start >= length - 1:
+                    break
     
     def chunk_markdown(self, markdown: str) -> List[str]:
         """Split markdown text into chunks based on headers and sections.
@@ -77,21 +238,15 @@ class TextChunkingService:
         if not markdown:
             return []
         
-        # Split by headers
-        header_pattern = r'^#{1,6}\s+.+$'
-        lines = markdown.split('\n')
-        sections = []
-        current_section = []
-        
-        for line in lines:
-            if re.match(header_pattern, line) and current_section:
-                sections.append('\n'.join(current_section))
-                current_section = [line]
-            else:
-                current_section.append(line)
+        if self._markdown_splitter is not None:
+            return self._markdown_splitter.chunks(markdown)
         
-        if current_section:
-            sections.append('\n'.join(current_section))
+        # Split by headers, found in a single scan of the whole document
+        boundaries = [m.start() for m in _MARKDOWN_HEADER.finditer(markdown) if m.start() > 0]
+        starts = [0] + boundaries
+        # Each section ends just before the newline preceding the next header
+        ends = [position - 1 for position in boundaries] + [len(markdown)]
+        sections = [markdown[start:end] for start, end in zip(starts, ends)]
         
         # Further chunk each section if it's too large
         chunks = []
@@ -99,57 +254,97 @@ class TextChunkingService:
             if len(section) <= self.chunk_size:
                 chunks.append(section)
             else:
-                chunks.extend(self.chunk_text(section))
+                chunks.extend(self.iter_chunks(section))
         
         return chunks
     
+    def chunk_many(self, texts: List[str], markdown: bool = False, max_workers: Optional[int] = None) -> List[List[str]]:
+        """Chunk many texts in parallel worker processes.
+        
+        Chunking is pure-Python CPU work, so processes rather than threads
+        are needed to use more than one core. A single text, or a single
+        worker, is chunked in this process.
+        
+        Args:
+            texts: The texts to split into chunks
+            markdown: Whether to split the texts as markdown
+            max_workers: Number of worker processes, defaults to the CPU count
+            
+        Returns:
+            Chunks of each text, in the order of texts
+        """
+        max_workers = min(max_workers or os.cpu_count() or 1, len(texts))
+        chunk = self.chunk_markdown if markdown else self.chunk_text
+        if max_workers <= 1:
+            return [chunk(text) for text in texts]
+        
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_chunk_worker,
+            initargs=(self.chunk_size, self.chunk_overlap)
+        ) as executor:
+            return list(executor.map(partial(_chunk_in_worker, markdown), texts, chunksize=8))
+    
     def _clean_text(self, text: str) -> str:
         """Clean text by removing extra whitespace and normalizing line breaks."""
-        # Replace multiple newlines with a single newline
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        # Replace multiple spaces with a single space
-        text = re.sub(r'\s{2,}', ' ', text)
+        # Already-clean text skips both regex passes; substring checks are much cheaper
+        if '\n\n\n' not in text and not any(pair in text for pair in _SPACE_PAIRS):
+            return text.strip()
+        
+        # Collapse runs of blank lines into a single paragraph break
+        text = _MULTI_NEWLINE.sub('\n\n', text)
+        # Replace multiple spaces or tabs with a single space, keeping line breaks
+        text = _MULTI_SPACE.sub(' ', text)
         return text.strip()
     
-    def _find_break_point(self, text: str, position: int) -> int:
+    def _build_break_index(self, text: Union[str, bytes]) -> BreakIndex:
+        """Find every paragraph, line, sentence and word break in a text.
+        
+        Args:
+            text: The cleaned text, or its UTF-8 encoding, to index
+            
+        Returns:
+            Sorted break positions of each kind
+        """
+        patterns = _BYTE_BREAK_PATTERNS if isinstance(text, bytes) else _BREAK_PATTERNS
+        return BreakIndex(*([m.start() for m in pattern.finditer(text)] for pattern in patterns))
+    
+    def _find_break_point(self, breaks: BreakIndex, position: int) -> Tuple[int, int]:
         """Find a natural break point near the specified position.
         
         Tries to find a paragraph break, then a sentence break, then a word break.
         
         Args:
-            text: The text to search in
+            breaks: Break index of the text being chunked
             position: The approximate position to find a break
             
         Returns:
-            The position of the natural break point
+            The position of the natural break point and the priority of its kind
         """
+        window_start = position - self.chunk_size
+        
         # Look for paragraph break
-        paragraph_break = text.rfind('\n\n', position - self.chunk_size, position + 100)
-        if paragraph_break != -1 and paragraph_break <= position + 100:
-            return paragraph_break + 2
+        paragraph_break = _last_break(breaks.paragraphs, window_start, position + 100, 2)
+        if paragraph_break != -1:
+            return paragraph_break + 2, PARAGRAPH_BREAK
         
         # Look for single newline
-        newline_break = text.rfind('\n', position - self.chunk_size, position + 50)
-        if newline_break != -1 and newline_break <= position + 50:
-            return newline_break + 1
+        newline_break = _last_break(breaks.lines, window_start, position + 50, 1)
+        if newline_break != -1:
+            return newline_break + 1, LINE_BREAK
         
         # Look for sentence break
-        sentence_break = -1
-        for pattern in ['. ', '! ', '? ', '.\n', '!\n', '?\n']:
-            temp_break = text.rfind(pattern, position - self.chunk_size, position + 20)
-            if temp_break > sentence_break:
-                sentence_break = temp_break
-        
-        if sentence_break != -1 and sentence_break <= position + 20:
-            return sentence_break + 2
+        sentence_break = _last_break(breaks.sentences, window_start, position + 20, 2)
+        if sentence_break != -1:
+            return sentence_break + 2, SENTENCE_BREAK
         
         # Look for word break
-        word_break = text.rfind(' ', position - 50, position)
+        word_break = _last_break(breaks.words, position - 50, position, 1)
         if word_break != -1:
-            return word_break + 1
+            return word_break + 1, WORD_BREAK
         
         # If no natural break point is found, just break at the position
-        return position
+        return position, NO_BREAK
 
 # Create a singleton instance of the TextChunkingService
 text_chunking_service = TextChunkingService()
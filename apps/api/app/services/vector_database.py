@@ -1,201 +1,422 @@
 import os
+import hashlib
 import logging
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Tuple
 import asyncio
 import asyncpg
+from asyncpg.transaction import Transaction
 import numpy as np
+from pgvector.asyncpg import register_vector
 from prisma.models import ContentChunk, Material
 from prisma.client import Prisma
 
 from app.core.config import settings
-from app.services.openai import openai_service
+from app.services.openai import embedding_batcher
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Search queries are sent with parameters only, so asyncpg prepares each once
+# per connection and reuses it from the connection's statement cache
+_SET_EF_SEARCH_SQL = "SELECT set_config('hnsw.ef_search', $1, true)"
+_SEARCH_CHUNKS_SQL = """SELECT id,
+    CASE WHEN $5::int IS NULL THEN content ELSE LEFT(content, $5::int) END AS content,
+    material_id,
+    similarity
+FROM search_content_chunks($1::halfvec, $2, $3, $4)"""
+_SEARCH_MATERIALS_SQL = """SELECT * FROM (
+    SELECT DISTINCT ON (material_id)
+        material_id,
+        CASE WHEN length(content) > 100
+            THEN LEFT(content, 100) || '...'
+            ELSE content END AS sample_content,
+        similarity
+    FROM (
+        SELECT material_id, content, 1 - (embedding <=> $1::halfvec) AS similarity
+        FROM content_chunks
+        WHERE embedding IS NOT NULL
+        ORDER BY embedding <=> $1::halfvec
+        LIMIT $4
+    ) nearest
+    WHERE similarity > $2
+    ORDER BY material_id, similarity DESC
+) best
+ORDER BY similarity DESC
+LIMIT $3"""
+
+def _as_vector(embedding: List[float]) -> np.ndarray:
+    """Convert an embedding to the array type sent with the binary pgvector codecs."""
+    return np.asarray(embedding, dtype=np.float32)
+
+@dataclass
+class ChunkClaim:
+    """Content chunks locked by an open transaction on a pool connection."""
+    connection: asyncpg.Connection
+    transaction: Transaction
+    chunks: List[Dict[str, Any]]
+
 class VectorDatabaseService:
     """Service for interacting with pgvector database for vector embeddings and similarity search."""
     
     def __init__(self):
         """Initialize the vector database service."""
         self.db_url = settings.DATABASE_URL
-        self.embedding_dimension = 1536  # OpenAI embedding dimension
-        self.similarity_threshold = 0.7  # Default similarity threshold
+        self.embedding_dimension = settings.OPENAI_EMBEDDING_DIMENSIONS  # Stored as halfvec
+        self.similarity_threshold = 0.7  # Default minimum cosine similarity
+        self.hnsw_ef_search = 40  # HNSW candidate list size; higher trades speed for recall
+        self.rerank_factor = 10  # Binary-quantized shortlist size, as a multiple of match_count
+        self.query_cache_size = 1024  # Query embeddings kept in the in-process LRU cache
+        self._query_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
         self.match_count = 10  # Default number of matches to return
+        self.pool_min_size = 2  # Connections kept open in the asyncpg pool
+        self.pool_max_size = 10  # Most connections the asyncpg pool opens
+        self.statement_cache_size = 100  # Prepared statements asyncpg keeps per connection
         self.prisma = Prisma()
+        self.pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+    
+    async def _get_pool(self) -> asyncpg.Pool:
+        """Get the shared asyncpg pool, creating it on first use."""
+        if self.pool is None:
+            async with self._pool_lock:
+                if self.pool is None:
+                    self.pool = await asyncpg.create_pool(
+                        self.db_url,
+                        min_size=self.pool_min_size,
+                        max_size=self.pool_max_size,
+                        statement_cache_size=self.statement_cache_size,
+                        init=self._init_connection
+                    )
+        return self.pool
+    
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        """Register the binary pgvector codecs on a new pool connection."""
+        try:
+            await register_vector(conn)
+        except ValueError:
+            # The extension is not installed yet; ensure_pgvector_extension
+            # recycles the pool connections once it has been created
+            logger.warning("pgvector types not found, vector codecs not registered")
     
     async def connect(self) -> None:
         """Connect to the database."""
         try:
             await self.prisma.connect()
+            await self._get_pool()
             logger.info("Connected to database")
         except Exception as e:
-            logger.error(f"Error connecting to database: {str(e)}")
+            logger.error("Error connecting to database: %s", e)
             raise
     
     async def disconnect(self) -> None:
         """Disconnect from the database."""
         try:
             await self.prisma.disconnect()
+            if self.pool is not None:
+                await self.pool.close()
+                self.pool = None
             logger.info("Disconnected from database")
         except Exception as e:
-            logger.error(f"Error disconnecting from database: {str(e)}")
+            logger.error("Error disconnecting from database: %s", e)
     
     async def ensure_pgvector_extension(self) -> bool:
         """Ensure pgvector extension is enabled in the database."""
         try:
-            # Connect directly with asyncpg to run raw SQL
-            conn = await asyncpg.connect(self.db_url)
-            
-            # Check if pgvector extension is already installed
-            extension_exists = await conn.fetchval(
-                """SELECT EXISTS (
-                    SELECT 1 FROM pg_extension WHERE extname = 'vector'
-                )"""
-            )
-            
-            if not extension_exists:
-                # Create the extension
-                await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-                logger.info("pgvector extension enabled")
-            else:
-                logger.info("pgvector extension already enabled")
-            
-            await conn.close()
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                # Check if pgvector extension is already installed
+                extension_exists = await conn.fetchval(
+                    """SELECT EXISTS (
+                        SELECT 1 FROM pg_extension WHERE extname = 'vector'
+                    )"""
+                )
+                
+                if not extension_exists:
+                    # Create the extension
+                    await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+                    logger.info("pgvector extension enabled")
+                    # Reconnect so every connection registers the vector codecs
+                    await pool.expire_connections()
+                else:
+                    logger.info("pgvector extension already enabled")
             return True
         except Exception as e:
-            logger.error(f"Error ensuring pgvector extension: {str(e)}")
+            logger.error("Error ensuring pgvector extension: %s", e)
             return False
     
     async def create_vector_index(self) -> bool:
         """Create vector index on content_chunks table if it doesn't exist."""
         try:
-            # Connect directly with asyncpg to run raw SQL
-            conn = await asyncpg.connect(self.db_url)
-            
-            # Check if the index already exists
-            index_exists = await conn.fetchval(
-                """SELECT EXISTS (
-                    SELECT 1 FROM pg_indexes WHERE indexname = 'content_chunks_embedding_idx'
-                )"""
-            )
-            
-            if not index_exists:
-                # Create the index
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                # Check if the index already exists
+                index_definition = await conn.fetchval(
+                    """SELECT indexdef FROM pg_indexes 
+                    WHERE indexname = 'content_chunks_embedding_idx'"""
+                )
+                
+                if index_definition and 'halfvec_cosine_ops' in index_definition:
+                    logger.info("Vector index already exists on content_chunks table")
+                else:
+                    # Create the index, replacing an older IVFFlat or full-precision index
+                    await conn.execute("DROP INDEX IF EXISTS content_chunks_embedding_idx;")
+                    await conn.execute(
+                        """CREATE INDEX content_chunks_embedding_idx 
+                        ON content_chunks USING hnsw (embedding halfvec_cosine_ops) 
+                        WITH (m = 16, ef_construction = 64);"""
+                    )
+                    logger.info("Vector index created on content_chunks table")
+                
+                # Hamming index over binary-quantized embeddings, for search shortlists
                 await conn.execute(
-                    """CREATE INDEX content_chunks_embedding_idx 
-                    ON content_chunks USING ivfflat (embedding vector_l2_ops) 
-                    WITH (lists = 100);"""
+                    f"""CREATE INDEX IF NOT EXISTS content_chunks_embedding_bits_idx 
+                    ON content_chunks USING hnsw ((binary_quantize(embedding)::bit({int(self.embedding_dimension)})) bit_hamming_ops) 
+                    WITH (m = 16, ef_construction = 64);"""
                 )
-                logger.info("Vector index created on content_chunks table")
-            else:
-                logger.info("Vector index already exists on content_chunks table")
-            
-            await conn.close()
             return True
         except Exception as e:
-            logger.error(f"Error creating vector index: {str(e)}")
+            logger.error("Error creating vector index: %s", e)
             return False
     
     async def generate_and_store_embeddings(self, content_chunk_id: str, content: str) -> bool:
         """Generate embeddings for content and store in the database."""
         try:
-            # Generate embeddings using OpenAI
-            embeddings = await openai_service.generate_embeddings([content])
-            if not embeddings or len(embeddings) == 0:
-                logger.error(f"Failed to generate embeddings for content chunk {content_chunk_id}")
+            # Generate embeddings using OpenAI, batched with other concurrent requests
+            embedding = await embedding_batcher.embed(content)
+            if not embedding:
+                logger.error("Failed to generate embeddings for content chunk %s", content_chunk_id)
                 return False
             
-            embedding = embeddings[0]
-            
-            # Connect directly with asyncpg to update the embedding
-            conn = await asyncpg.connect(self.db_url)
-            
-            # Update the embedding in the database
-            await conn.execute(
-                """UPDATE content_chunks 
-                SET embedding = $1::vector 
-                WHERE id = $2""",
-                embedding, content_chunk_id
-            )
-            
-            await conn.close()
-            logger.info(f"Embeddings stored for content chunk {content_chunk_id}")
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                # Update the embedding in the database
+                await conn.execute(
+                    """UPDATE content_chunks 
+                    SET embedding = $1::halfvec 
+                    WHERE id = $2""",
+                    _as_vector(embedding), content_chunk_id
+                )
+            logger.info("Embeddings stored for content chunk %s", content_chunk_id)
             return True
         except Exception as e:
-            logger.error(f"Error storing embeddings: {str(e)}")
+            logger.error("Error storing embeddings: %s", e)
             return False
     
+    async def generate_embedding_records(self, content_chunks: List[Dict[str, Any]]) -> Optional[List[Tuple[str, np.ndarray]]]:
+        """Generate embeddings for content chunks without storing them.
+        
+        Args:
+            content_chunks: Chunks with 'id' and 'content' keys
+            
+        Returns:
+            (chunk id, embedding) records for store_embedding_records, or None on failure
+        """
+        try:
+            # Extract content and IDs
+            contents = [chunk['content'] for chunk in content_chunks]
+            chunk_ids = [chunk['id'] for chunk in content_chunks]
+            
+            # Generate embeddings in batch, once per distinct content (repeated
+            # headers and footers in extracted documents are common)
+            unique_contents = list(dict.fromkeys(contents))
+            embeddings = await embedding_batcher.embed_many(unique_contents)
+            if not embeddings or len(embeddings) != len(unique_contents):
+                logger.error("Failed to generate embeddings for batch content chunks")
+                return None
+            vector_by_content = {
+                content: _as_vector(embedding)
+                for content, embedding in zip(unique_contents, embeddings)
+            }
+            return [
+                (chunk_id, vector_by_content[content])
+                for chunk_id, content in zip(chunk_ids, contents)
+            ]
+        except Exception as e:
+            logger.error("Error generating batch embeddings: %s", e)
+            return None
+    
+    async def _copy_embeddings(self, conn: asyncpg.Connection, records: List[Tuple[str, np.ndarray]]) -> None:
+        """Store embedding records; must run inside a transaction on conn."""
+        # COPY the embeddings into a temporary table and apply them with a
+        # single UPDATE, instead of one round trip per chunk
+        await conn.execute(
+            """CREATE TEMP TABLE tmp_embeddings (id text, embedding halfvec) 
+            ON COMMIT DROP"""
+        )
+        await conn.copy_records_to_table(
+            'tmp_embeddings',
+            records=records,
+            columns=['id', 'embedding']
+        )
+        await conn.execute(
+            """UPDATE content_chunks c 
+            SET embedding = t.embedding 
+            FROM tmp_embeddings t 
+            WHERE c.id = t.id"""
+        )
+    
     async def batch_generate_embeddings(self, content_chunks: List[Dict[str, Any]]) -> bool:
         """Generate and store embeddings for multiple content chunks in batch."""
         try:
             if not content_chunks:
                 return True
             
-            # Extract content and IDs
-            contents = [chunk['content'] for chunk in content_chunks]
-            chunk_ids = [chunk['id'] for chunk in content_chunks]
-            
-            # Generate embeddings in batch
-            embeddings = await openai_service.generate_embeddings(contents)
-            if not embeddings or len(embeddings) != len(contents):
-                logger.error(f"Failed to generate embeddings for batch content chunks")
+            records = await self.generate_embedding_records(content_chunks)
+            if records is None:
                 return False
-            
-            # Connect directly with asyncpg to update the embeddings
-            conn = await asyncpg.connect(self.db_url)
-            
-            # Use a transaction for batch updates
-            async with conn.transaction():
-                for i, chunk_id in enumerate(chunk_ids):
-                    await conn.execute(
-                        """UPDATE content_chunks 
-                        SET embedding = $1::vector 
-                        WHERE id = $2""",
-                        embeddings[i], chunk_id
-                    )
-            
-            await conn.close()
-            logger.info(f"Embeddings stored for {len(content_chunks)} content chunks")
-            return True
+            return await self.store_embedding_records(records)
         except Exception as e:
-            logger.error(f"Error storing batch embeddings: {str(e)}")
+            logger.error("Error storing batch embeddings: %s", e)
             return False
     
-    async def get_content_chunks_without_embeddings(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get content chunks that don't have embeddings yet."""
+    async def store_embedding_records(self, records: List[Tuple[str, np.ndarray]]) -> bool:
+        """Store embeddings produced by generate_embedding_records."""
         try:
-            # Connect directly with asyncpg to run raw SQL
-            conn = await asyncpg.connect(self.db_url)
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await self._copy_embeddings(conn, records)
+            logger.info("Embeddings stored for %d content chunks", len(records))
+            return True
+        except Exception as e:
+            logger.error("Error storing batch embeddings: %s", e)
+            return False
+    
+    async def claim_pending_chunks(self, limit: int = 100) -> Optional[ChunkClaim]:
+        """Claim content chunks without embeddings.
+        
+        The rows are locked in a transaction that stays open until the claim is
+        passed to store_claimed_embeddings or release_claim, and rows locked by
+        another claim are skipped, so several workers or processes can embed
+        concurrently without embedding the same chunk twice.
+        
+        Args:
+            limit: Maximum number of chunks to claim
             
-            # Get content chunks without embeddings
+        Returns:
+            The claim, or None when no chunks are left or on failure
+        """
+        pool = await self._get_pool()
+        conn = await pool.acquire()
+        transaction = conn.transaction()
+        try:
+            await transaction.start()
             rows = await conn.fetch(
                 """SELECT id, content, material_id 
                 FROM content_chunks 
                 WHERE embedding IS NULL 
-                LIMIT $1""",
+                ORDER BY id 
+                LIMIT $1 
+                FOR UPDATE SKIP LOCKED""",
                 limit
             )
-            
-            # Convert to list of dictionaries
-            content_chunks = [
-                {
-                    'id': row['id'],
-                    'content': row['content'],
-                    'material_id': row['material_id']
-                }
-                for row in rows
-            ]
-            
-            await conn.close()
+        except Exception as e:
+            logger.error("Error claiming content chunks: %s", e)
+            await self.release_claim(ChunkClaim(conn, transaction, []))
+            return None
+        
+        if not rows:
+            await self.release_claim(ChunkClaim(conn, transaction, []))
+            return None
+        
+        chunks = [
+            {'id': row['id'], 'content': row['content'], 'material_id': row['material_id']}
+            for row in rows
+        ]
+        return ChunkClaim(conn, transaction, chunks)
+    
+    async def store_claimed_embeddings(self, claim: ChunkClaim, records: List[Tuple[str, np.ndarray]]) -> bool:
+        """Store embeddings for claimed chunks and commit the claim."""
+        try:
+            await self._copy_embeddings(claim.connection, records)
+            await claim.transaction.commit()
+        except Exception as e:
+            logger.error("Error storing claimed embeddings: %s", e)
+            await self.release_claim(claim)
+            return False
+        
+        await self.pool.release(claim.connection)
+        logger.info("Embeddings stored for %d content chunks", len(records))
+        return True
+    
+    async def release_claim(self, claim: ChunkClaim) -> None:
+        """Roll back a claim, unlocking its chunks for the next worker."""
+        try:
+            await claim.transaction.rollback()
+        except Exception as e:
+            logger.warning("Error rolling back content chunk claim: %s", e)
+        finally:
+            await self.pool.release(claim.connection)
+    
+    async def get_content_chunks_without_embeddings(self, limit: int = 100, after_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get content chunks that don't have embeddings yet, ordered by id.
+        
+        Pass the last id of the previous page as after_id to page through
+        chunks whose embeddings have not been stored yet.
+        """
+        try:
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                # Get content chunks without embeddings
+                rows = await conn.fetch(
+                    """SELECT id, content, material_id 
+                    FROM content_chunks 
+                    WHERE embedding IS NULL 
+                    AND ($2::text IS NULL OR id > $2) 
+                    ORDER BY id 
+                    LIMIT $1""",
+                    limit,
+                    after_id
+                )
+                
+                # Convert to list of dictionaries
+                content_chunks = [
+                    {
+                        'id': row['id'],
+                        'content': row['content'],
+                        'material_id': row['material_id']
+                    }
+                    for row in rows
+                ]
             return content_chunks
         except Exception as e:
-            logger.error(f"Error getting content chunks without embeddings: {str(e)}")
+            logger.error("Error getting content chunks without embeddings: %s", e)
             return []
     
-    async def similarity_search(self, query: str, similarity_threshold: float = None, match_count: int = None) -> List[Dict[str, Any]]:
-        """Search for similar content using vector similarity."""
+    async def embed_query(self, query: str) -> List[float]:
+        """Get the embedding of a search query, reusing recent embeddings of the same query.
+        
+        Queries are matched ignoring case and surrounding or repeated whitespace.
+        """
+        key = hashlib.blake2b(" ".join(query.split()).lower().encode(), digest_size=16).hexdigest()
+        embedding = self._query_embeddings.get(key)
+        if embedding is not None:
+            self._query_embeddings.move_to_end(key)
+            return embedding
+        
+        # Generate embedding for the query, batched with other concurrent requests
+        embedding = await embedding_batcher.embed(query)
+        if embedding:
+            self._query_embeddings[key] = embedding
+            if len(self._query_embeddings) > self.query_cache_size:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+    
+    async def similarity_search(
+        self,
+        query: str,
+        similarity_threshold: float = None,
+        match_count: int = None,
+        query_embedding: Optional[List[float]] = None,
+        content_length: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar content using vector similarity.
+        
+        Pass query_embedding to search with an embedding computed earlier,
+        skipping the embedding request entirely. Pass content_length to get
+        only the start of each chunk's content, truncated in the database.
+        """
         try:
             # Use default values if not provided
             if similarity_threshold is None:
@@ -203,38 +424,92 @@ class VectorDatabaseService:
             if match_count is None:
                 match_count = self.match_count
             
-            # Generate embedding for the query
-            query_embeddings = await openai_service.generate_embeddings([query])
-            if not query_embeddings or len(query_embeddings) == 0:
+            if query_embedding is None:
+                query_embedding = await self.embed_query(query)
+            if not query_embedding:
                 logger.error("Failed to generate embeddings for query")
                 return []
             
-            query_embedding = query_embeddings[0]
-            
-            # Connect directly with asyncpg to run similarity search
-            conn = await asyncpg.connect(self.db_url)
-            
-            # Run similarity search using the search_content_chunks function
-            rows = await conn.fetch(
-                """SELECT * FROM search_content_chunks($1::vector, $2, $3)""",
-                query_embedding, similarity_threshold, match_count
-            )
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                # Run similarity search using the search_content_chunks function,
+                # which shortlists by Hamming distance and reranks by cosine.
+                # An HNSW scan returns at most ef_search rows, so it must
+                # cover the whole shortlist (pgvector caps it at 1000).
+                shortlist_size = match_count * self.rerank_factor
+                ef_search = min(max(self.hnsw_ef_search, shortlist_size), 1000)
+                async with conn.transaction():
+                    await conn.execute(_SET_EF_SEARCH_SQL, str(ef_search))
+                    rows = await conn.fetch(
+                        _SEARCH_CHUNKS_SQL,
+                        _as_vector(query_embedding), similarity_threshold, match_count, self.rerank_factor,
+                        content_length
+                    )
+                
+                # Convert to list of dictionaries
+                results = [
+                    {
+                        'id': row['id'],
+                        'content': row['content'],
+                        'material_id': row['material_id'],
+                        'similarity': row['similarity']
+                    }
+                    for row in rows
+                ]
+            return results
+        except Exception as e:
+            logger.error("Error performing similarity search: %s", e)
+            return []
+    
+    async def similarity_search_materials(
+        self,
+        query: str,
+        similarity_threshold: float = None,
+        match_count: int = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for the materials with the most similar content.
+        
+        Each material is scored by its most similar chunk.
+        """
+        try:
+            # Use default values if not provided
+            if similarity_threshold is None:
+                similarity_threshold = self.similarity_threshold
+            if match_count is None:
+                match_count = self.match_count
             
-            # Convert to list of dictionaries
-            results = [
-                {
-                    'id': row['id'],
-                    'content': row['content'],
-                    'material_id': row['material_id'],
-                    'similarity': row['similarity']
-                }
-                for row in rows
-            ]
+            if query_embedding is None:
+                query_embedding = await self.embed_query(query)
+            if not query_embedding:
+                logger.error("Failed to generate embeddings for query")
+                return []
             
-            await conn.close()
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                # Take the nearest chunks from the HNSW index, then keep the best
+                # chunk of each material and rank the materials by it
+                candidate_count = match_count * self.rerank_factor
+                ef_search = min(max(self.hnsw_ef_search, candidate_count), 1000)
+                async with conn.transaction():
+                    await conn.execute(_SET_EF_SEARCH_SQL, str(ef_search))
+                    rows = await conn.fetch(
+                        _SEARCH_MATERIALS_SQL,
+                        _as_vector(query_embedding), similarity_threshold, match_count, candidate_count
+                    )
+                
+                # Convert to list of dictionaries
+                results = [
+                    {
+                        'material_id': row['material_id'],
+                        'similarity': row['similarity'],
+                        'sample_content': row['sample_content']
+                    }
+                    for row in rows
+                ]
             return results
         except Exception as e:
-            logger.error(f"Error performing similarity search: {str(e)}")
+            logger.error("Error performing material similarity search: %s", e)
             return []
     
     async def get_material_context(self, material_id: str, context_window: int = 1) -> Dict[str, Any]:
@@ -259,7 +534,7 @@ class VectorDatabaseService:
             
             return material_dict
         except Exception as e:
-            logger.error(f"Error getting material context: {str(e)}")
+            logger.error("Error getting material context: %s", e)
             return None
     
     async def process_material_for_embeddings(self, material_id: str) -> bool:
@@ -273,7 +548,7 @@ class VectorDatabaseService:
             )
             
             if not content_chunks:
-                logger.warning(f"No content chunks found for material {material_id}")
+                logger.warning("No content chunks found for material %s", material_id)
                 return False
             
             # Convert to list of dictionaries
@@ -290,7 +565,7 @@ class VectorDatabaseService:
             success = await self.batch_generate_embeddings(chunks_data)
             return success
         except Exception as e:
-            logger.error(f"Error processing material for embeddings: {str(e)}")
+            logger.error("Error processing material for embeddings: %s", e)
             return False
 
 # Create a singleton instance of the VectorDatabaseService
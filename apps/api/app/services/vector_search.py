@@ -4,8 +4,6 @@ from typing import List, Dict, Any, Optional
 from app.services.vector_database import vector_database_service
 from app.services.openai import openai_service
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class VectorSearchService:
@@ -16,13 +14,20 @@ class VectorSearchService:
         self.default_similarity_threshold = 0.7
         self.default_match_count = 5
     
-    async def search_by_query(self, query: str, similarity_threshold: float = None, match_count: int = None) -> List[Dict[str, Any]]:
+    async def search_by_query(
+        self,
+        query: str,
+        similarity_threshold: float = None,
+        match_count: int = None,
+        content_length: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """Search for content similar to the query.
         
         Args:
             query: The search query
             similarity_threshold: Minimum similarity threshold (0-1)
             match_count: Maximum number of matches to return
+            content_length: Optional number of characters of each chunk's content to return
             
         Returns:
             List of matching content chunks with similarity scores
@@ -38,12 +43,13 @@ class VectorSearchService:
             results = await vector_database_service.similarity_search(
                 query=query,
                 similarity_threshold=similarity_threshold,
-                match_count=match_count
+                match_count=match_count,
+                content_length=content_length
             )
             
             return results
         except Exception as e:
-            logger.error(f"Error searching by query: {str(e)}")
+            logger.error("Error searching by query: %s", e)
             return []
     
     async def get_relevant_context(self, query: str, max_chunks: int = 3) -> str:
@@ -74,7 +80,7 @@ class VectorSearchService:
             context = "\n\n".join(context_parts)
             return context
         except Exception as e:
-            logger.error(f"Error getting relevant context: {str(e)}")
+            logger.error("Error getting relevant context: %s", e)
             return ""
     
     async def answer_with_context(self, question: str, max_context_chunks: int = 3) -> Dict[str, Any]:
@@ -119,7 +125,7 @@ class VectorSearchService:
                 "has_context": True
             }
         except Exception as e:
-            logger.error(f"Error answering with context: {str(e)}")
+            logger.error("Error answering with context: %s", e)
             return {
                 "answer": f"I'm sorry, I encountered an error while trying to answer your question: {str(e)}",
                 "context": None,
@@ -138,36 +144,14 @@ class VectorSearchService:
             List of related materials with similarity scores
         """
         try:
-            # Search for similar content chunks
-            results = await self.search_by_query(
+            # Search for the best matching chunk of each material
+            return await vector_database_service.similarity_search_materials(
                 query=query,
-                match_count=max_materials * 2  # Get more chunks to find unique materials
+                similarity_threshold=self.default_similarity_threshold,
+                match_count=max_materials
             )
-            
-            if not results:
-                return []
-            
-            # Group by material_id and get the highest similarity for each material
-            materials_map = {}
-            for result in results:
-                material_id = result['material_id']
-                similarity = result['similarity']
-                
-                if material_id not in materials_map or similarity > materials_map[material_id]['similarity']:
-                    materials_map[material_id] = {
-                        'material_id': material_id,
-                        'similarity': similarity,
-                        'sample_content': result['content'][:100] + '...' if len(result['content']) > 100 else result['content']
-                    }
-            
-            # Convert to list and sort by similarity
-            related_materials = list(materials_map.values())
-            related_materials.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            # Limit to max_materials
-            return related_materials[:max_materials]
         except Exception as e:
-            logger.error(f"Error finding related materials: {str(e)}")
+            logger.error("Error finding related materials: %s", e)
             return []
 
 # Create a singleton instance of the VectorSearchService
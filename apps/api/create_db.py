@@ -1,34 +1,21 @@
 import psycopg2
+from dotenv import dotenv_values
+from psycopg2 import sql
 from urllib.parse import urlparse
 
-# Parse the DATABASE_URL from .env
-with open('../../.env', 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            url = line.split('=')[1].strip().strip('"')
-            break
-
-# Parse the URL
-parsed = urlparse(url)
-dbname = parsed.path.strip('/')
-username = parsed.username
-password = parsed.password
-hostname = parsed.hostname
+# Read the DATABASE_URL from .env, without Prisma's query parameters such
+# as ?schema=public, which libpq rejects
+url = urlparse(dotenv_values('../../.env')['DATABASE_URL'])._replace(query='')
+dbname = url.path.strip('/')
 
 # Connect to the default postgres database
-conn = psycopg2.connect(
-    dbname='postgres',
-    user=username,
-    password=password,
-    host=hostname,
-    sslmode='require'
-)
+conn = psycopg2.connect(url.geturl(), dbname='postgres', sslmode='require')
 conn.autocommit = True
 
 try:
     # Create the database
     with conn.cursor() as cur:
-        cur.execute(f'CREATE DATABASE {dbname}')
+        cur.execute(sql.SQL('CREATE DATABASE {}').format(sql.Identifier(dbname)))
     print(f"Database {dbname} created successfully")
 except psycopg2.Error as e:
     print(f"Error creating database: {e}")
@@ -1,28 +1,13 @@
 import psycopg2
+from dotenv import dotenv_values
 from urllib.parse import urlparse
 
-# Parse the DATABASE_URL from .env
-with open('../../.env', 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            url = line.split('=')[1].strip().strip('"')
-            break
-
-# Parse the URL
-parsed = urlparse(url)
-dbname = parsed.path.strip('/')
-username = parsed.username
-password = parsed.password
-hostname = parsed.hostname
+# Read the DATABASE_URL from .env, without Prisma's query parameters such
+# as ?schema=public, which libpq rejects
+url = urlparse(dotenv_values('../../.env')['DATABASE_URL'])._replace(query='').geturl()
 
 # Connect to the database
-conn = psycopg2.connect(
-    dbname=dbname,
-    user=username,
-    password=password,
-    host=hostname,
-    sslmode='require'
-)
+conn = psycopg2.connect(url, sslmode='require')
 conn.autocommit = True
 
 try:
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script to compare json and orjson parsing of a Prisma engine response.
+Builds a find_many style payload of roughly 1MB and times both decoders.
+"""
+
+import json
+import timeit
+import logging
+
+import orjson
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ROWS = 2500
+ITERATIONS = 50
+
+def build_payload(rows: int) -> bytes:
+    """Build a query engine response with the given number of material rows."""
+    result = [
+        {
+            "id": f"material-{i}",
+            "title": f"Material {i}",
+            "description": "Lecture notes covering the main concepts of the topic " * 3,
+            "type": "TEXT",
+            "status": "PUBLISHED",
+            "organizationId": "organization-1",
+            "topicId": f"topic-{i % 20}",
+            "createdAt": "2024-01-01T00:00:00.000Z",
+            "updatedAt": "2024-01-02T00:00:00.000Z",
+        }
+        for i in range(rows)
+    ]
+    return orjson.dumps({"data": {"result": result}})
+
+def main():
+    """Time both decoders and log the results."""
+    payload = build_payload(ROWS)
+    logger.info(f"Payload size: {len(payload) / 1024 / 1024:.2f} MB")
+    
+    json_time = timeit.timeit(lambda: json.loads(payload), number=ITERATIONS) / ITERATIONS
+    orjson_time = timeit.timeit(lambda: orjson.loads(payload), number=ITERATIONS) / ITERATIONS
+    
+    logger.info(f"json.loads:   {json_time * 1000:.2f} ms")
+    logger.info(f"orjson.loads: {orjson_time * 1000:.2f} ms")
+    logger.info(f"Speedup: {json_time / orjson_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Script to collect the questions of quizzes generated with OpenAI Batch jobs.
+
+Course quizzes created with background=True have no questions until their
+batch job completes. Run this script periodically (e.g. from cron) to add the
+questions of every completed batch to its quiz.
+
+Usage:
+    python collect_quiz_batches.py [quiz_id]
+"""
+
+import os
+import sys
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+# Import services
+from app.services.prisma import prisma_service
+from app.services.quiz_generation import quiz_generation_service
+
+async def main():
+    """Main function to run the script."""
+    try:
+        await prisma_service.connect()
+        
+        if len(sys.argv) > 1:
+            results = [await quiz_generation_service.collect_quiz_batch(sys.argv[1])]
+        else:
+            results = await quiz_generation_service.collect_pending_quiz_batches()
+        
+        for result in results:
+            logger.info(f"Quiz batch result: {result}")
+        return 1 if any("error" in result for result in results) else 0
+    except Exception as e:
+        logger.error(f"Error in main function: {str(e)}")
+        return 1
+    finally:
+        await prisma_service.disconnect()
+
+if __name__ == "__main__":
+    result = asyncio.run(main())
+    sys.exit(result)
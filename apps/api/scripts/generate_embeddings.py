@@ -44,33 +44,94 @@ async def ensure_vector_database_setup():
     logger.info("Vector database setup completed successfully")
     return True
 
-async def process_content_chunks(batch_size=50, max_chunks=1000):
-    """Process content chunks that don't have embeddings yet."""
+async def process_content_chunks(batch_size=50, max_chunks=1000, workers=1):
+    """Process content chunks that don't have embeddings yet.
+    
+    Fetching, embedding and storing run as a pipeline, so the next batches are
+    embedded while the previous one is being written. The number of workers
+    bounds the concurrent OpenAI requests. Batches are claimed with
+    FOR UPDATE SKIP LOCKED and stay locked until they are stored, so several
+    processes can run this script at once without embedding a chunk twice.
+    """
     try:
+        to_embed = asyncio.Queue(maxsize=2)
+        to_store = asyncio.Queue(maxsize=2)
         total_processed = 0
         
-        while total_processed < max_chunks:
-            # Get content chunks without embeddings
-            content_chunks = await vector_database_service.get_content_chunks_without_embeddings(limit=batch_size)
-            
-            if not content_chunks:
-                logger.info("No more content chunks without embeddings")
-                break
-            
-            logger.info(f"Processing {len(content_chunks)} content chunks")
-            
-            # Generate and store embeddings in batch
-            success = await vector_database_service.batch_generate_embeddings(content_chunks)
+        async def hand_off(claim, step):
+            # Unlock the claim's chunks if the step fails or the pipeline is cancelled
+            try:
+                return await step
+            except BaseException:
+                await vector_database_service.release_claim(claim)
+                raise
+        
+        async def fetcher():
+            fetched = 0
+            while fetched < max_chunks:
+                # Claim content chunks without embeddings
+                claim = await vector_database_service.claim_pending_chunks(
+                    limit=min(batch_size, max_chunks - fetched)
+                )
+                if claim is None:
+                    logger.info("No more content chunks without embeddings")
+                    break
+                
+                fetched += len(claim.chunks)
+                await hand_off(claim, to_embed.put(claim))
             
-            if success:
-                total_processed += len(content_chunks)
-                logger.info(f"Successfully processed {total_processed} content chunks so far")
-            else:
-                logger.error(f"Failed to process batch of content chunks")
-                break
+            for _ in range(workers):
+                await to_embed.put(None)
+        
+        async def embedder():
+            while True:
+                claim = await to_embed.get()
+                if claim is None:
+                    break
+                
+                logger.info(f"Processing {len(claim.chunks)} content chunks")
+                records = await hand_off(claim, vector_database_service.generate_embedding_records(claim.chunks))
+                if records is None:
+                    logger.error(f"Failed to process batch of content chunks")
+                    await vector_database_service.release_claim(claim)
+                    continue
+                await hand_off(claim, to_store.put((claim, records)))
+        
+        async def writer():
+            nonlocal total_processed
+            while True:
+                item = await to_store.get()
+                if item is None:
+                    break
+                
+                claim, records = item
+                if await hand_off(claim, vector_database_service.store_claimed_embeddings(claim, records)):
+                    total_processed += len(records)
+                    logger.info(f"Successfully processed {total_processed} content chunks so far")
+                else:
+                    logger.error(f"Failed to store batch of content chunks")
+        
+        stages = [asyncio.create_task(fetcher()), *(asyncio.create_task(embedder()) for _ in range(workers))]
+        writer_task = asyncio.create_task(writer())
+        try:
+            await asyncio.gather(*stages)
+            await to_store.put(None)
+            await writer_task
+        finally:
+            # After a failure the remaining stages would wait forever, holding
+            # their claims' connections and row locks
+            for task in (*stages, writer_task):
+                task.cancel()
+            await asyncio.gather(*stages, writer_task, return_exceptions=True)
             
-            # Sleep briefly to avoid rate limiting
-            await asyncio.sleep(1)
+            while not to_embed.empty():
+                claim = to_embed.get_nowait()
+                if claim is not None:
+                    await vector_database_service.release_claim(claim)
+            while not to_store.empty():
+                item = to_store.get_nowait()
+                if item is not None:
+                    await vector_database_service.release_claim(item[0])
         
         logger.info(f"Completed processing {total_processed} content chunks")
         return total_processed
@@ -132,8 +193,9 @@ async def main():
                 # Process content chunks without embeddings
                 batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
                 max_chunks = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+                workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
                 
-                processed = await process_content_chunks(batch_size, max_chunks)
+                processed = await process_content_chunks(batch_size, max_chunks, workers)
                 logger.info(f"Processed {processed} content chunks")
             
             elif command == "material":
@@ -18,13 +18,17 @@ import uuid
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Load environment variables
 load_dotenv()
 
+from app.core.config import settings
+
 # Get environment variables
 DATABASE_URL = os.getenv("DATABASE_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-large")
 
 if not DATABASE_URL:
     logger.error("DATABASE_URL environment variable not set")
@@ -49,8 +53,10 @@ TEST_CONTENT = [
 async def generate_embedding(text):
     """Generate embedding for a text using OpenAI API."""
     try:
+        # Match the model and size of the halfvec column
         response = openai_client.embeddings.create(
-            model=OPENAI_EMBEDDING_MODEL,
+            model=settings.OPENAI_EMBEDDING_MODEL,
+            dimensions=settings.OPENAI_EMBEDDING_DIMENSIONS,
             input=[text]
         )
         return response.data[0].embedding
@@ -95,9 +101,9 @@ async def create_test_material():
             # Generate and store embedding
             embedding = await generate_embedding(content)
             if embedding:
-                embedding_str = '{' + ','.join(str(x) for x in embedding) + '}'
+                embedding_str = '[' + ','.join(str(x) for x in embedding) + ']'
                 cursor.execute(
-                    "UPDATE content_chunks SET embedding = %s::vector WHERE id = %s",
+                    "UPDATE content_chunks SET embedding = %s::halfvec WHERE id = %s",
                     (embedding_str, chunk_id)
                 )
         
@@ -117,7 +123,7 @@ async def test_similarity_search(query):
         if not query_embedding:
             return []
         
-        query_embedding_str = '{' + ','.join(str(x) for x in query_embedding) + '}'
+        query_embedding_str = '[' + ','.join(str(x) for x in query_embedding) + ']'
         
         # Connect to database
         conn = psycopg2.connect(DATABASE_URL)
@@ -126,10 +132,10 @@ async def test_similarity_search(query):
         # Perform similarity search
         cursor.execute(
             """SELECT c.id, c.content, c.material_id, 
-               1 - (c.embedding <=> %s::vector) as similarity
+               1 - (c.embedding <=> %s::halfvec) as similarity
                FROM content_chunks c
                WHERE c.embedding IS NOT NULL
-               ORDER BY c.embedding <=> %s::vector LIMIT 3
+               ORDER BY c.embedding <=> %s::halfvec LIMIT 3
             """,
             (query_embedding_str, query_embedding_str)
         )
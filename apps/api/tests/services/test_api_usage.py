@@ -0,0 +1,41 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from datetime import datetime
+
+# Mock the prisma module before importing the service
+with patch('app.services.prisma.Prisma') as mock_prisma_class:
+    mock_prisma_instance = AsyncMock()
+    mock_prisma_class.return_value = mock_prisma_instance
+    with patch('app.services.prisma.prisma', mock_prisma_instance):
+        from app.services.api_usage import APIUsageService
+
+@pytest.fixture
+def api_usage_service():
+    return APIUsageService()
+
+@pytest.fixture
+def mock_prisma():
+    with patch('app.services.api_usage.prisma', mock_prisma_instance):
+        mock_prisma_instance.reset_mock()
+        yield mock_prisma_instance
+
+@pytest.mark.asyncio
+async def test_get_usage_counts(api_usage_service, mock_prisma):
+    mock_prisma.query_raw = AsyncMock(return_value=[{"daily": 3, "monthly": 40}])
+    
+    daily, monthly = await api_usage_service._get_usage_counts("user123", "openai.completion")
+    
+    assert (daily, monthly) == (3, 40)
+    sql, user_id, api_name, day_start, month_start = mock_prisma.query_raw.call_args[0]
+    assert user_id == "user123"
+    assert api_name == "openai.completion"
+    assert 'WHERE "userId" = $1' in sql
+    assert 'count(*) FILTER (WHERE "createdAt" >= $3::timestamp)' in sql
+    assert '"createdAt" >= $4::timestamp' in sql
+    assert month_start < day_start <= datetime.utcnow()
+
+@pytest.mark.asyncio
+async def test_get_usage_counts_without_rows(api_usage_service, mock_prisma):
+    mock_prisma.query_raw = AsyncMock(return_value=[])
+    
+    assert await api_usage_service._get_usage_counts("user123", "openai.completion") == (0, 0)
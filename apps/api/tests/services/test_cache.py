@@ -0,0 +1,74 @@
+import pytest
+import orjson
+from unittest.mock import patch, AsyncMock
+
+from app.services.cache import ttl_cache
+
+
+class MetricsStub:
+    def __init__(self):
+        self.calls = 0
+
+    @ttl_cache(ttl=30, namespace="metrics")
+    async def get_metrics(self, organization_id: str, time_period: str = "day"):
+        self.calls += 1
+        return {"organization_id": organization_id, "time_period": time_period}
+
+    @ttl_cache(ttl=30, namespace="metrics")
+    async def get_failing_metrics(self, organization_id: str):
+        self.calls += 1
+        return {"error": "Failed to get metrics"}
+
+
+@pytest.fixture
+def mock_redis():
+    client = AsyncMock()
+    client.get.return_value = None
+    with patch('app.services.cache.get_redis', return_value=client):
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_miss_sets_key(mock_redis):
+    stub = MetricsStub()
+    result = await stub.get_metrics("org1")
+
+    assert result == {"organization_id": "org1", "time_period": "day"}
+    assert stub.calls == 1
+    mock_redis.get.assert_called_once_with("metrics:get_metrics:org1:day")
+    mock_redis.set.assert_called_once_with(
+        "metrics:get_metrics:org1:day", orjson.dumps(result), ex=30
+    )
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_hit_skips_call(mock_redis):
+    mock_redis.get.return_value = orjson.dumps({"cached": True})
+    stub = MetricsStub()
+    result = await stub.get_metrics("org1", time_period="week")
+
+    assert result == {"cached": True}
+    assert stub.calls == 0
+    mock_redis.get.assert_called_once_with("metrics:get_metrics:org1:week")
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_skips_errors_and_redis_failures(mock_redis):
+    stub = MetricsStub()
+    result = await stub.get_failing_metrics("org1")
+    assert "error" in result
+    mock_redis.set.assert_not_called()
+
+    mock_redis.get.side_effect = Exception("Connection refused")
+    result = await stub.get_metrics("org1")
+    assert result["organization_id"] == "org1"
+    assert stub.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_disabled_without_redis():
+    stub = MetricsStub()
+    with patch('app.services.cache.get_redis', return_value=None):
+        await stub.get_metrics("org1")
+        await stub.get_metrics("org1")
+    assert stub.calls == 2
@@ -7,7 +7,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from app.services.openai import OpenAIService
+from app.services.openai import OpenAIService, SemanticCache, EmbeddingBatcher, _build_quiz_system_message
 
 # Skip tests if no OpenAI API key is available
 pytest.mark.skipif(
@@ -63,6 +63,106 @@ async def test_generate_completion(openai_service):
     assert call_args["messages"][0]["role"] == "system"
     assert call_args["messages"][1]["role"] == "user"
 
+@pytest.mark.asyncio
+async def test_generate_completion_semantic_cache(openai_service):
+    """Test that low-temperature completions are served from the semantic cache."""
+    openai_service.semantic_cache = SemanticCache(threshold=0.97)
+    
+    first = await openai_service.generate_completion(prompt="What is 2+2?", temperature=0.0)
+    second = await openai_service.generate_completion(prompt="What is 2+2?", temperature=0.0)
+    
+    assert first == second == "This is a mock response from OpenAI."
+    assert openai_service.async_client.chat.completions.create.call_count == 1
+    
+    # Creative requests bypass the cache
+    await openai_service.generate_completion(prompt="What is 2+2?", temperature=0.7)
+    assert openai_service.async_client.chat.completions.create.call_count == 2
+
+def test_semantic_cache_threshold():
+    """Test that dissimilar prompts miss the semantic cache."""
+    cache = SemanticCache(threshold=0.97, max_entries=2)
+    cache.add([1.0, 0.0], "a")
+    
+    assert cache.lookup([2.0, 0.01]) == "a"
+    assert cache.lookup([0.0, 1.0]) is None
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_coalesces_concurrent_requests():
+    service = MagicMock(embedding_model="text-embedding-ada-002")
+    service.generate_embeddings = AsyncMock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+    batcher = EmbeddingBatcher(service, window=0.01)
+    
+    results = await asyncio.gather(batcher.embed("a"), batcher.embed("bb"), batcher.embed("ccc"))
+    
+    assert results == [[1.0], [2.0], [3.0]]
+    service.generate_embeddings.assert_called_once_with(["a", "bb", "ccc"])
+    
+    # Failures reach every waiter of the batch
+    service.generate_embeddings.side_effect = RuntimeError("rate limited")
+    with pytest.raises(RuntimeError):
+        await batcher.embed("a")
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_fails_waiters_when_packing_fails():
+    service = MagicMock(embedding_model="text-embedding-ada-002")
+    service.generate_embeddings = AsyncMock()
+    batcher = EmbeddingBatcher(service, window=0.01)
+    
+    with patch.object(batcher, '_count_tokens', side_effect=ValueError("bad text")):
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(batcher.embed("a"), timeout=1)
+    service.generate_embeddings.assert_not_called()
+    assert not batcher.flush_tasks
+
+def test_embedding_batcher_counts_special_tokens_as_text():
+    batcher = EmbeddingBatcher(MagicMock(embedding_model="text-embedding-ada-002"))
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2, 3]
+    
+    with patch('app.services.openai._get_encoding', return_value=encoding):
+        assert batcher._count_tokens("<|endoftext|>") == 3
+    encoding.encode.assert_called_once_with("<|endoftext|>", disallowed_special=())
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_embed_many_packs_by_token_budget():
+    service = MagicMock(embedding_model="text-embedding-ada-002")
+    service.generate_embeddings = AsyncMock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+    batcher = EmbeddingBatcher(service, max_tokens=2)
+    
+    with patch.object(batcher, '_count_tokens', return_value=1):
+        results = await batcher.embed_many(["a", "bb", "ccc"])
+    
+    # Embeddings come back in order, from requests of at most two texts
+    assert results == [[1.0], [2.0], [3.0]]
+    assert [c.args[0] for c in service.generate_embeddings.call_args_list] == [["a", "bb"], ["ccc"]]
+
+@pytest.mark.asyncio
+async def test_generate_completion_rejects_over_length_prompt(openai_service):
+    """Test that prompts exceeding the context window fail before any API call."""
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text, **kwargs: text.split()
+    openai_service.model = "gpt-4"
+    
+    with patch('app.services.openai._get_encoding', return_value=encoding):
+        with pytest.raises(ValueError, match="context window"):
+            await openai_service.generate_completion(prompt="word " * 8000, max_tokens=1000)
+        
+        await openai_service.generate_completion(prompt="word " * 100, max_tokens=1000)
+    
+    assert openai_service.async_client.chat.completions.create.call_count == 1
+    # Special-token text such as <|endoftext|> is counted instead of rejected
+    assert encoding.encode.call_args.kwargs == {"disallowed_special": ()}
+
+def test_context_window_matches_model_variants():
+    """Test that only variants of a known model share its context window."""
+    from app.services.openai import _get_context_window
+    
+    assert _get_context_window("gpt-4") == 8192
+    assert _get_context_window("gpt-4-0613") == 8192
+    assert _get_context_window("gpt-4o-mini") == 128000
+    assert _get_context_window("gpt-4.1") is None
+    assert _get_context_window("gpt-4.5-preview") is None
+
 @pytest.mark.asyncio
 async def test_generate_completion_with_functions(openai_service):
     """Test generating a completion with function calling."""
@@ -139,8 +239,34 @@ async def test_generate_streaming_completion(openai_service):
     async for chunk in openai_service.generate_streaming_completion(prompt="Hello?"):
         chunks.append(chunk)
     
-    # Assertions
-    assert chunks == ["Hello", " world", "!"]
+    # Assertions: the first delta is flushed immediately, later deltas may be coalesced
+    assert chunks[0] == "Hello"
+    assert "".join(chunks) == "Hello world!"
+
+@pytest.mark.asyncio
+async def test_generate_streaming_completion_flushes_on_buffer_size(openai_service):
+    """Test that buffered deltas are flushed once the buffer size is reached."""
+    openai_service.stream_buffer_bytes = 4
+    openai_service.stream_flush_ms = 60_000
+    
+    def make_chunk(content):
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta = MagicMock()
+        chunk.choices[0].delta.content = content
+        return chunk
+    
+    async def mock_stream():
+        for content in ["a", "bc", "de", "f", "g"]:
+            yield make_chunk(content)
+    
+    openai_service.async_client.chat.completions.create = AsyncMock(return_value=mock_stream())
+    
+    chunks = []
+    async for chunk in openai_service.generate_streaming_completion(prompt="Hello?"):
+        chunks.append(chunk)
+    
+    assert chunks == ["a", "bcde", "fg"]
 
 @pytest.mark.asyncio
 async def test_process_image(openai_service):
@@ -172,6 +298,21 @@ async def test_process_image(openai_service):
     assert call_args["messages"][0]["content"][0]["type"] == "text"
     assert call_args["messages"][0]["content"][1]["type"] == "image_url"
 
+@pytest.mark.asyncio
+async def test_process_images(openai_service):
+    """Test processing several images concurrently and in a single request."""
+    urls = ["https://example.com/a.jpg", "https://example.com/b.jpg", "https://example.com/c.jpg"]
+    
+    results = await openai_service.process_images(urls, prompt="What's in this image?")
+    
+    assert results == ["This is a mock response from OpenAI."] * 3
+    assert openai_service.async_client.chat.completions.create.call_count == 3
+    
+    await openai_service.process_image(image_url=urls, prompt="Compare these images.")
+    call_args = openai_service.async_client.chat.completions.create.call_args[1]
+    content = call_args["messages"][0]["content"]
+    assert [part["image_url"]["url"] for part in content[1:]] == urls
+
 @pytest.mark.asyncio
 async def test_generate_embeddings(openai_service):
     """Test generating embeddings."""
@@ -188,6 +329,7 @@ async def test_generate_embeddings(openai_service):
     call_args = openai_service.async_client.embeddings.create.call_args[1]
     assert call_args["model"] == openai_service.embedding_model
     assert call_args["input"] == ["Hello", "World"]
+    assert call_args["dimensions"] == openai_service.embedding_dimensions
 
 @pytest.mark.asyncio
 async def test_generate_quiz_questions(openai_service):
@@ -228,3 +370,99 @@ async def test_generate_quiz_questions(openai_service):
     assert result[0]["question_type"] == "multiple_choice"
     assert result[1]["question_text"] == "The Eiffel Tower is located in Paris."
     assert result[1]["question_type"] == "true_false"
+    
+    call_args = openai_service.async_client.chat.completions.create.call_args[1]
+    assert call_args["response_format"]["type"] == "json_schema"
+    assert call_args["response_format"]["json_schema"]["strict"] is True
+
+
+def test_build_quiz_system_message_is_stable():
+    """Test that equal quiz settings reuse the identical system message."""
+    first = _build_quiz_system_message(5, "hard", tuple(sorted(["true_false", "multiple_choice"])))
+    second = _build_quiz_system_message(5, "hard", tuple(sorted(["multiple_choice", "true_false"])))
+    
+    assert first is second
+    assert "5 hard difficulty questions" in first
+    assert "multiple_choice, true_false" in first
+
+
+@pytest.mark.asyncio
+async def test_log_connection_pool_metrics(openai_service):
+    """Test that shared HTTP pool usage is reported to performance monitoring."""
+    mock_monitoring = MagicMock()
+    mock_monitoring.log_performance_metric = AsyncMock(return_value=True)
+    
+    with patch.dict(sys.modules, {"app.services.performance_monitoring": MagicMock(performance_monitoring_service=mock_monitoring)}):
+        result = await openai_service.log_connection_pool_metrics()
+    
+    assert result is True
+    metric_names = [c.args[0] for c in mock_monitoring.log_performance_metric.call_args_list]
+    assert metric_names == [
+        "openai_http_connections_total",
+        "openai_http_connections_active",
+        "openai_http_connections_idle"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_report_connection_pool_metrics_runs_until_cancelled(openai_service):
+    """Test that pool usage is logged every interval until the task is cancelled."""
+    with patch.object(openai_service, "log_connection_pool_metrics", AsyncMock(return_value=True)) as log_metrics:
+        task = asyncio.ensure_future(openai_service.report_connection_pool_metrics(interval=0.001))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    assert log_metrics.call_count >= 2
+
+
+@pytest.mark.asyncio
+async def test_quiz_batch_submit_and_results(openai_service):
+    """Test that quiz generations are submitted and parsed as one batch job."""
+    import orjson
+    
+    openai_service.async_client.files.create = AsyncMock(return_value=MagicMock(id="file-1"))
+    openai_service.async_client.batches.create = AsyncMock(return_value=MagicMock(id="batch-1"))
+    
+    batch_id = await openai_service.submit_quiz_batch({
+        "m1": {"content": "Cells", "num_questions": 2},
+        "m2": {"content": "Genes", "num_questions": 1, "difficulty": "hard"}
+    })
+    
+    assert batch_id == "batch-1"
+    _, jsonl = openai_service.async_client.files.create.call_args.kwargs["file"]
+    lines = [orjson.loads(line) for line in jsonl.splitlines()]
+    assert [line["custom_id"] for line in lines] == ["m1", "m2"]
+    assert lines[0]["url"] == "/v1/chat/completions"
+    assert lines[0]["body"]["response_format"]["type"] == "json_schema"
+    
+    questions = [{"question_text": "Q", "question_type": "true_false", "correct_answer": "true"}]
+    output = "\n".join([
+        orjson.dumps({"custom_id": "m1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": orjson.dumps({"questions": questions}).decode()}}]}}}).decode(),
+        orjson.dumps({"custom_id": "m2", "response": None, "error": {"message": "failed"}}).decode()
+    ])
+    openai_service.async_client.batches.retrieve = AsyncMock(return_value=MagicMock(status="completed", output_file_id="file-2", error_file_id=None))
+    openai_service.async_client.files.content = AsyncMock(return_value=MagicMock(text=output))
+    
+    assert await openai_service.get_quiz_batch_results("batch-1") == {"m1": questions, "m2": []}
+    
+    openai_service.async_client.batches.retrieve = AsyncMock(return_value=MagicMock(status="in_progress"))
+    assert await openai_service.get_quiz_batch_results("batch-1") is None
+    
+    openai_service.async_client.batches.retrieve = AsyncMock(return_value=MagicMock(status="expired"))
+    with pytest.raises(RuntimeError):
+        await openai_service.get_quiz_batch_results("batch-1")
+
+
+@pytest.mark.asyncio
+async def test_quiz_batch_results_all_failed(openai_service):
+    """Test that a batch whose requests all failed is read from its error file."""
+    import orjson
+    
+    errors = orjson.dumps({"custom_id": "m1", "response": {"status_code": 400, "body": {}}, "error": None}).decode()
+    openai_service.async_client.batches.retrieve = AsyncMock(return_value=MagicMock(status="completed", output_file_id=None, error_file_id="file-3"))
+    openai_service.async_client.files.content = AsyncMock(return_value=MagicMock(text=errors))
+    
+    assert await openai_service.get_quiz_batch_results("batch-1") == {"m1": []}
+    openai_service.async_client.files.content.assert_called_once_with("file-3")
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime, timedelta
@@ -43,53 +44,83 @@ async def test_log_performance_metric(performance_service):
         
         assert result is False
         mock_logger.error.assert_called_once()
+    
+    await performance_service.flush_metrics()
+
+@pytest.mark.asyncio
+async def test_log_performance_metric_batches_writes(performance_service, mock_prisma):
+    mock_prisma.performancemetric.create_many = AsyncMock()
+    
+    for i in range(3):
+        await performance_service.log_performance_metric("response_time", 100 + i)
+    
+    # Nothing is written inline; the queued metrics go out in one batch
+    mock_prisma.performancemetric.create_many.assert_not_called()
+    await performance_service.flush_metrics()
+    
+    mock_prisma.performancemetric.create_many.assert_called_once()
+    rows = mock_prisma.performancemetric.create_many.call_args[1]["data"]
+    assert [row["value"] for row in rows] == [100.0, 101.0, 102.0]
+    assert all(row["name"] == "response_time" for row in rows)
+
+@pytest.mark.asyncio
+async def test_flush_metrics_finishes_batch_in_progress(performance_service, mock_prisma):
+    written = []
+    
+    async def create_many(data):
+        await asyncio.sleep(0.01)
+        written.extend(row["value"] for row in data)
+    
+    mock_prisma.performancemetric.create_many = AsyncMock(side_effect=create_many)
+    
+    with patch('app.services.performance_monitoring.METRIC_BATCH_SIZE', 2):
+        for i in range(3):
+            await performance_service.log_performance_metric("response_time", i)
+        # Let the writer take the first batch and start writing it
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        await performance_service.flush_metrics()
+    
+    assert written == [0.0, 1.0, 2.0]
 
 @pytest.mark.asyncio
 async def test_get_response_time_metrics(performance_service, mock_prisma):
     # Setup test data
     org_id = "org123"
-    user1 = MagicMock(id="user1")
-    user2 = MagicMock(id="user2")
     
-    # Mock users query
-    mock_prisma.user.find_many.return_value = [user1, user2]
-    
-    # Mock interactions with response time data
-    interaction1 = MagicMock(
-        metadata={"response_time_ms": 100}
-    )
-    interaction2 = MagicMock(
-        metadata={"response_time_ms": 200}
-    )
-    interaction3 = MagicMock(
-        metadata={"response_time_ms": 300}
-    )
-    
-    mock_prisma.aiinteraction.find_many.return_value = [interaction1, interaction2, interaction3]
+    # Mock the aggregated row returned by the database
+    mock_prisma.query_raw.return_value = [{
+        "count": 3,
+        "average_ms": 200.0,
+        "median_ms": 200.0,
+        "min_ms": 100.0,
+        "max_ms": 300.0,
+        "p95_ms": 290.0,
+        "p99_ms": 298.0
+    }]
     
     # Test with day time period
     result = await performance_service.get_response_time_metrics(org_id, "day")
     
     # Verify results
     assert result["count"] == 3
-    assert result["average_ms"] == 200.0  # (100 + 200 + 300) / 3
+    assert result["average_ms"] == 200.0
     assert result["median_ms"] == 200.0
     assert result["min_ms"] == 100.0
     assert result["max_ms"] == 300.0
+    assert result["p95_ms"] == 290.0
+    assert result["p99_ms"] == 298.0
     
-    # Verify correct query parameters
-    mock_prisma.user.find_many.assert_called_with(
-        where={"organization_id": org_id}
-    )
-    
-    # Test with no users
-    mock_prisma.user.find_many.return_value = []
-    result = await performance_service.get_response_time_metrics(org_id, "day")
-    assert "error" in result
+    # Verify the query is scoped to the organization in a single round-trip
+    sql, query_org_id, start_date = mock_prisma.query_raw.call_args[0]
+    assert "percentile_cont(0.95)" in sql
+    assert 'u."organizationId" = $1' in sql
+    assert 'ai."createdAt" >= $2' in sql
+    assert query_org_id == org_id
+    assert isinstance(start_date, datetime)
     
     # Test with no interactions
-    mock_prisma.user.find_many.return_value = [user1, user2]
-    mock_prisma.aiinteraction.find_many.return_value = []
+    mock_prisma.query_raw.return_value = [{"count": 0}]
     result = await performance_service.get_response_time_metrics(org_id, "day")
     assert result["count"] == 0
     assert "message" in result
@@ -98,14 +129,9 @@ async def test_get_response_time_metrics(performance_service, mock_prisma):
 async def test_get_error_rate_metrics(performance_service, mock_prisma):
     # Setup test data
     org_id = "org123"
-    user1 = MagicMock(id="user1")
-    user2 = MagicMock(id="user2")
-    
-    # Mock users query
-    mock_prisma.user.find_many.return_value = [user1, user2]
     
-    # Mock interaction counts
-    mock_prisma.aiinteraction.count.side_effect = [100, 15]  # Total: 100, Errors: 15
+    # Mock interaction counts (Total: 100, Errors: 15)
+    mock_prisma.query_raw.return_value = [{"total": 100, "errors": 15}]
     
     # Test with day time period
     result = await performance_service.get_error_rate_metrics(org_id, "day")
@@ -115,15 +141,10 @@ async def test_get_error_rate_metrics(performance_service, mock_prisma):
     assert result["error_interactions"] == 15
     assert result["error_rate"] == 15.0  # (15 / 100) * 100
     assert result["success_rate"] == 85.0  # 100 - 15.0
-    
-    # Test with no users
-    mock_prisma.user.find_many.return_value = []
-    result = await performance_service.get_error_rate_metrics(org_id, "day")
-    assert "error" in result
+    assert "FILTER (WHERE ai.error_flag)" in mock_prisma.query_raw.call_args[0][0]
     
     # Test with no interactions
-    mock_prisma.user.find_many.return_value = [user1, user2]
-    mock_prisma.aiinteraction.count.side_effect = [0, 0]  # Total: 0, Errors: 0
+    mock_prisma.query_raw.return_value = [{"total": 0, "errors": 0}]
     result = await performance_service.get_error_rate_metrics(org_id, "day")
     assert result["total_interactions"] == 0
     assert result["error_rate"] == 0
@@ -133,35 +154,21 @@ async def test_get_error_rate_metrics(performance_service, mock_prisma):
 async def test_get_token_usage_metrics(performance_service, mock_prisma):
     # Setup test data
     org_id = "org123"
-    user1 = MagicMock(id="user1")
-    user2 = MagicMock(id="user2")
-    
-    # Mock users query
-    mock_prisma.user.find_many.return_value = [user1, user2]
-    
-    # Mock interactions with token usage data
-    interaction1 = MagicMock(
-        tokens_used=100,
-        interaction_type="ask"
-    )
-    interaction2 = MagicMock(
-        tokens_used=200,
-        interaction_type="ask"
-    )
-    interaction3 = MagicMock(
-        tokens_used=300,
-        interaction_type="quiz"
-    )
-    
-    mock_prisma.aiinteraction.find_many.return_value = [interaction1, interaction2, interaction3]
+    
+    # Mock token usage grouped by interaction type
+    mock_prisma.query_raw.return_value = [
+        {"interaction_type": "ask", "count": 2, "tokens": 300},
+        {"interaction_type": "quiz", "count": 1, "tokens": 300}
+    ]
     
     # Test with day time period
     result = await performance_service.get_token_usage_metrics(org_id, "day")
     
     # Verify results
     assert result["total_interactions"] == 3
-    assert result["total_tokens"] == 600  # 100 + 200 + 300
+    assert result["total_tokens"] == 600  # 300 + 300
     assert result["avg_tokens_per_interaction"] == 200.0  # 600 / 3
+    assert "GROUP BY" in mock_prisma.query_raw.call_args[0][0]
     
     # Check token usage by type
     token_usage = result["token_usage_by_type"]
@@ -171,7 +178,7 @@ async def test_get_token_usage_metrics(performance_service, mock_prisma):
     ask_usage = next((item for item in token_usage if item["interaction_type"] == "ask"), None)
     assert ask_usage is not None
     assert ask_usage["count"] == 2
-    assert ask_usage["total_tokens"] == 300  # 100 + 200
+    assert ask_usage["total_tokens"] == 300
     assert ask_usage["avg_tokens"] == 150.0  # 300 / 2
     
     # Find the "quiz" type in the results
@@ -181,39 +188,8 @@ async def test_get_token_usage_metrics(performance_service, mock_prisma):
     assert quiz_usage["total_tokens"] == 300
     assert quiz_usage["avg_tokens"] == 300.0  # 300 / 1
     
-    # Test with no users
-    mock_prisma.user.find_many.return_value = []
-    result = await performance_service.get_token_usage_metrics(org_id, "day")
-    assert "error" in result
-    
     # Test with no interactions
-    mock_prisma.user.find_many.return_value = [user1, user2]
-    mock_prisma.aiinteraction.find_many.return_value = []
+    mock_prisma.query_raw.return_value = []
     result = await performance_service.get_token_usage_metrics(org_id, "day")
     assert result["total_interactions"] == 0
     assert "message" in result
-
-@pytest.mark.asyncio
-async def test_percentile_calculation(performance_service):
-    # Test with empty list
-    result = performance_service._percentile([], 95)
-    assert result == 0
-    
-    # Test with single value
-    result = performance_service._percentile([100], 95)
-    assert result == 100
-    
-    # Test with multiple values
-    data = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
-    
-    # 50th percentile should be the median
-    result = performance_service._percentile(data, 50)
-    assert result == 55.0  # Median of the data
-    
-    # 95th percentile
-    result = performance_service._percentile(data, 95)
-    assert result == 95.5  # Expected 95th percentile value
-    
-    # 100th percentile should be the maximum
-    result = performance_service._percentile(data, 100)
-    assert result == 100  # Maximum value
@@ -1,22 +1,30 @@
 import pytest
 import asyncio
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from typing import List, Dict, Any
 import json
 from datetime import datetime, timedelta
 
 from app.services.personalization import personalization_service
 
+@pytest.fixture(autouse=True)
+def clear_preference_cache():
+    """Start each test with an empty preference cache."""
+    personalization_service._pref_cache.clear()
+    personalization_service._reco_cache.clear()
+    personalization_service._org_cache.clear()
+    yield
+
 @pytest.fixture
 def mock_prisma():
     """Mock the Prisma client."""
-    with patch('app.services.personalization.prisma') as mock:
+    with patch('app.services.personalization.prisma', new_callable=AsyncMock) as mock:
         # Mock user preference
         user_pref = MagicMock()
         user_pref.id = "pref-1"
         user_pref.userId = "user-1"
         user_pref.learning_style = "visual"
-        user_pref.interests = json.dumps(["programming", "math"])
+        user_pref.interests = ["programming", "math"]
         user_pref.ui_preferences = json.dumps({"theme": "dark", "font_size": "large"})
         mock.userpreference.find_unique.return_value = user_pref
         
@@ -34,8 +42,7 @@ def mock_prisma():
         user = MagicMock()
         user.id = "user-1"
         user.email = "test@example.com"
-        user.organization = MagicMock()
-        user.organization.id = "org-1"
+        user.organizationId = "org-1"
         mock.user.find_unique.return_value = user
         
         # Mock materials
@@ -86,12 +93,35 @@ def mock_prisma():
         quiz_result.created_at = datetime.now() - timedelta(days=3)
         mock.quizresult.find_many.return_value = [quiz_result]
         
+        # Mock raw aggregation queries
+        def query_raw(query, *args):
+            if "ORDER BY score DESC" in query:
+                return [
+                    {"id": "material-1", "title": "Introduction to Programming", "type": "DOCUMENT",
+                     "topic_name": "Programming", "score": 0.8},
+                    {"id": "material-3", "title": "Calculus Basics", "type": "VIDEO",
+                     "topic_name": "Mathematics", "score": 0.6}
+                ]
+            if "PARTITION BY topic_id" in query:
+                return [
+                    {"id": "material-1", "title": "Introduction to Programming", "type": "DOCUMENT",
+                     "topic_id": "topic-1", "topic_name": "Programming", "completed": False,
+                     "total_count": 1, "completed_count": 0},
+                    {"id": "material-2", "title": "Math Concepts", "type": "VIDEO",
+                     "topic_id": "topic-2", "topic_name": "Mathematics", "completed": True,
+                     "total_count": 1, "completed_count": 1}
+                ]
+            if 'SELECT DISTINCT "materialId"' in query:
+                return [{"material_id": "material-2"}]
+            return [{"result_count": 1, "total_score": 8.0, "total_possible": 10.0}]
+        mock.query_raw.side_effect = query_raw
+        
         yield mock
 
 @pytest.fixture
 def mock_learning_style_service():
     """Mock the learning style service."""
-    with patch('app.services.personalization.learning_style_service') as mock:
+    with patch('app.services.personalization.learning_style_service', new_callable=AsyncMock) as mock:
         # Mock get_user_learning_style method
         mock.get_user_learning_style.return_value = {
             "id": "style-1",
@@ -127,6 +157,52 @@ async def test_get_user_preferences(mock_prisma, mock_learning_style_service):
     )
     mock_learning_style_service.get_user_learning_style.assert_called_once_with("user-1")
 
+@pytest.mark.asyncio
+async def test_get_user_preferences_cached(mock_prisma, mock_learning_style_service):
+    """Test that preferences are cached until they are updated."""
+    await personalization_service.get_user_preferences("user-1")
+    await personalization_service.get_user_preferences("user-1")
+    
+    mock_prisma.userpreference.find_unique.assert_called_once()
+    
+    await personalization_service.update_user_preferences("user-1", {"theme": "light"})
+    await personalization_service.get_user_preferences("user-1")
+    
+    # The update upserts without a lookup, then preferences reload after invalidation
+    assert mock_prisma.userpreference.find_unique.call_count == 2
+
+@pytest.mark.asyncio
+async def test_get_user_preferences_returns_independent_copies(mock_prisma, mock_learning_style_service):
+    """Test that mutating returned preferences does not change the cached ones."""
+    preferences = await personalization_service.get_user_preferences("user-1")
+    preferences["interests"].append("history")
+    preferences["learning_style_details"]["visual_score"] = 0
+    
+    cached = await personalization_service.get_user_preferences("user-1")
+    assert "history" not in cached["interests"]
+    assert cached["learning_style_details"]["visual_score"] == 8
+    mock_prisma.userpreference.find_unique.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_get_user_preferences_shares_concurrent_loads(mock_prisma, mock_learning_style_service):
+    """Test that concurrent cache misses load preferences once and leave no load behind."""
+    results = await asyncio.gather(*[personalization_service.get_user_preferences("user-1") for _ in range(3)])
+    
+    assert all(r["theme"] == "dark" for r in results)
+    mock_prisma.userpreference.find_unique.assert_called_once()
+    await asyncio.sleep(0)
+    assert not personalization_service._pref_loads
+
+@pytest.mark.asyncio
+async def test_get_user_preferences_failed_load(mock_prisma, mock_learning_style_service):
+    """Test that a failed load falls back to defaults and is not kept."""
+    with patch.object(personalization_service, "_load_user_preferences", AsyncMock(side_effect=RuntimeError("down"))):
+        preferences = await personalization_service.get_user_preferences("user-1")
+    
+    assert preferences == personalization_service.preference_defaults
+    await asyncio.sleep(0)
+    assert not personalization_service._pref_loads
+
 @pytest.mark.asyncio
 async def test_update_user_preferences(mock_prisma):
     """Test updating user preferences."""
@@ -144,20 +220,23 @@ async def test_update_user_preferences(mock_prisma):
     # Check that the update was successful
     assert success is True
     
-    # Verify that the mock method was called
-    mock_prisma.userpreference.update.assert_called_once()
+    # Verify that the preference was written with a single upsert
+    mock_prisma.userpreference.upsert.assert_called_once()
+    mock_prisma.userpreference.find_unique.assert_not_called()
     
     # Check that the update data is correct
-    update_call = mock_prisma.userpreference.update.call_args
-    update_data = update_call[1]["data"]
+    upsert_call = mock_prisma.userpreference.upsert.call_args
+    assert upsert_call[1]["where"] == {"userId": "user-1"}
+    update_data = upsert_call[1]["data"]["update"]
+    assert upsert_call[1]["data"]["create"] == {"userId": "user-1", **update_data}
     
     assert "ui_preferences" in update_data
     assert "interests" in update_data
     assert "learning_style" in update_data
     
-    # Parse the JSON strings to check the values
+    # Parse the JSON string to check the values
     ui_prefs = json.loads(update_data["ui_preferences"])
-    interests = json.loads(update_data["interests"])
+    interests = update_data["interests"]
     
     assert ui_prefs["theme"] == "light"
     assert ui_prefs["font_size"] == "medium"
@@ -179,10 +258,60 @@ async def test_get_personalized_recommendations(mock_prisma):
     
     # Verify that the mock methods were called
     mock_prisma.user.find_unique.assert_called_once_with(
-        where={"id": "user-1"},
-        include={"organization": True}
+        where={"id": "user-1"}
+    )
+    
+    # Scoring, completed-material filtering and the candidate limit run in one query
+    mock_prisma.material.find_many.assert_not_called()
+    mock_prisma.query_raw.assert_called_once()
+    query, *params = mock_prisma.query_raw.call_args[0]
+    assert "NOT EXISTS" in query
+    assert 'c."organizationId" = $2' in query
+    assert """"eventType" = 'MATERIAL_COMPLETE'""" in query
+    assert params[0] == "user-1"
+    assert params[1] == "org-1"
+    assert params[3] == ["math", "programming"]
+    assert params[4] == 8
+
+@pytest.mark.asyncio
+async def test_organization_lookup_cached(mock_prisma):
+    """Test that the user's organization is looked up once across features."""
+    await personalization_service.get_personalized_recommendations("user-1")
+    await personalization_service.generate_personalized_study_plan("user-1")
+    
+    mock_prisma.user.find_unique.assert_called_once_with(
+        where={"id": "user-1"}
     )
-    mock_prisma.material.find_many.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_get_personalized_recommendations_next_page_cached(mock_prisma):
+    """Test that the next page is served from the ranked candidates of the first call."""
+    first_page = await personalization_service.get_personalized_recommendations("user-1", limit=1)
+    second_page = await personalization_service.get_personalized_recommendations("user-1", limit=1, offset=1)
+    
+    assert first_page[0]["id"] == "material-1"
+    assert second_page[0]["id"] == "material-3"
+    mock_prisma.query_raw.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_get_personalized_recommendations_ranks_more_for_deep_pages(mock_prisma):
+    """Test that a page past the cached candidates ranks a larger pool."""
+    ranked = [{"id": f"material-{i}", "title": f"Material {i}", "type": "DOCUMENT",
+               "topic_name": None, "score": 0.5} for i in range(10)]
+    mock_prisma.query_raw.side_effect = lambda query, *args: ranked[:args[-1]]
+    
+    first_page = await personalization_service.get_personalized_recommendations("user-1", limit=1)
+    deep_page = await personalization_service.get_personalized_recommendations("user-1", limit=1, offset=6)
+    past_end = await personalization_service.get_personalized_recommendations("user-1", limit=1, offset=20)
+    
+    assert first_page[0]["id"] == "material-0"
+    assert deep_page[0]["id"] == "material-6"
+    assert past_end == []
+    assert [c.args[-1] for c in mock_prisma.query_raw.call_args_list] == [4, 7, 21]
+    
+    # Once a ranking is shorter than its pool, every later page is served from it
+    await personalization_service.get_personalized_recommendations("user-1", limit=1, offset=30)
+    assert mock_prisma.query_raw.call_count == 3
 
 @pytest.mark.asyncio
 async def test_generate_personalized_study_plan(mock_prisma):
@@ -199,10 +328,17 @@ async def test_generate_personalized_study_plan(mock_prisma):
     
     # Verify that the mock methods were called
     mock_prisma.user.find_unique.assert_called_once_with(
-        where={"id": "user-1"},
-        include={"organization": True}
+        where={"id": "user-1"}
     )
-    mock_prisma.material.find_many.assert_called_once()
+    mock_prisma.material.find_many.assert_not_called()
+    
+    # Topic grouping and completion run in SQL with the completed IDs bound
+    query, *params = mock_prisma.query_raw.call_args[0]
+    assert "row_number() OVER" in query
+    assert 'c."organizationId" = $1' in query
+    assert params[2] == ["material-2"]
+    assert study_plan["topics"][0]["progress"] == 0
+    assert study_plan["topics"][1]["materials"] == []
 
 @pytest.mark.asyncio
 async def test_get_adaptive_difficulty(mock_prisma):
@@ -211,10 +347,14 @@ async def test_get_adaptive_difficulty(mock_prisma):
     difficulty = await personalization_service.get_adaptive_difficulty("user-1")
     
     # Check that the difficulty is as expected
-    assert difficulty == "intermediate"  # Based on 8/10 score
+    assert difficulty == "intermediate"  # Based on 8 of 10 answers correct
     
-    # Verify that the mock method was called
-    mock_prisma.quizresult.find_many.assert_called_once()
+    # Verify that the scores were summed in a single query
+    mock_prisma.query_raw.assert_called_once()
+    query = mock_prisma.query_raw.call_args[0][0]
+    assert "LIMIT 10" in query
+    assert "FROM quiz_attempts a" in query
+    assert 'qa."isCorrect"' in query
 
 @pytest.mark.asyncio
 async def test_get_personalized_ui_settings(mock_prisma):
@@ -228,3 +368,59 @@ async def test_get_personalized_ui_settings(mock_prisma):
     assert "content_density" in ui_settings
     assert "animations" in ui_settings
     assert "language" in ui_settings
+
+@pytest.mark.asyncio
+async def test_completed_ids_from_redis_set(mock_prisma):
+    """Test that completed material IDs come from the Redis set when it is populated."""
+    redis_client = AsyncMock()
+    redis_client.smembers.return_value = {"", "material-2"}
+    with patch('app.services.personalization.get_redis', return_value=redis_client):
+        completed = await personalization_service._completed_ids("user-1")
+    
+    assert completed == {"material-2"}
+    redis_client.smembers.assert_called_once_with("user:user-1:completed")
+    mock_prisma.query_raw.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_completed_ids_fallback_populates_set(mock_prisma):
+    """Test that an empty Redis set falls back to completion events and is repopulated."""
+    redis_client = AsyncMock()
+    redis_client.smembers.return_value = set()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis_client.pipeline = MagicMock()
+    redis_client.pipeline.return_value.__aenter__.return_value = pipe
+    with patch('app.services.personalization.get_redis', return_value=redis_client):
+        completed = await personalization_service._completed_ids("user-1")
+    
+    assert completed == {"material-2"}
+    mock_prisma.query_raw.assert_called_once()
+    assert mock_prisma.query_raw.call_args[0][1] == "user-1"
+    redis_client.pipeline.assert_called_once_with(transaction=True)
+    pipe.sadd.assert_called_once_with("user:user-1:completed", "", "material-2")
+    pipe.expire.assert_called_once_with("user:user-1:completed", 600)
+    pipe.execute.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_record_material_completed_adds_atomically():
+    """Test that a completion is added to a populated set in a single script call."""
+    redis_client = AsyncMock()
+    with patch('app.services.personalization.get_redis', return_value=redis_client):
+        await personalization_service.record_material_completed("user-1", "material-3")
+    
+    redis_client.eval.assert_called_once()
+    assert redis_client.eval.call_args[0][1:] == (1, "user:user-1:completed", "material-3")
+    redis_client.exists.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_connect_warms_connection_pool(mock_prisma):
+    """Test that connecting opens the database and warms pooled connections."""
+    mock_prisma.is_connected = MagicMock(return_value=False)
+    
+    with patch('app.services.personalization.settings') as mock_settings:
+        mock_settings.DATABASE_POOL_WARMUP = 3
+        await personalization_service.connect()
+    
+    mock_prisma.connect.assert_called_once()
+    assert mock_prisma.query_raw.call_count == 3
+    mock_prisma.query_raw.assert_called_with("SELECT 1")
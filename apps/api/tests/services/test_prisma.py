@@ -0,0 +1,394 @@
+import pytest
+import asyncio
+from typing import ClassVar, Optional
+from unittest.mock import MagicMock, AsyncMock
+
+from pydantic import BaseModel
+
+from fastapi import HTTPException
+from prisma.errors import ForeignKeyViolationError, PrismaError, UniqueViolationError
+
+from app.core.config import settings
+from app.services.prisma import PrismaService, MAX_TAKE
+
+
+def make_record(id):
+    record = MagicMock()
+    record.id = id
+    return record
+
+
+@pytest.fixture
+def service():
+    """PrismaService backed by a mocked Prisma client."""
+    service = PrismaService()
+    service.prisma = MagicMock()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_get_batches_same_tick_lookups(service):
+    service.prisma.user.find_many = AsyncMock(
+        return_value=[make_record("user-1"), make_record("user-2")]
+    )
+    
+    results = await asyncio.gather(
+        service.get("user", "user-1"),
+        service.get("user", "user-2"),
+        service.get("user", "user-1"),
+        service.get("user", "missing")
+    )
+    
+    assert [r.id if r else None for r in results] == ["user-1", "user-2", "user-1", None]
+    service.prisma.user.find_many.assert_called_once_with(
+        where={"id": {"in": ["user-1", "user-2", "missing"]}}
+    )
+    assert not service._loaders[("user", None)].flush_tasks
+
+
+@pytest.mark.asyncio
+async def test_get_starts_new_batch_next_tick(service):
+    service.prisma.user.find_many = AsyncMock(return_value=[make_record("user-1")])
+    
+    await service.get("user", "user-1")
+    await service.get("user", "user-2")
+    
+    assert service.prisma.user.find_many.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_reads_cached_until_model_write(service):
+    service.prisma.user.count = AsyncMock(return_value=3)
+    service.prisma.user.find_many = AsyncMock(return_value=[make_record("user-1")])
+    service.prisma.user.update = AsyncMock(return_value=make_record("user-1"))
+    
+    assert await service.count("user", where={"role": "admin", "is_active": True}, cache=True) == 3
+    assert await service.count("user", where={"is_active": True, "role": "admin"}, cache=True) == 3
+    await service.get_many("user", where={"role": "admin"}, cache=True)
+    await service.get_many("user", where={"role": "admin"}, cache=True)
+    service.prisma.user.count.assert_called_once()
+    service.prisma.user.find_many.assert_called_once()
+    
+    await service.update("user", "user-1", {"name": "New"})
+    await service.count("user", where={"role": "admin", "is_active": True}, cache=True)
+    await service.get_many("user", where={"role": "admin"}, cache=True)
+    assert service.prisma.user.count.call_count == 2
+    assert service.prisma.user.find_many.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_many_cache_opt_in_and_single_flight(service):
+    service.prisma.course.find_many = AsyncMock(return_value=[])
+    
+    await asyncio.gather(*[service.get_many("course", cache=True) for _ in range(5)])
+    service.prisma.course.find_many.assert_called_once()
+    await service.get_many("course", cache=True)
+    service.prisma.course.find_many.assert_called_once()
+    
+    # Reads are not cached or shared unless asked for
+    await asyncio.gather(service.get_many("course"), service.get_many("course"))
+    assert service.prisma.course.find_many.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_connect_once_under_concurrency(service):
+    connected = False
+    
+    async def connect():
+        nonlocal connected
+        await asyncio.sleep(0)
+        connected = True
+    
+    service.prisma.is_connected = MagicMock(side_effect=lambda: connected)
+    service.prisma.connect = AsyncMock(side_effect=connect)
+    
+    await asyncio.gather(*[service.connect() for _ in range(5)])
+    
+    service.prisma.connect.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_many_caps_take(service):
+    service.prisma.material.find_many = AsyncMock(return_value=[])
+    
+    await service.get_many("material", take=None)
+    await service.get_many("material", take=MAX_TAKE * 10)
+    await service.get_many("material", take=0)
+    
+    takes = [c.kwargs["take"] for c in service.prisma.material.find_many.call_args_list]
+    assert takes == [100, MAX_TAKE, 0]
+    
+    with pytest.raises(HTTPException):
+        await service.get_many("material", skip=-1)
+
+
+@pytest.mark.asyncio
+async def test_find_many_and_count(service):
+    service.prisma.quiz.find_many = AsyncMock(return_value=[make_record("quiz-1"), make_record("quiz-2")])
+    service.prisma.quiz.count = AsyncMock(return_value=5)
+    
+    page = await service.find_many_and_count("quiz", where={"course_id": "c1"}, skip=2, take=2)
+    
+    assert [r.id for r in page.data] == ["quiz-1", "quiz-2"]
+    assert page.total == 5
+    assert page.has_next is True
+    service.prisma.quiz.count.assert_called_once_with(where={"course_id": "c1"})
+
+
+
+class BaseFakeUser(BaseModel):
+    __prisma_model__: ClassVar[str] = "User"
+
+
+class FakeUser(BaseFakeUser):
+    id: str
+    email: str
+    name: Optional[str] = None
+
+
+class FakeUserActions:
+    """Stands in for a generated actions class bound to a model type."""
+    
+    instances = []
+    
+    def __init__(self, client, model):
+        self._client = client
+        self._model = model
+        self.find_many = AsyncMock(return_value=[])
+        FakeUserActions.instances.append(self)
+
+
+@pytest.mark.asyncio
+async def test_get_many_select_binds_partial_model(service):
+    FakeUserActions.instances.clear()
+    service.prisma.user = FakeUserActions(service.prisma, FakeUser)
+    
+    await service.get_many("user", select={"email": True})
+    
+    # The projected query runs on actions bound to a partial model with only the selected fields
+    full, projected = FakeUserActions.instances
+    full.find_many.assert_not_called()
+    projected.find_many.assert_called_once()
+    assert set(projected._model.__fields__) == {"email"}
+    assert projected._model.__prisma_model__ == "User"
+
+
+@pytest.mark.asyncio
+async def test_select_validation(service):
+    service.prisma.user = FakeUserActions(service.prisma, FakeUser)
+    
+    with pytest.raises(HTTPException):
+        await service.get_many("user", select={"password": True})
+    with pytest.raises(HTTPException):
+        await service.get_many("user", select={"email": True}, include={"email": True})
+    with pytest.raises(HTTPException):
+        await service.get_many("user", select={"email": {"select": {"id": True}}})
+
+
+@pytest.mark.asyncio
+async def test_bulk_writes_invalidate_cache(service):
+    service.prisma.template.count = AsyncMock(return_value=0)
+    service.prisma.template.create_many = AsyncMock(return_value=2)
+    service.prisma.template.update_many = AsyncMock(return_value=2)
+    service.prisma.template.delete_many = AsyncMock(return_value=2)
+    
+    await service.count("template", cache=True)
+    rows = [{"name": "a"}, {"name": "b"}]
+    assert await service.create_many("template", rows) == 2
+    service.prisma.template.create_many.assert_called_once_with(data=rows, skip_duplicates=True)
+    await service.count("template", cache=True)
+    assert service.prisma.template.count.call_count == 2
+    
+    assert await service.update_many("template", {"name": "a"}, {"name": "c"}) == 2
+    assert await service.delete_many("template", {"name": "c"}) == 2
+    assert await service.create_many("template", []) == 0
+
+
+@pytest.mark.asyncio
+async def test_model_lookup_memoized_and_validated(service):
+    service.prisma = MagicMock(spec=["user"])
+    service.prisma.user.count = AsyncMock(return_value=1)
+    
+    await service.count("user")
+    assert service._models["user"] is service.prisma.user
+    
+    with pytest.raises(HTTPException) as exc_info:
+        await service.count("unknown")
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_create_maps_typed_errors(service):
+    service.prisma.user.create = AsyncMock(side_effect=UniqueViolationError({"user_facing_error": {"message": "duplicate"}}))
+    with pytest.raises(HTTPException) as exc_info:
+        await service.create("user", {"email": "a@example.com"})
+    assert exc_info.value.status_code == 400
+    assert "already exists" in exc_info.value.detail
+    
+    service.prisma.user.create = AsyncMock(side_effect=ForeignKeyViolationError({"user_facing_error": {"message": "missing org"}}))
+    with pytest.raises(HTTPException) as exc_info:
+        await service.create("user", {"organizationId": "missing"})
+    assert exc_info.value.detail == "Referenced record not found"
+
+
+@pytest.mark.asyncio
+async def test_engine_responses_parsed_with_orjson():
+    from prisma._async_http import Response
+    
+    original = MagicMock()
+    original.aread = AsyncMock(return_value=b'{"data": {"result": [{"id": "1", "createdAt": "2024-01-01T00:00:00+00:00"}]}}')
+    
+    assert await Response(original).json() == {"data": {"result": [{"id": "1", "createdAt": "2024-01-01T00:00:00+00:00"}]}}
+    assert Response.json.__module__ == "app.services.prisma"
+
+
+class TemplateOut(BaseModel):
+    id: str
+    name: str
+    
+    class Config:
+        orm_mode = True
+
+
+@pytest.mark.asyncio
+async def test_get_many_as_validates_with_cached_adapter(service):
+    record = MagicMock()
+    record.id = "1"
+    record.name = "Multiple choice"
+    service.prisma.template.find_many = AsyncMock(return_value=[record, {"id": "2", "name": "Essay"}])
+    
+    templates = await service.get_many_as("template", TemplateOut)
+    assert templates == [TemplateOut(id="1", name="Multiple choice"), TemplateOut(id="2", name="Essay")]
+    
+    adapter = service._adapters[TemplateOut]
+    await service.get_many_as("template", TemplateOut)
+    assert service._adapter(TemplateOut) is adapter
+
+
+def test_engine_http_config(monkeypatch):
+    from app.services.prisma import _engine_http_config
+    
+    monkeypatch.setattr(settings, "DATABASE_HTTP2", False)
+    config = _engine_http_config()
+    assert config["limits"].max_keepalive_connections == settings.DATABASE_HTTP_KEEPALIVE
+    assert "http2" not in config
+    
+    monkeypatch.setattr(settings, "DATABASE_HTTP2", True)
+    assert _engine_http_config()["http2"] is True
+
+
+@pytest.mark.asyncio
+async def test_raw_queries_require_bound_parameters(service):
+    service.prisma.query_raw = AsyncMock(return_value=[{"total": 3}])
+    service.prisma.execute_raw = AsyncMock(return_value=2)
+    
+    rows = await service.query_raw("SELECT COUNT(*) AS total FROM quiz_results WHERE user_id = $1", "user-1")
+    assert rows == [{"total": 3}]
+    service.prisma.query_raw.assert_awaited_once_with("SELECT COUNT(*) AS total FROM quiz_results WHERE user_id = $1", "user-1")
+    
+    with pytest.raises(ValueError):
+        await service.query_raw("SELECT * FROM users WHERE id = 'user-1'", "user-1")
+    
+    service._cache_keys["user"].add(b"key")
+    service._cache[b"key"] = "stale"
+    assert await service.execute_raw("UPDATE users SET name = $1 WHERE id = $2", "a", "b", model="user") == 2
+    assert b"key" not in service._cache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_reads_share_one_query(service):
+    async def find_many(**kwargs):
+        await asyncio.sleep(0)
+        return [make_record("1")]
+    
+    service.prisma.user.find_many = AsyncMock(side_effect=find_many)
+    results = await asyncio.gather(*[service.get_many("user", cache=True) for _ in range(5)])
+    assert service.prisma.user.find_many.call_count == 1
+    assert all(result == results[0] for result in results)
+    assert not service._inflight
+    
+    async def failing_find_many(**kwargs):
+        await asyncio.sleep(0)
+        raise PrismaError("connection lost")
+    
+    service.prisma.course.find_many = AsyncMock(side_effect=failing_find_many)
+    outcomes = await asyncio.gather(*[service.get_many("course", cache=True) for _ in range(3)], return_exceptions=True)
+    assert service.prisma.course.find_many.call_count == 1
+    assert all(isinstance(outcome, HTTPException) for outcome in outcomes)
+    assert not service._inflight
+
+
+@pytest.mark.asyncio
+async def test_get_by_ids_and_grouped_by(service):
+    service.prisma.user.find_many = AsyncMock(return_value=[make_record("1"), make_record("2")])
+    
+    users = await service.get_by_ids("user", ["1", "2", "1", "3"])
+    assert set(users) == {"1", "2"}
+    service.prisma.user.find_many.assert_called_once()
+    assert service.prisma.user.find_many.call_args.kwargs["where"] == {"id": {"in": ["1", "2", "3"]}}
+    assert await service.get_by_ids("user", []) == {}
+    
+    enrollments = [MagicMock(courseId="c1"), MagicMock(courseId="c1"), MagicMock(courseId="c2")]
+    service.prisma.enrollment.find_many = AsyncMock(return_value=enrollments)
+    
+    grouped = await service.get_grouped_by("enrollment", ["c1", "c2", "c3"], fk="courseId")
+    assert [len(grouped[id]) for id in ("c1", "c2", "c3")] == [2, 1, 0]
+
+
+@pytest.mark.asyncio
+async def test_batched_lookups_read_every_page_without_warning(service, caplog):
+    ids = [str(i) for i in range(MAX_TAKE)]
+    service.prisma.user.find_many = AsyncMock(return_value=[make_record(id) for id in ids])
+    
+    users = await service.get_by_ids("user", ids)
+    assert len(users) == MAX_TAKE
+    assert "truncated" not in caplog.text
+    
+    full_page = [MagicMock(courseId="c1") for _ in range(MAX_TAKE)]
+    service.prisma.enrollment.find_many = AsyncMock(side_effect=[full_page, [MagicMock(courseId="c2")]])
+    
+    grouped = await service.get_grouped_by("enrollment", ["c1", "c2"], fk="courseId")
+    assert [len(grouped[id]) for id in ("c1", "c2")] == [MAX_TAKE, 1]
+    skips = [c.kwargs["skip"] for c in service.prisma.enrollment.find_many.call_args_list]
+    assert skips == [0, MAX_TAKE]
+    assert "truncated" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_time_out_with_504(service):
+    async def slow(**kwargs):
+        await asyncio.sleep(1)
+        return 0
+    
+    service.prisma.user.count = AsyncMock(side_effect=slow)
+    with pytest.raises(HTTPException) as exc_info:
+        await service.count("user", timeout=0.01)
+    assert exc_info.value.status_code == 504
+    
+    service.prisma.user.update = AsyncMock(side_effect=slow)
+    with pytest.raises(HTTPException) as exc_info:
+        await service.update("user", "1", {"name": "a"}, timeout=0.01)
+    assert exc_info.value.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_cancelled_shared_read_is_rerun_by_waiters(service):
+    calls = 0
+    
+    async def find_many(**kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [make_record(str(calls))]
+    
+    service.prisma.user.find_many = AsyncMock(side_effect=find_many)
+    leader = asyncio.ensure_future(service.get_many("user", cache=True))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(service.get_many("user", cache=True))
+    await asyncio.sleep(0)
+    
+    leader.cancel()
+    result = await waiter
+    
+    assert leader.cancelled()
+    assert result[0].id == "2"
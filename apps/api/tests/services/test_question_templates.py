@@ -0,0 +1,31 @@
+import sys
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from app.services.question_templates import TEMPLATES, get_all_question_types, get_templates, question_template_service
+
+
+def test_get_templates_groups_by_difficulty():
+    easy = get_templates("multiple_choice", "easy")
+    assert easy
+    assert all(t.difficulty in ("easy", "any") for t in easy)
+    
+    # Buckets are precomputed, so repeated calls return the same tuple
+    assert get_templates("multiple_choice", "easy") is easy
+    assert question_template_service.get_templates("multiple_choice", "easy") is easy
+
+
+def test_get_templates_fallbacks_and_read_only():
+    assert get_templates("unknown", "easy") == get_templates("multiple_choice", "easy")
+    assert get_templates("matching", "any") is TEMPLATES["matching"]
+    assert get_all_question_types() == list(TEMPLATES)
+    
+    with pytest.raises(FrozenInstanceError):
+        get_templates("true_false", "medium")[0].difficulty = "hard"
+
+
+def test_templates_are_slotted_with_interned_difficulties():
+    template = get_templates("short_answer", "hard")[0]
+    assert not hasattr(template, "__dict__")
+    assert template.difficulty is sys.intern("hard")
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 import json
+from prisma import Json
 from app.services.quiz_generation import QuizGenerationService
 from app.services.openai import OpenAIService
 from app.services.question_templates import QuestionTemplateService
@@ -30,6 +31,16 @@ def mock_prisma():
         # Mock QuizQuestion model
         mock.quizquestion.create_many = AsyncMock()
         
+        # Transactions run against the same mock
+        mock.tx.return_value.__aenter__.return_value = mock
+        
+        yield mock
+
+@pytest.fixture
+def mock_prisma_service():
+    with patch('app.services.quiz_generation.prisma_service') as mock:
+        mock.get = AsyncMock()
+        mock.get_many = AsyncMock(return_value=[])
         yield mock
 
 @pytest.fixture
@@ -299,3 +310,191 @@ async def test_validate_quiz_questions(quiz_generation_service):
     with pytest.raises(ValueError) as excinfo:
         quiz_generation_service._validate_quiz_questions(invalid_questions3)
     assert "True/False questions must have options" in str(excinfo.value)
+
+@pytest.mark.asyncio
+async def test_validate_question_matches_answer_to_option(quiz_generation_service):
+    question = {
+        "question_text": "What do plants make?",
+        "question_type": "multiple_choice",
+        "options": ["Chemical energy", "Light", "Heat"],
+        "correct_answer": "  chemical   ENERGY"
+    }
+    
+    validated = await quiz_generation_service.validate_question(question)
+    assert validated["correct_answer"] == "Chemical energy"
+    assert validated["explanation"] == "No explanation provided."
+    
+    question["correct_answer"] = "Water"
+    assert await quiz_generation_service.validate_question(question) is None
+
+@pytest.mark.asyncio
+async def test_create_questions_uses_single_bulk_insert(quiz_generation_service, mock_prisma):
+    mock_prisma.quizquestion.create_many.return_value = 2
+    questions = [
+        {"question_text": "What is DNA?", "question_type": "multiple_choice", "options": ["A", "B"], "correct_answer": "A"},
+        {"question_text": "Cells divide.", "question_type": "true_false", "correct_answer": True, "explanation": "Mitosis"}
+    ]
+    
+    assert await quiz_generation_service._create_questions("quiz123", questions) == 2
+    
+    mock_prisma.quizquestion.create_many.assert_called_once()
+    rows = mock_prisma.quizquestion.create_many.call_args[1]["data"]
+    assert [row["order"] for row in rows] == [1, 2]
+    assert rows[0]["options"] == Json(["A", "B"])
+    assert rows[1]["options"] is None
+    assert rows[1]["correct_answer"] == "True"
+
+@pytest.mark.asyncio
+async def test_generate_quiz_from_course_fans_out_per_material(quiz_generation_service, mock_openai_service, mock_prisma, mock_prisma_service):
+    materials = [MagicMock(id=f"m{i}", title=f"Material {i}", content=f"Content {i}") for i in range(3)]
+    mock_prisma_service.get.return_value = MagicMock(id="c1", title="Biology")
+    mock_prisma_service.get_many.return_value = materials
+    mock_prisma.quiz.create.return_value = MagicMock(id="quiz123", title="Comprehensive Quiz for Biology", time_limit=40)
+    mock_prisma.quizquestion.create_many.return_value = 4
+    mock_openai_service.max_concurrent_requests = 8
+    
+    async def generate(content, num_questions, **kwargs):
+        if content == "Content 1":
+            raise RuntimeError("rate limited")
+        return [{"question_text": content, "question_type": "true_false", "correct_answer": "true"}] * num_questions
+    
+    mock_openai_service.generate_quiz_questions.side_effect = generate
+    
+    result = await quiz_generation_service.generate_quiz_from_course("c1", num_questions=6)
+    
+    assert mock_openai_service.generate_quiz_questions.call_count == 3
+    assert [m["material_id"] for m in result["material_distribution"]] == ["m0", "m2"]
+    assert result["num_questions"] == 4
+    mock_prisma.tx.assert_called_once()
+    
+    # Only the columns used for generation are read; get_many does not add id
+    # to a select, so it must be selected for the distribution and questions
+    mock_prisma_service.get.assert_called_once_with("course", "c1", select={"title": True})
+    assert mock_prisma_service.get_many.call_args[1]["select"] == {"id": True, "title": True, "content": True}
+    assert mock_prisma_service.get_many.call_args[1]["where"] == {"courseId": "c1"}
+
+@pytest.mark.asyncio
+async def test_generate_quiz_from_course_shares_requests_for_duplicate_content(quiz_generation_service, mock_openai_service, mock_prisma, mock_prisma_service):
+    materials = [
+        MagicMock(id="m0", title="Lecture 1", content="Same slides"),
+        MagicMock(id="m1", title="Lecture 1 (re-upload)", content="Same slides"),
+        MagicMock(id="m2", title="Lecture 2", content="Other slides")
+    ]
+    mock_prisma_service.get.return_value = MagicMock(id="c1", title="Biology")
+    mock_prisma_service.get_many.return_value = materials
+    mock_prisma.quiz.create.return_value = MagicMock(id="quiz123", title="Comprehensive Quiz for Biology", time_limit=60)
+    mock_prisma.quizquestion.create_many.return_value = 6
+    mock_openai_service.max_concurrent_requests = 8
+    
+    async def generate(content, num_questions, **kwargs):
+        return [{"question_text": f"{content} {i}", "question_type": "true_false", "correct_answer": "true"} for i in range(num_questions)]
+    
+    mock_openai_service.generate_quiz_questions.side_effect = generate
+    
+    result = await quiz_generation_service.generate_quiz_from_course("c1", num_questions=6)
+    
+    counts = sorted(c[1]["num_questions"] for c in mock_openai_service.generate_quiz_questions.call_args_list)
+    assert counts == [2, 4]
+    assert [(m["material_id"], m["num_questions"]) for m in result["material_distribution"]] == [("m0", 2), ("m1", 2), ("m2", 2)]
+    assert len({q["question_text"] for q in result["questions"]}) == 6
+
+@pytest.mark.asyncio
+async def test_background_course_quiz_uses_batch_job(quiz_generation_service, mock_openai_service, mock_prisma, mock_prisma_service):
+    materials = [MagicMock(id=f"m{i}", title=f"Material {i}", content=f"Content {i}") for i in range(2)]
+    mock_prisma_service.get.return_value = MagicMock(id="c1", title="Biology")
+    mock_prisma_service.get_many.return_value = materials
+    mock_prisma.quiz.create.return_value = MagicMock(id="quiz123", title="Comprehensive Quiz for Biology")
+    mock_openai_service.submit_quiz_batch = AsyncMock(return_value="batch-1")
+    
+    result = await quiz_generation_service.generate_quiz_from_course("c1", num_questions=4, background=True)
+    
+    assert result["status"] == "pending"
+    mock_openai_service.generate_quiz_questions.assert_not_called()
+    assert set(mock_openai_service.submit_quiz_batch.call_args.args[0]) == {"m0", "m1"}
+    assert mock_prisma.quiz.create.call_args[1]["data"]["batch_id"] == "batch-1"
+    
+    # Collecting the finished batch stores its questions and clears the batch ID
+    mock_prisma.quiz.find_unique = AsyncMock(return_value=MagicMock(id="quiz123", batch_id="batch-1"))
+    mock_openai_service.get_quiz_batch_results = AsyncMock(return_value={
+        "m0": [{"question_text": "Q", "question_type": "true_false", "correct_answer": "true"}],
+        "m1": [{"question_text": "", "question_type": "true_false", "correct_answer": "true"}]
+    })
+    mock_prisma.quizquestion.create_many.return_value = 1
+    
+    collected = await quiz_generation_service.collect_quiz_batch("quiz123")
+    
+    assert collected == {"quiz_id": "quiz123", "status": "completed", "num_questions": 1}
+    assert mock_prisma.quiz.update.call_args[1]["data"]["batch_id"] is None
+
+@pytest.mark.asyncio
+async def test_collect_failed_quiz_batch_keeps_batch(quiz_generation_service, mock_openai_service, mock_prisma):
+    mock_prisma.quiz.find_unique = AsyncMock(return_value=MagicMock(id="quiz123", batch_id="batch-1"))
+    mock_openai_service.get_quiz_batch_results = AsyncMock(side_effect=RuntimeError("Quiz batch batch-1 ended with status expired"))
+    
+    collected = await quiz_generation_service.collect_quiz_batch("quiz123")
+    
+    assert collected["status"] == "failed"
+    assert "expired" in collected["error"]
+    
+    # A completed batch without a single valid question is also left on the quiz
+    mock_openai_service.get_quiz_batch_results = AsyncMock(return_value={"m0": [], "m1": []})
+    
+    collected = await quiz_generation_service.collect_quiz_batch("quiz123")
+    
+    assert collected["status"] == "failed"
+    mock_prisma.quizquestion.create_many.assert_not_called()
+    mock_prisma.quiz.update.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_generate_quiz_keeps_system_message_static(quiz_generation_service, mock_openai_service, mock_prisma, mock_prisma_service):
+    from app.services.quiz_generation import QUIZ_RUBRIC
+    
+    mock_prisma_service.get.return_value = MagicMock(id="m1", title="Cells", content="Cell content", courseId="c1")
+    mock_prisma.quiz.create.return_value = MagicMock(id="quiz123", title="Quiz on Cells", time_limit=10)
+    mock_prisma.quizquestion.create_many.return_value = 1
+    mock_openai_service.generate_quiz_questions.return_value = [
+        {"question_text": "Cells divide.", "question_type": "true_false", "correct_answer": "true"}
+    ]
+    
+    await quiz_generation_service.generate_quiz("m1", num_questions=1, difficulty="easy")
+    await quiz_generation_service.generate_quiz("m1", num_questions=1, difficulty="hard", use_templates=False)
+    
+    first, second = [c[1] for c in mock_openai_service.generate_quiz_questions.call_args_list]
+    assert first["system_message"] is QUIZ_RUBRIC
+    assert second["system_message"] is QUIZ_RUBRIC
+    assert "Difficulty: easy" in first["instructions"]
+    assert "Template 1:" in first["instructions"]
+    assert "Difficulty: hard" in second["instructions"]
+
+@pytest.mark.asyncio
+async def test_generate_quiz_reuses_cached_questions(quiz_generation_service, mock_openai_service, mock_prisma, mock_prisma_service):
+    material = MagicMock(id="m1", title="Cells", content="Cell content", courseId="c1", updatedAt="2024-01-01")
+    mock_prisma_service.get.return_value = material
+    mock_prisma.quiz.create.return_value = MagicMock(id="quiz123", title="Quiz on Cells", time_limit=10)
+    mock_prisma.quizquestion.create_many.return_value = 1
+    questions = [{"question_text": "Cells divide.", "question_type": "true_false", "correct_answer": "true"}]
+    mock_openai_service.generate_quiz_questions.return_value = questions
+    
+    store = {}
+    redis = AsyncMock()
+    redis.get.side_effect = lambda key: store.get(key)
+    redis.set.side_effect = lambda key, value, ex: store.__setitem__(key, value)
+    
+    with patch('app.services.quiz_generation.get_redis', return_value=redis):
+        await quiz_generation_service.generate_quiz("m1", num_questions=1, use_templates=False)
+        result = await quiz_generation_service.generate_quiz("m1", num_questions=1, use_templates=False)
+        
+        assert mock_openai_service.generate_quiz_questions.call_count == 1
+        assert result["num_questions"] == 1
+        
+        # Editing the material changes the key
+        material.updatedAt = "2024-02-01"
+        await quiz_generation_service.generate_quiz("m1", num_questions=1, use_templates=False)
+        assert mock_openai_service.generate_quiz_questions.call_count == 2
+
+def test_material_select_fields_exist():
+    from prisma.models import Material
+    from app.services.quiz_generation import MATERIAL_QUIZ_FIELDS, COURSE_MATERIAL_FIELDS
+    
+    assert set(MATERIAL_QUIZ_FIELDS) <= set(Material.__fields__)
+    assert set(COURSE_MATERIAL_FIELDS) <= set(Material.__fields__)
@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import MagicMock
+
+from app.services.text_chunking import TextChunkingService, LINE_BREAK, NO_BREAK
+
+
+@pytest.fixture
+def chunking_service():
+    service = TextChunkingService(chunk_size=100, chunk_overlap=20)
+    # Exercise the pure-Python splitter even when the native one is installed
+    service._splitter = service._markdown_splitter = None
+    return service
+
+
+def test_clean_text_keeps_paragraph_breaks(chunking_service):
+    text = "First  paragraph.\n\n\n\nSecond\t\tparagraph.\nNext line.  "
+    assert chunking_service._clean_text(text) == "First paragraph.\n\nSecond paragraph.\nNext line."
+
+
+def test_chunk_markdown_splits_on_headers(chunking_service):
+    markdown = "# Intro\nSome text.\n## Details\nMore text.\nNot #a header"
+    assert chunking_service.chunk_markdown(markdown) == [
+        "# Intro\nSome text.",
+        "## Details\nMore text.\nNot #a header"
+    ]
+
+
+def test_chunk_markdown_headers_do_not_span_lines(chunking_service):
+    markdown = "Preface\n#\nnot a header\n### Real\nbody\n"
+    assert chunking_service.chunk_markdown(markdown) == [
+        "Preface\n#\nnot a header",
+        "### Real\nbody\n"
+    ]
+
+
+
+def test_chunk_text_breaks_at_paragraphs_and_always_advances(chunking_service):
+    text = ("A" * 60) + ".\n\n" + ("B" * 60) + ". " + ("C" * 60)
+    chunks = chunking_service.chunk_text(text)
+    
+    assert chunks[0] == ("A" * 60) + ".\n\n"
+    assert chunks[-1].endswith("C" * 60)
+    assert len(chunks) < 5
+    
+    # No overlap is carried across a paragraph break
+    assert chunks[1].startswith("B")
+
+
+def test_chunk_after_paragraph_break_keeps_last_character(chunking_service):
+    text = "word " * 19 + "abcd\n\nZ"
+    
+    assert chunking_service.chunk_text(text)[-1] == "Z"
+    assert bytes(list(chunking_service.iter_chunks_bytes(text))[-1]) == b"Z"
+
+
+def test_find_break_point_prefers_paragraphs_then_sentences(chunking_service):
+    text = "One. Two.\nThree " + "x" * 100
+    breaks = chunking_service._build_break_index(text)
+    
+    assert breaks.sentences == [3, 8]
+    assert chunking_service._find_break_point(breaks, 12) == (10, LINE_BREAK)
+    assert chunking_service._find_break_point(chunking_service._build_break_index("nobreaks here"), 5) == (5, NO_BREAK)
+
+
+def test_iter_chunks_is_lazy_and_matches_chunk_text(chunking_service):
+    text = " ".join(f"Sentence number {i}." for i in range(40))
+    chunks = chunking_service.iter_chunks(text)
+    
+    assert next(chunks) == chunking_service.chunk_text(text)[0]
+    assert [next(chunking_service.iter_chunks(text))] + list(chunks) == chunking_service.chunk_text(text)
+    assert list(chunking_service.iter_chunks("")) == []
+
+
+def test_iter_chunks_bytes_never_splits_characters(chunking_service):
+    text = "é" * 150 + " " + "日本語" * 40
+    chunks = list(chunking_service.iter_chunks_bytes(text))
+    
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    decoded = [chunk.tobytes().decode("utf-8") for chunk in chunks]
+    assert decoded[0].startswith("é")
+    assert decoded[-1].endswith("日本語")
+    assert all(len(chunk) <= chunking_service.chunk_size + 3 for chunk in chunks)
+    
+    ascii_text = " ".join(f"Sentence number {i}." for i in range(40))
+    assert [bytes(c).decode() for c in chunking_service.iter_chunks_bytes(ascii_text)] == chunking_service.chunk_text(ascii_text)
+
+
+def test_chunk_many_matches_chunk_text_in_order(chunking_service):
+    texts = [" ".join(f"Text {n} sentence {i}." for i in range(20)) for n in range(3)]
+    
+    assert chunking_service.chunk_many(texts, max_workers=2) == [chunking_service.chunk_text(t) for t in texts]
+    assert chunking_service.chunk_many(["# A\nOne"], markdown=True) == [["# A\nOne"]]
+    assert chunking_service.chunk_many([]) == []
+
+
+def test_native_splitters_are_used_when_available(chunking_service):
+    chunking_service._splitter = MagicMock()
+    chunking_service._splitter.chunks.return_value = ["one", "two"]
+    chunking_service._markdown_splitter = MagicMock()
+    chunking_service._markdown_splitter.chunks.return_value = ["# Intro"]
+    
+    assert chunking_service.chunk_text("Some  text") == ["one", "two"]
+    chunking_service._splitter.chunks.assert_called_once_with("Some text")
+    assert chunking_service.chunk_markdown("# Intro") == ["# Intro"]
+
+
+def test_clean_text_fast_path_matches_regex_cleaning(chunking_service):
+    assert chunking_service._clean_text(" Clean text.\n\nNext paragraph.\n") == "Clean text.\n\nNext paragraph."
+    assert chunking_service._clean_text("Mixed \twhitespace") == "Mixed whitespace"
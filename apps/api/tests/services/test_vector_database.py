@@ -0,0 +1,199 @@
+import pytest
+import numpy as np
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.services.vector_database import VectorDatabaseService
+
+
+@pytest.fixture
+def mock_embedding_batcher():
+    with patch('app.services.vector_database.embedding_batcher') as mock:
+        mock.embed_many = AsyncMock()
+        yield mock
+
+@pytest.fixture
+def mock_conn():
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.fetch = AsyncMock(return_value=[])
+    conn.fetchval = AsyncMock()
+    conn.copy_records_to_table = AsyncMock()
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    pool.close = AsyncMock()
+    with patch('app.services.vector_database.asyncpg.create_pool', AsyncMock(return_value=pool)) as create_pool:
+        conn.pool = pool
+        conn.create_pool = create_pool
+        yield conn
+
+@pytest.fixture
+def vector_db_service():
+    return VectorDatabaseService()
+
+def copied_records(mock_conn):
+    """Records passed to COPY, with the embeddings as lists."""
+    call = mock_conn.copy_records_to_table.call_args
+    assert call.args == ('tmp_embeddings',)
+    assert call.kwargs['columns'] == ['id', 'embedding']
+    return [(chunk_id, embedding.tolist()) for chunk_id, embedding in call.kwargs['records']]
+
+@pytest.mark.asyncio
+async def test_batch_generate_embeddings_copies_then_updates_once(vector_db_service, mock_embedding_batcher, mock_conn):
+    mock_embedding_batcher.embed_many.return_value = [[0.1, 0.2], [0.3, 0.4]]
+    chunks = [
+        {"id": "chunk1", "content": "One"},
+        {"id": "chunk2", "content": "Two"},
+        {"id": "chunk3", "content": "One"},
+    ]
+    
+    assert await vector_db_service.batch_generate_embeddings(chunks) is True
+    
+    # Repeated content is embedded once
+    mock_embedding_batcher.embed_many.assert_called_once_with(["One", "Two"])
+    mock_conn.copy_records_to_table.assert_called_once()
+    assert copied_records(mock_conn) == [
+        ("chunk1", pytest.approx([0.1, 0.2])),
+        ("chunk2", pytest.approx([0.3, 0.4])),
+        ("chunk3", pytest.approx([0.1, 0.2])),
+    ]
+    statements = [c.args[0] for c in mock_conn.execute.call_args_list]
+    assert len(statements) == 2
+    assert "CREATE TEMP TABLE" in statements[0]
+    assert "FROM tmp_embeddings" in statements[1]
+
+@pytest.mark.asyncio
+async def test_queries_share_one_connection_pool(vector_db_service, mock_conn):
+    await vector_db_service.ensure_pgvector_extension()
+    await vector_db_service.get_content_chunks_without_embeddings(limit=5)
+    
+    mock_conn.create_pool.assert_called_once()
+    assert mock_conn.pool.acquire.call_count == 2
+    
+    with patch.object(vector_db_service.prisma, 'disconnect', AsyncMock()):
+        await vector_db_service.disconnect()
+    mock_conn.pool.close.assert_called_once()
+    assert vector_db_service.pool is None
+
+@pytest.mark.asyncio
+async def test_similarity_search_embeds_through_batcher(vector_db_service, mock_conn):
+    mock_conn.fetch.return_value = [{"id": "chunk1", "content": "Cells", "material_id": "m1", "similarity": 0.9}]
+    with patch('app.services.vector_database.embedding_batcher') as batcher:
+        batcher.embed = AsyncMock(return_value=[0.1, 0.2])
+        results = await vector_db_service.similarity_search("cells")
+    
+    batcher.embed.assert_called_once_with("cells")
+    assert results[0]["id"] == "chunk1"
+    # The HNSW scan is widened to cover the whole rerank shortlist
+    mock_conn.execute.assert_called_once_with("SELECT set_config('hnsw.ef_search', $1, true)", "100")
+    query_vector, *args = mock_conn.fetch.call_args.args[1:]
+    assert query_vector.dtype == np.float32
+    assert query_vector.tolist() == pytest.approx([0.1, 0.2])
+    assert args == [0.7, 10, 10, None]
+
+@pytest.mark.asyncio
+async def test_create_vector_index_replaces_ivfflat_with_halfvec_hnsw(vector_db_service, mock_conn):
+    mock_conn.fetchval.return_value = "CREATE INDEX content_chunks_embedding_idx ON content_chunks USING ivfflat (embedding vector_l2_ops)"
+    assert await vector_db_service.create_vector_index() is True
+    statements = [c.args[0] for c in mock_conn.execute.call_args_list]
+    assert statements[0].startswith("DROP INDEX")
+    assert "hnsw (embedding halfvec_cosine_ops)" in statements[1]
+    
+    assert "bit_hamming_ops" in statements[2]
+    
+    mock_conn.execute.reset_mock()
+    mock_conn.fetchval.return_value = "CREATE INDEX content_chunks_embedding_idx ON content_chunks USING hnsw (embedding halfvec_cosine_ops)"
+    assert await vector_db_service.create_vector_index() is True
+    mock_conn.execute.assert_called_once()
+    assert "CREATE INDEX IF NOT EXISTS content_chunks_embedding_bits_idx" in mock_conn.execute.call_args.args[0]
+    assert "::bit(512)" in mock_conn.execute.call_args.args[0]
+
+@pytest.mark.asyncio
+async def test_embed_query_reuses_recent_embeddings(vector_db_service):
+    vector_db_service.query_cache_size = 2
+    with patch('app.services.vector_database.embedding_batcher') as batcher:
+        batcher.embed = AsyncMock(side_effect=lambda text: [float(len(text))])
+        
+        assert await vector_db_service.embed_query("What is a cell?") == [15.0]
+        assert await vector_db_service.embed_query("  what is a   CELL? ") == [15.0]
+        assert batcher.embed.call_count == 1
+        
+        # The least recently used query is evicted first
+        await vector_db_service.embed_query("mitosis")
+        await vector_db_service.embed_query("meiosis")
+        await vector_db_service.embed_query("What is a cell?")
+        assert batcher.embed.call_count == 4
+
+@pytest.mark.asyncio
+async def test_claimed_chunks_stay_locked_until_stored(vector_db_service, mock_embedding_batcher, mock_conn):
+    transaction = MagicMock()
+    transaction.start = AsyncMock()
+    transaction.commit = AsyncMock()
+    transaction.rollback = AsyncMock()
+    mock_conn.transaction.return_value = transaction
+    mock_conn.pool.acquire = AsyncMock(return_value=mock_conn)
+    mock_conn.pool.release = AsyncMock()
+    mock_conn.fetch.return_value = [{"id": "chunk1", "content": "One", "material_id": "m1"}]
+    mock_embedding_batcher.embed_many.return_value = [[0.1, 0.2]]
+    
+    claim = await vector_db_service.claim_pending_chunks(limit=5)
+    assert "FOR UPDATE SKIP LOCKED" in mock_conn.fetch.call_args.args[0]
+    assert claim.chunks == [{"id": "chunk1", "content": "One", "material_id": "m1"}]
+    transaction.start.assert_called_once()
+    mock_conn.pool.release.assert_not_called()
+    
+    records = await vector_db_service.generate_embedding_records(claim.chunks)
+    assert await vector_db_service.store_claimed_embeddings(claim, records) is True
+    assert copied_records(mock_conn) == [("chunk1", pytest.approx([0.1, 0.2]))]
+    transaction.commit.assert_called_once()
+    mock_conn.pool.release.assert_called_once_with(mock_conn)
+    
+    # Nothing left to claim: the transaction is rolled back and the connection returned
+    mock_conn.fetch.return_value = []
+    assert await vector_db_service.claim_pending_chunks(limit=5) is None
+    transaction.rollback.assert_called_once()
+    assert mock_conn.pool.release.call_count == 2
+
+@pytest.mark.asyncio
+async def test_get_content_chunks_without_embeddings_pages_by_id(vector_db_service, mock_conn):
+    mock_conn.fetch.return_value = [{"id": "chunk10", "content": "Ten", "material_id": "m1"}]
+    
+    chunks = await vector_db_service.get_content_chunks_without_embeddings(limit=5, after_id="chunk09")
+    
+    assert chunks == [{"id": "chunk10", "content": "Ten", "material_id": "m1"}]
+    assert "ORDER BY id" in mock_conn.fetch.call_args.args[0]
+    assert mock_conn.fetch.call_args.args[1:] == (5, "chunk09")
+
+@pytest.mark.asyncio
+async def test_similarity_search_materials_groups_in_sql(vector_db_service, mock_conn):
+    mock_conn.fetch.return_value = [{"material_id": "m1", "sample_content": "Cells", "similarity": 0.9}]
+    
+    results = await vector_db_service.similarity_search_materials(
+        "cells", match_count=3, query_embedding=[0.1, 0.2]
+    )
+    
+    assert results == [{"material_id": "m1", "similarity": 0.9, "sample_content": "Cells"}]
+    assert "DISTINCT ON (material_id)" in mock_conn.fetch.call_args.args[0]
+    assert mock_conn.fetch.call_args.args[2:] == (0.7, 3, 30)
+
+@pytest.mark.asyncio
+async def test_pool_connections_register_vector_codecs(vector_db_service, mock_conn):
+    await vector_db_service._get_pool()
+    init = mock_conn.create_pool.call_args.kwargs['init']
+    
+    conn = MagicMock()
+    with patch('app.services.vector_database.register_vector', AsyncMock()) as register:
+        await init(conn)
+        register.assert_called_once_with(conn)
+        
+        # Connections opened before the extension exists skip the codecs
+        register.side_effect = ValueError("unknown type: public.vector")
+        await init(conn)
+
+@pytest.mark.asyncio
+async def test_similarity_search_truncates_content_in_sql(vector_db_service, mock_conn):
+    await vector_db_service.similarity_search("cells", query_embedding=[0.1, 0.2], content_length=100)
+    
+    sql = mock_conn.fetch.call_args.args[0]
+    assert "SELECT *" not in sql
+    assert "LEFT(content, $5::int)" in sql
+    assert mock_conn.fetch.call_args.args[-1] == 100
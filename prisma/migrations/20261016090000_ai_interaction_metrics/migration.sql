@@ -0,0 +1,31 @@
+-- Interaction type, token usage and free-form metadata recorded with each AI
+-- interaction, which the metrics queries aggregate.
+ALTER TABLE ai_interactions ADD COLUMN IF NOT EXISTS interaction_type TEXT;
+ALTER TABLE ai_interactions ADD COLUMN IF NOT EXISTS tokens_used INTEGER;
+ALTER TABLE ai_interactions ADD COLUMN IF NOT EXISTS metadata JSONB;
+
+-- Denormalize AI interaction metrics out of the metadata JSON so they can be
+-- filtered and aggregated in SQL instead of in the application.
+ALTER TABLE ai_interactions ADD COLUMN IF NOT EXISTS response_time_ms INTEGER;
+ALTER TABLE ai_interactions ADD COLUMN IF NOT EXISTS error_flag BOOLEAN NOT NULL DEFAULT false;
+
+-- Keep the denormalized columns in sync with metadata on writes. Both are
+-- recomputed from metadata alone, and a response time that is not a JSON
+-- number is recorded as NULL rather than failing the write.
+CREATE OR REPLACE FUNCTION sync_ai_interaction_metrics()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.response_time_ms := CASE
+        WHEN jsonb_typeof(NEW.metadata->'response_time_ms') = 'number'
+        THEN (NEW.metadata->>'response_time_ms')::numeric::int
+    END;
+    NEW.error_flag := COALESCE(NEW.metadata ? 'error' AND NEW.metadata->'error' <> 'null'::jsonb, false);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_ai_interaction_metrics_trigger ON ai_interactions;
+CREATE TRIGGER sync_ai_interaction_metrics_trigger
+BEFORE INSERT OR UPDATE OF metadata ON ai_interactions
+FOR EACH ROW
+EXECUTE FUNCTION sync_ai_interaction_metrics();
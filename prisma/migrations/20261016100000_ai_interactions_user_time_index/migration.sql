@@ -0,0 +1,7 @@
+-- Covering index for organization-scoped metrics queries, which join on
+-- "userId", filter on "createdAt" and only read the aggregated columns, so the
+-- planner can answer them with an index-only scan. The INCLUDE columns are
+-- added by the ai_interaction_metrics migration.
+CREATE INDEX IF NOT EXISTS ai_interactions_user_id_created_at_idx
+    ON ai_interactions ("userId", "createdAt" DESC)
+    INCLUDE (tokens_used, interaction_type, response_time_ms, error_flag);
@@ -0,0 +1,13 @@
+-- CreateTable
+CREATE TABLE "performance_metrics" (
+    "id" TEXT NOT NULL,
+    "name" TEXT NOT NULL,
+    "value" DOUBLE PRECISION NOT NULL,
+    "metadata" JSONB,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "performance_metrics_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "performance_metrics_name_created_at_idx" ON "performance_metrics"("name", "created_at");
@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "quizzes" ADD COLUMN "batch_id" TEXT;
+
+-- CreateIndex
+CREATE INDEX "quizzes_batch_id_idx" ON "quizzes"("batch_id");
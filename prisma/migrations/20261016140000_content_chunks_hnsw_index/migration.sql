@@ -0,0 +1,8 @@
+-- Replace the IVFFlat L2 index with an HNSW cosine index. OpenAI embeddings
+-- are unit-normalized and search_content_chunks orders by cosine distance
+-- (<=>), which the L2 index could not serve; HNSW also needs no training
+-- after data is loaded.
+DROP INDEX IF EXISTS content_chunks_embedding_idx;
+CREATE INDEX content_chunks_embedding_idx
+    ON content_chunks USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,46 @@
+-- Binary-quantized sketches of the chunk embeddings, indexed for Hamming
+-- distance. An expression index keeps the sketches in step with the
+-- embeddings without a separate column to maintain.
+CREATE INDEX IF NOT EXISTS content_chunks_embedding_bits_idx
+    ON content_chunks USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+    WITH (m = 16, ef_construction = 64);
+
+-- Two-stage search: shortlist rerank_factor times the wanted matches by
+-- Hamming distance over the 1-bit sketches, then rank the shortlist by exact
+-- cosine distance on the half-precision embeddings.
+DROP FUNCTION IF EXISTS search_content_chunks(halfvec, float, int);
+CREATE OR REPLACE FUNCTION search_content_chunks(query_embedding halfvec, similarity_threshold float, match_count int, rerank_factor int DEFAULT 10)
+RETURNS TABLE (
+    id uuid,
+    content text,
+    material_id uuid,
+    similarity float
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH shortlist AS (
+        SELECT
+            s.id
+        FROM
+            content_chunks s
+        WHERE
+            s.embedding IS NOT NULL
+        ORDER BY
+            binary_quantize(s.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+        LIMIT match_count * rerank_factor
+    )
+    SELECT
+        c.id::uuid,
+        c.content,
+        c.material_id::uuid,
+        1 - (c.embedding <=> query_embedding) AS similarity
+    FROM
+        shortlist
+        JOIN content_chunks c ON c.id = shortlist.id
+    WHERE
+        1 - (c.embedding <=> query_embedding) > similarity_threshold
+    ORDER BY
+        c.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$ LANGUAGE plpgsql;
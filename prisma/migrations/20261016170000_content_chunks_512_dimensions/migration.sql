@@ -0,0 +1,53 @@
+-- Embed with text-embedding-3-small truncated to 512 dimensions, a third of
+-- the heap, index and distance cost of 1536. Existing embeddings cannot be
+-- converted, so they are cleared; regenerate them with
+-- scripts/generate_embeddings.py process.
+DROP INDEX IF EXISTS content_chunks_embedding_idx;
+DROP INDEX IF EXISTS content_chunks_embedding_bits_idx;
+
+ALTER TABLE content_chunks
+    ALTER COLUMN embedding TYPE halfvec(512) USING NULL;
+
+CREATE INDEX content_chunks_embedding_idx
+    ON content_chunks USING hnsw (embedding halfvec_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX content_chunks_embedding_bits_idx
+    ON content_chunks USING hnsw ((binary_quantize(embedding)::bit(512)) bit_hamming_ops)
+    WITH (m = 16, ef_construction = 64);
+
+CREATE OR REPLACE FUNCTION search_content_chunks(query_embedding halfvec, similarity_threshold float, match_count int, rerank_factor int DEFAULT 10)
+RETURNS TABLE (
+    id uuid,
+    content text,
+    material_id uuid,
+    similarity float
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH shortlist AS (
+        SELECT
+            s.id
+        FROM
+            content_chunks s
+        WHERE
+            s.embedding IS NOT NULL
+        ORDER BY
+            binary_quantize(s.embedding)::bit(512) <~> binary_quantize(query_embedding)
+        LIMIT match_count * rerank_factor
+    )
+    SELECT
+        c.id::uuid,
+        c.content,
+        c.material_id::uuid,
+        1 - (c.embedding <=> query_embedding) AS similarity
+    FROM
+        shortlist
+        JOIN content_chunks c ON c.id = shortlist.id
+    WHERE
+        1 - (c.embedding <=> query_embedding) > similarity_threshold
+    ORDER BY
+        c.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,3 @@
+-- Record material completions as analytics events, alongside MATERIAL_VIEW,
+-- so recommendations, study plans and learning history can use them.
+ALTER TYPE "EventType" ADD VALUE IF NOT EXISTS 'MATERIAL_COMPLETE';